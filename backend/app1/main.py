@@ -1,18 +1,29 @@
-from fastapi import FastAPI, HTTPException, Depends
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, desc
-from typing import List, Dict, Any
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import date, datetime, timedelta
+import hmac
 import sys
 import os
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from database.models import UsageRecord, get_db, create_tables
-from utils.calculations import calculate_costs_and_metrics
+from database.models import UsageRecord, UsageRollupHourly, UsageRollupDaily, SessionLocal, AsyncSessionLocal, get_async_db, create_tables
+from database.rollups import ensure_rollups, hour_bucket
+from database.archive import day_range, get_usage_archive, live_daily_sums, usage_range_report
+from database.ingest import UsageWriter, USAGE_INGEST_MODE, build_usage_row, bulk_insert_usage
+from utils.calculations import cache_hit_metrics, calculate_reported_metrics_many
+from utils.json_stream import iter_json_array, iter_ndjson
+from utils.response_cache import VersionedResponseCache, etag_matches
+from utils.offload import acquire_offloader, get_offloader, offload, release_offloader
+from utils.readiness import Readiness
+from utils.tokenizer import TOKENIZER_RETRY_SECONDS, prewarm_tokenizer
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 app = FastAPI(
     title="LLM Analytics API",
@@ -29,11 +40,38 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Cached /analytics payload; invalidated by every write or after the TTL
+ANALYTICS_CACHE_TTL_SECONDS = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "30"))
+analytics_cache = VersionedResponseCache(ANALYTICS_CACHE_TTL_SECONDS)
+
+# Upper bound on records accepted by one /store-usage/batch request
+USAGE_BATCH_MAX_RECORDS = int(os.getenv("USAGE_BATCH_MAX_RECORDS", "10000"))
+
+# Callers allowed to send precomputed token counts and cache hits: holders of USAGE_TRUSTED_TOKEN
+# (X-Usage-Token header) and, only when USAGE_TRUST_LOOPBACK is set, any client on this host.
+# Behind a reverse proxy on the same host every external client arrives from 127.0.0.1, so leave
+# loopback trust off there.
+USAGE_TRUSTED_TOKEN = os.getenv("USAGE_TRUSTED_TOKEN", "")
+USAGE_TRUST_LOOPBACK = os.getenv("USAGE_TRUST_LOOPBACK", "false").lower() in ("1", "true", "yes")
+LOOPBACK_HOSTS = {"127.0.0.1", "::1", "localhost"}
+
+# Background group-commit writer, only used when USAGE_INGEST_MODE=write_behind
+usage_writer: Optional[UsageWriter] = None
+
+# Startup steps reported by /ready
+readiness = Readiness()
+
 # Pydantic models for requests
 class UsageRequest(BaseModel):
     INPUT_PROMPT: str
     OUTPUT_PROMPT: str
     MODEL: str
+    # Provider-reported usage; used instead of re-tokenizing when the caller is trusted
+    prompt_tokens: Optional[int] = Field(None, ge=0)
+    completion_tokens: Optional[int] = Field(None, ge=0)
+    search_context_size: Optional[int] = Field(None, ge=0)
+    # Answer served from app2's response cache (trusted callers only)
+    cache_hit: bool = False
 
 class UsageResponse(BaseModel):
     id: int
@@ -51,184 +89,332 @@ class UsageResponse(BaseModel):
     created_at: datetime
     energy_consumed: float
     carbon_emission: float
+    cache_hit: bool
+    energy_avoided: float
+    carbon_avoided: float
 
-# Create tables on startup
+def _ensure_rollups():
+    db = SessionLocal()
+    try:
+        ensure_rollups(db)
+    finally:
+        db.close()
+
+# Create tables on startup; the tokenizer warms up in the background and /ready waits for it
 @app.on_event("startup")
 async def startup():
-    create_tables()
+    acquire_offloader()
+    readiness.run("create_tables", create_tables)
+    readiness.run("rollups", _ensure_rollups)
+    readiness.start("tokenizer", prewarm_tokenizer, retry_seconds=TOKENIZER_RETRY_SECONDS)
+
+    global usage_writer
+    if USAGE_INGEST_MODE == "write_behind":
+        usage_writer = UsageWriter(SessionLocal, on_commit=lambda rows: analytics_cache.bump())
+        await usage_writer.start()
+
+# Flush queued usage before the process exits
+@app.on_event("shutdown")
+async def shutdown():
+    readiness.stop()
+    if usage_writer is not None:
+        await usage_writer.stop()
+    release_offloader()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.utcnow(), "service": "Analytics API"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until the startup steps (tables, rollups, tokenizer warmup) are done"""
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
+
+def _trusts_reported_tokens(request: Request) -> bool:
+    if USAGE_TRUSTED_TOKEN and hmac.compare_digest(request.headers.get("x-usage-token", ""), USAGE_TRUSTED_TOKEN):
+        return True
+    return USAGE_TRUST_LOOPBACK and request.client is not None and request.client.host in LOOPBACK_HOSTS
+
+async def _calculate_usage_metrics(usages: List[UsageRequest], trusted: bool) -> List[Dict[str, Any]]:
+    """Metrics for each usage, tokenizing only the texts without a trusted reported count"""
+    items = []
+    size = 0
+    for usage in usages:
+        prompt_tokens = usage.prompt_tokens if trusted else None
+        completion_tokens = usage.completion_tokens if trusted else None
+        search_context_size = (usage.search_context_size or 0) if trusted else 0
+        items.append((usage.INPUT_PROMPT, usage.OUTPUT_PROMPT, usage.MODEL,
+                      prompt_tokens, completion_tokens, search_context_size))
+        if prompt_tokens is None:
+            size += len(usage.INPUT_PROMPT)
+        if completion_tokens is None:
+            size += len(usage.OUTPUT_PROMPT)
+    all_metrics = await offload(calculate_reported_metrics_many, items, size=size)
+    # For trusted cache hits the counts describe the cached answer; record them as avoided
+    return [
+        cache_hit_metrics(metrics, usage.MODEL) if trusted and usage.cache_hit else metrics
+        for usage, metrics in zip(usages, all_metrics)
+    ]
+
 @app.post("/store-usage")
-async def store_usage(request: UsageRequest, db: Session = Depends(get_db)):
+async def store_usage(request: UsageRequest, http_request: Request, db: AsyncSession = Depends(get_async_db)):
     """Store LLM usage data with automatic calculations"""
     try:
-        # Calculate metrics
-        metrics = calculate_costs_and_metrics(
+        # Calculate metrics (from reported token counts when the caller is trusted)
+        metrics = (await _calculate_usage_metrics([request], _trusts_reported_tokens(http_request)))[0]
+
+        row = build_usage_row(
             request.INPUT_PROMPT,
             request.OUTPUT_PROMPT,
-            request.MODEL
+            request.MODEL,
+            metrics
         )
 
-        # Create database record
-        usage_record = UsageRecord(
-            model=request.MODEL,
-            prompt_tokens=metrics["prompt_tokens"],
-            completion_tokens=metrics["completion_tokens"],
-            total_tokens=metrics["total_tokens"],
-            search_context_size=metrics["search_context_size"],
-            input_tokens_cost=metrics["input_tokens_cost"],
-            output_tokens_cost=metrics["output_tokens_cost"],
-            request_cost=metrics["request_cost"],
-            total_cost=metrics["total_cost"],
-            input_prompt=request.INPUT_PROMPT,
-            output_prompt=request.OUTPUT_PROMPT,
-            energy_consumed=metrics["energy_consumed"],
-            carbon_emission=metrics["carbon_emission"]
-        )
+        if usage_writer is not None:
+            record_id = await usage_writer.submit(row)
+            return {
+                "message": "Usage data stored successfully" if record_id is not None else "Usage data queued",
+                "id": record_id,
+                "metrics": metrics
+            }
 
-        db.add(usage_record)
-        db.commit()
-        db.refresh(usage_record)
+        # Insert the record and update the rollups in one transaction
+        ids = await db.run_sync(bulk_insert_usage, [row])
+        await db.commit()
+        analytics_cache.bump()
 
         return {
             "message": "Usage data stored successfully",
-            "id": usage_record.id,
+            "id": ids[0],
             "metrics": metrics
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error storing usage data: {str(e)}")
 
-@app.get("/analytics")
-async def get_analytics(db: Session = Depends(get_db)):
-    """Get comprehensive analytics data"""
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'record'}: {item['msg']}"
+        for item in error.errors()
+    )
+
+async def _store_usages(db: AsyncSession, usages: List[UsageRequest], trusted: bool) -> List[int]:
+    """Insert usages with one bulk insert and commit; returns the new record ids in order"""
+    # One batched token count for every prompt and output without a reported count
+    all_metrics = await _calculate_usage_metrics(usages, trusted)
+    rows = [
+        build_usage_row(usage.INPUT_PROMPT, usage.OUTPUT_PROMPT, usage.MODEL, metrics)
+        for usage, metrics in zip(usages, all_metrics)
+    ]
+    ids = await db.run_sync(bulk_insert_usage, rows)
+    await db.commit()
+    if ids:
+        analytics_cache.bump()
+    return ids
+
+def _batch_response(results: List[Dict[str, Any]], valid: List[Tuple[int, UsageRequest]],
+                    ids: List[int]) -> Dict[str, Any]:
+    """The /store-usage/batch response: per-index ids or errors, in input order"""
+    results.extend({"index": index, "id": record_id} for (index, _), record_id in zip(valid, ids))
+    results.sort(key=lambda result: result["index"])
+    return {
+        "message": "Usage batch processed",
+        "stored": len(ids),
+        "failed": len(results) - len(ids),
+        "results": results
+    }
+
+async def store_usage_events(events: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Store usage events reported from the same process (app2 in the combined app) without the
+    HTTP round-trip through /store-usage/batch; their reported token counts are trusted.
+    Invalid events are reported per index, as /store-usage/batch does, and the rest are stored.
+    """
+    results: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, UsageRequest]] = []
+    for index, event in enumerate(events):
+        try:
+            valid.append((index, UsageRequest.model_validate(event)))
+        except ValidationError as e:
+            results.append({"index": index, "error": _validation_message(e)})
+    async with AsyncSessionLocal() as db:
+        ids = await _store_usages(db, [usage for _, usage in valid], trusted=True)
+    return _batch_response(results, valid, ids)
+
+@app.post("/store-usage/batch")
+async def store_usage_batch(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Store many usage records from an NDJSON or JSON-array body with one bulk insert"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        records = iter_ndjson(request.stream())
+    else:
+        records = iter_json_array(request.stream())
+
+    results: List[Dict[str, Any]] = []
+    valid: List[Tuple[int, UsageRequest]] = []
     try:
-        # 1. Overall statistics
-        total_records = db.query(UsageRecord).count()
-        total_tokens = db.query(func.sum(UsageRecord.total_tokens)).scalar() or 0
-        total_carbon = db.query(func.sum(UsageRecord.carbon_emission)).scalar() or 0
-        total_energy = db.query(func.sum(UsageRecord.energy_consumed)).scalar() or 0
-        total_cost = db.query(func.sum(UsageRecord.total_cost)).scalar() or 0
-
-        overview = {
-            "TOTAL_TOKEN_COUNT": int(total_tokens),
-            "TOTAL_CARBON_EMISSION": round(total_carbon, 4),
-            "TOTAL_APIS": total_records,
-            "TOTAL_ENERGY_CONSUMED": round(total_energy, 8),
-            "TOTAL_COST": round(total_cost, 6)
-        }
+        index = 0
+        async for value, error in records:
+            if index >= USAGE_BATCH_MAX_RECORDS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Batch exceeds the limit of {USAGE_BATCH_MAX_RECORDS} records"
+                )
+            if error is None:
+                try:
+                    valid.append((index, UsageRequest.model_validate(value)))
+                except ValidationError as e:
+                    error = _validation_message(e)
+            if error is not None:
+                results.append({"index": index, "error": error})
+            index += 1
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
 
-        # 2. Latest 30 entries
-        latest_entries = db.query(UsageRecord).order_by(desc(UsageRecord.created_at)).limit(30).all()
-        latest_data = []
-        for entry in latest_entries:
-            latest_data.append({
-                "id": entry.id,
-                "model": entry.model,
-                "prompt_tokens": entry.prompt_tokens,
-                "completion_tokens": entry.completion_tokens,
-                "total_tokens": entry.total_tokens,
-                "search_context_size": entry.search_context_size,
-                "input_tokens_cost": entry.input_tokens_cost,
-                "output_tokens_cost": entry.output_tokens_cost,
-                "request_cost": entry.request_cost,
-                "total_cost": entry.total_cost,
-                "INPUT_PROMPT": entry.input_prompt[:100] + "..." if len(entry.input_prompt) > 100 else entry.input_prompt,
-                "OUTPUT_PROMPT": entry.output_prompt[:100] + "..." if len(entry.output_prompt) > 100 else entry.output_prompt,
-                "created_at": entry.created_at.isoformat(),
-                "energy_consumed": entry.energy_consumed,
-                "carbon_emission": entry.carbon_emission
-            })
-
-        # 3. Last 7 days carbon emission data for line graph
-        seven_days_ago = datetime.utcnow() - timedelta(days=7)
-        carbon_by_day = db.query(
-            func.date(UsageRecord.created_at).label('date'),
-            func.sum(UsageRecord.carbon_emission).label('carbon_emission')
-        ).filter(
-            UsageRecord.created_at >= seven_days_ago
-        ).group_by(
-            func.date(UsageRecord.created_at)
-        ).order_by('date').all()
-
-        carbon_line_data = [
-            {"date": str(day.date), "carbon_emission": round(day.carbon_emission, 4)}
-            for day in carbon_by_day
-        ]
-
-        # 4. Last 7 days energy consumption data for line graph
-        energy_by_day = db.query(
-            func.date(UsageRecord.created_at).label('date'),
-            func.sum(UsageRecord.energy_consumed).label('energy_consumed')
-        ).filter(
-            UsageRecord.created_at >= seven_days_ago
-        ).group_by(
-            func.date(UsageRecord.created_at)
-        ).order_by('date').all()
-
-        energy_line_data = [
-            {"date": str(day.date), "energy_consumed": round(day.energy_consumed, 8)}
-            for day in energy_by_day
-        ]
-
-        # 5. Last 7 days hourly carbon emission data for heatmap
-        carbon_heatmap = db.query(
-            func.date(UsageRecord.created_at).label('date'),
-            extract('hour', UsageRecord.created_at).label('hour'),
-            func.sum(UsageRecord.carbon_emission).label('carbon_emission')
-        ).filter(
-            UsageRecord.created_at >= seven_days_ago
-        ).group_by(
-            func.date(UsageRecord.created_at),
-            extract('hour', UsageRecord.created_at)
-        ).order_by('date', 'hour').all()
-
-        carbon_heatmap_data = [
-            {
-                "date": str(entry.date),
-                "hour": int(entry.hour),
-                "carbon_emission": round(entry.carbon_emission, 4)
-            }
-            for entry in carbon_heatmap
-        ]
-
-        # 6. Last 7 days hourly energy consumption data for heatmap
-        energy_heatmap = db.query(
-            func.date(UsageRecord.created_at).label('date'),
-            extract('hour', UsageRecord.created_at).label('hour'),
-            func.sum(UsageRecord.energy_consumed).label('energy_consumed')
-        ).filter(
-            UsageRecord.created_at >= seven_days_ago
-        ).group_by(
-            func.date(UsageRecord.created_at),
-            extract('hour', UsageRecord.created_at)
-        ).order_by('date', 'hour').all()
-
-        energy_heatmap_data = [
-            {
-                "date": str(entry.date),
-                "hour": int(entry.hour),
-                "energy_consumed": round(entry.energy_consumed, 8)
-            }
-            for entry in energy_heatmap
-        ]
+    try:
+        ids = await _store_usages(db, [usage for _, usage in valid], _trusts_reported_tokens(request))
+    except Exception as e:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error storing usage batch: {str(e)}")
 
-        return {
-            "overview": overview,
-            "latest_entries": latest_data,
-            "carbon_line_graph_data": carbon_line_data,
-            "energy_line_graph_data": energy_line_data,
-            "carbon_heatmap_data": carbon_heatmap_data,
-            "energy_heatmap_data": energy_heatmap_data
-        }
+    return _batch_response(results, valid, ids)
+
+def build_analytics(db: Session) -> Dict[str, Any]:
+    """Build the /analytics payload with three queries: totals, latest entries and one hourly scan"""
+    # 1. Overall statistics (one combined aggregate over the daily rollup)
+    totals = db.query(
+        func.sum(UsageRollupDaily.request_count).label('total_records'),
+        func.sum(UsageRollupDaily.total_tokens).label('total_tokens'),
+        func.sum(UsageRollupDaily.carbon_emission).label('total_carbon'),
+        func.sum(UsageRollupDaily.energy_consumed).label('total_energy'),
+        func.sum(UsageRollupDaily.total_cost).label('total_cost'),
+        func.sum(UsageRollupDaily.cache_hits).label('cache_hits'),
+        func.sum(UsageRollupDaily.energy_avoided).label('energy_avoided'),
+        func.sum(UsageRollupDaily.carbon_avoided).label('carbon_avoided')
+    ).one()
+
+    overview = {
+        "TOTAL_TOKEN_COUNT": int(totals.total_tokens or 0),
+        "TOTAL_CARBON_EMISSION": round(totals.total_carbon or 0, 4),
+        "TOTAL_APIS": int(totals.total_records or 0),
+        "TOTAL_ENERGY_CONSUMED": round(totals.total_energy or 0, 8),
+        "TOTAL_COST": round(totals.total_cost or 0, 6),
+        "TOTAL_CACHE_HITS": int(totals.cache_hits or 0),
+        "TOTAL_ENERGY_AVOIDED": round(totals.energy_avoided or 0, 8),
+        "TOTAL_CARBON_AVOIDED": round(totals.carbon_avoided or 0, 4)
+    }
+
+    # 2. Latest 30 entries
+    latest_entries = db.query(UsageRecord).order_by(desc(UsageRecord.created_at)).limit(30).all()
+    latest_data = []
+    for entry in latest_entries:
+        latest_data.append({
+            "id": entry.id,
+            "model": entry.model,
+            "prompt_tokens": entry.prompt_tokens,
+            "completion_tokens": entry.completion_tokens,
+            "total_tokens": entry.total_tokens,
+            "search_context_size": entry.search_context_size,
+            "input_tokens_cost": entry.input_tokens_cost,
+            "output_tokens_cost": entry.output_tokens_cost,
+            "request_cost": entry.request_cost,
+            "total_cost": entry.total_cost,
+            "INPUT_PROMPT": entry.input_prompt[:100] + "..." if len(entry.input_prompt) > 100 else entry.input_prompt,
+            "OUTPUT_PROMPT": entry.output_prompt[:100] + "..." if len(entry.output_prompt) > 100 else entry.output_prompt,
+            "created_at": entry.created_at.isoformat(),
+            "energy_consumed": entry.energy_consumed,
+            "carbon_emission": entry.carbon_emission,
+            "cache_hit": entry.cache_hit,
+            "energy_avoided": entry.energy_avoided,
+            "carbon_avoided": entry.carbon_avoided
+        })
+
+    # 3. Last 7 days of hourly carbon and energy, summed across models in a single scan
+    seven_days_ago = datetime.utcnow() - timedelta(days=7)
+    hourly = db.query(
+        UsageRollupHourly.bucket_start,
+        func.sum(UsageRollupHourly.carbon_emission).label('carbon_emission'),
+        func.sum(UsageRollupHourly.energy_consumed).label('energy_consumed')
+    ).filter(
+        UsageRollupHourly.bucket_start >= hour_bucket(seven_days_ago)
+    ).group_by(
+        UsageRollupHourly.bucket_start
+    ).order_by(UsageRollupHourly.bucket_start).all()
+
+    # 4. Derive the heatmaps (per hour) and line graphs (per day) from the hourly rows
+    carbon_heatmap_data = []
+    energy_heatmap_data = []
+    daily_totals: Dict[str, Dict[str, float]] = {}
+    for entry in hourly:
+        day = entry.bucket_start.date().isoformat()
+        carbon_heatmap_data.append({
+            "date": day,
+            "hour": entry.bucket_start.hour,
+            "carbon_emission": round(entry.carbon_emission, 4)
+        })
+        energy_heatmap_data.append({
+            "date": day,
+            "hour": entry.bucket_start.hour,
+            "energy_consumed": round(entry.energy_consumed, 8)
+        })
+        totals_for_day = daily_totals.setdefault(day, {"carbon_emission": 0.0, "energy_consumed": 0.0})
+        totals_for_day["carbon_emission"] += entry.carbon_emission
+        totals_for_day["energy_consumed"] += entry.energy_consumed
 
+    carbon_line_data = [
+        {"date": day, "carbon_emission": round(sums["carbon_emission"], 4)}
+        for day, sums in daily_totals.items()
+    ]
+    energy_line_data = [
+        {"date": day, "energy_consumed": round(sums["energy_consumed"], 8)}
+        for day, sums in daily_totals.items()
+    ]
+
+    return {
+        "overview": overview,
+        "latest_entries": latest_data,
+        "carbon_line_graph_data": carbon_line_data,
+        "energy_line_graph_data": energy_line_data,
+        "carbon_heatmap_data": carbon_heatmap_data,
+        "energy_heatmap_data": energy_heatmap_data
+    }
+
+@app.get("/analytics")
+async def get_analytics(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Get comprehensive analytics data (cached; supports If-None-Match)"""
+    try:
+        async def compute():
+            return await db.run_sync(build_analytics)
+
+        body, etag = await analytics_cache.get_or_compute(compute)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving analytics: {str(e)}")
 
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/analytics/range")
+async def get_analytics_range(start: date, end: date, db: AsyncSession = Depends(get_async_db)):
+    """Daily usage per model for the UTC days start..end, from usage_records and the Parquet archive"""
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    archive = get_usage_archive()
+    start_at, end_at = day_range(start, end)
+    try:
+        # Live sums and the live ids on archived days come from one statement (one snapshot)
+        live, overlap, days = await db.run_sync(live_daily_sums, archive, start_at, end_at)
+        # Parquet scans block, so they run on the offload thread pool
+        archived, stats = await get_offloader().run_in(
+            "thread", archive.grouped_sums, "day", start_at, end_at, overlap, days
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error retrieving usage range: {str(e)}")
+    return usage_range_report(start, end, live, archived, stats)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8001)
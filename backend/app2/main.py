@@ -4,16 +4,25 @@ import httpx
 import os
 import json
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Callable, Awaitable
 from datetime import datetime
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from database.models import create_tables
-from utils.calculations import calculate_costs_and_metrics
+from utils.calculations import calculate_costs_and_metrics, count_tokens
+from utils.offload import acquire_offloader, offload, release_offloader
+from utils.http_clients import HTTPClients
+from utils.usage_reporter import UsageReporter
+from utils.tokenizer import TOKENIZER_RETRY_SECONDS, StreamingTokenCounter, prewarm_tokenizer
+from utils.readiness import Readiness
+from database.cache_store import TwoTierCache
+from utils.singleflight import SingleFlight
+from utils.upstream import CircuitOpenError, ResilientUpstream
 
 # Load environment variables from .env file
 load_dotenv()
@@ -33,6 +42,34 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Long-lived HTTP clients (connection pooling and keep-alive across requests)
+http_clients = HTTPClients()
+
+# Retries, circuit breaking and hedging for Perplexity calls, configured per endpoint
+llm_upstream = ResilientUpstream("call_llm", lambda: http_clients.perplexity)
+llm_stream_upstream = ResilientUpstream("call_llm_stream", lambda: http_clients.perplexity)
+
+# Background usage reporting to the Analytics API (set up on startup)
+usage_reporter: Optional[UsageReporter] = None
+
+# In-process usage storage, set by the combined app so usage skips the HTTP hop to app1
+usage_sink: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None
+
+# Exact-match cache of LLM answers keyed by (model, normalized prompt)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+llm_cache = TwoTierCache(
+    "llm_response",
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400")),
+    memory_entries=int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "1024")),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000")),
+) if LLM_CACHE_ENABLED else None
+
+# Coalesces concurrent identical /call-llm upstream calls
+completion_flight = SingleFlight()
+
+# Startup steps reported by /ready
+readiness = Readiness()
+
 # Pydantic models
 class LLMRequest(BaseModel):
     INPUT_PROMPT: str
@@ -41,17 +78,151 @@ class LLMRequest(BaseModel):
 class LLMResponse(BaseModel):
     OUTPUT_PROMPT: str
     TOTAL_TOKEN_COUNT: int
+    CACHED: bool = False
 
-# Create tables on startup
+def llm_cache_key(request: LLMRequest) -> str:
+    """Cache key: model plus the prompt with whitespace runs collapsed"""
+    return TwoTierCache.make_key(request.MODEL, " ".join(request.INPUT_PROMPT.split()))
+
+def report_usage(request: LLMRequest, output_prompt: str, counts: Dict[str, int], cache_hit: bool = False) -> None:
+    """Queue a usage event for the Analytics API; dropped and counted if the queue is full"""
+    if usage_reporter is None:
+        return
+    payload = {
+        "INPUT_PROMPT": request.INPUT_PROMPT,
+        "OUTPUT_PROMPT": output_prompt,
+        "MODEL": request.MODEL,
+        **counts
+    }
+    if cache_hit:
+        # The counts describe the cached answer; app1 records them as avoided, not spent
+        payload["cache_hit"] = True
+    usage_reporter.report(payload)
+
+async def cache_answer(request: LLMRequest, output_prompt: str, counts: Dict[str, int]) -> None:
+    if llm_cache is not None:
+        await llm_cache.set(llm_cache_key(request), {"OUTPUT_PROMPT": output_prompt, **counts})
+
+async def cached_answer(request: LLMRequest) -> Optional[Dict[str, Any]]:
+    """The cached answer for this model and prompt, or None"""
+    if llm_cache is None:
+        return None
+    return await llm_cache.get(llm_cache_key(request))
+
+def reported_token_counts(usage: Dict[str, Any]) -> Dict[str, int]:
+    """Token counts to forward to /store-usage so the Analytics API doesn't re-tokenize"""
+    # Perplexity may report search_context_size as a tier name ("low"); only counts are forwarded
+    return {
+        key: usage[key]
+        for key in ("prompt_tokens", "completion_tokens", "search_context_size")
+        if isinstance(usage.get(key), int) and not isinstance(usage[key], bool) and usage[key] >= 0
+    }
+
+# Create tables on startup; the tokenizer warms up in the background and /ready waits for it
 @app.on_event("startup")
 async def startup():
-    create_tables()
+    acquire_offloader()
+    readiness.run("create_tables", create_tables)
+    readiness.start("tokenizer", prewarm_tokenizer, retry_seconds=TOKENIZER_RETRY_SECONDS)
+
+    global usage_reporter
+    usage_reporter = UsageReporter(lambda: http_clients.analytics, sink=usage_sink)
+    await usage_reporter.start()
+
+# Send queued usage events before closing the clients
+@app.on_event("shutdown")
+async def shutdown():
+    readiness.stop()
+    if usage_reporter is not None:
+        await usage_reporter.stop()
+    await http_clients.aclose()
+    release_offloader()
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.utcnow(), "service": "LLM Calling API"}
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until the startup steps (tables, tokenizer warmup) are done"""
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
+
+@app.get("/http-pool-stats")
+async def http_pool_stats():
+    """Connection pool statistics of the shared HTTP clients"""
+    return http_clients.stats()
+
+@app.get("/upstream-stats")
+async def upstream_stats():
+    """Retry, circuit breaker and hedging counters per upstream endpoint"""
+    return {upstream.name: upstream.stats() for upstream in (llm_upstream, llm_stream_upstream)}
+
+@app.get("/usage-reporter-stats")
+async def usage_reporter_stats():
+    """Queue depth and delivery counters of the background usage reporter"""
+    return usage_reporter.stats() if usage_reporter is not None else {}
+
+@app.get("/coalescing-stats")
+async def coalescing_stats():
+    """Upstream calls made and duplicate requests coalesced onto them"""
+    return completion_flight.stats()
+
+@app.get("/llm-cache-stats")
+async def llm_cache_stats():
+    """Hit and eviction counters of the LLM response cache"""
+    return llm_cache.stats() if llm_cache is not None else {"enabled": False}
+
+async def fetch_completion(request: LLMRequest, api_key: str) -> Dict[str, Any]:
+    """Call Perplexity AI once and cache the answer; shared by coalesced /call-llm requests"""
+    # Call Perplexity AI
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+
+    payload = {
+        "model": request.MODEL,
+        "messages": [
+            {"role": "user", "content": request.INPUT_PROMPT}
+        ]
+    }
+
+    response = await llm_upstream.post(
+        "/chat/completions",
+        headers=headers,
+        json=payload
+    )
+    if response.status_code != 200:
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Perplexity API error: {response.text}"
+        )
+
+    result = response.json()
+    output_prompt = result["choices"][0]["message"]["content"]
+
+    # Get token counts from response if available
+    usage = result.get("usage", {})
+    total_tokens = usage.get("total_tokens", 0)
+
+    # If tokens not provided by API, calculate them
+    if total_tokens == 0:
+        metrics = await offload(
+            calculate_costs_and_metrics,
+            request.INPUT_PROMPT,
+            output_prompt,
+            request.MODEL,
+            size=len(request.INPUT_PROMPT) + len(output_prompt)
+        )
+        total_tokens = metrics["total_tokens"]
+        usage = metrics
+
+    counts = reported_token_counts(usage)
+    await cache_answer(request, output_prompt, counts)
+    return {"OUTPUT_PROMPT": output_prompt, "TOTAL_TOKEN_COUNT": total_tokens, "counts": counts}
+
 @app.post("/call-llm", response_model=LLMResponse)
 async def call_llm(request: LLMRequest):
     """Call Perplexity AI and store usage data"""
@@ -63,70 +234,34 @@ async def call_llm(request: LLMRequest):
             # This will now correctly return a 500 error with the detailed message.
             raise ValueError("PERPLEXITY_API_KEY not found in environment. Please set it in your .env file.")
 
-        # Call Perplexity AI
-        headers = {
-            "accept": "application/json",
-            "content-type": "application/json",
-            "Authorization": f"Bearer {api_key}",
-        }
-
-        payload = {
-            "model": request.MODEL,
-            "messages": [
-                {"role": "user", "content": request.INPUT_PROMPT}
-            ]
-        }
-
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            if response.status_code != 200:
-                raise HTTPException(
-                    status_code=response.status_code,
-                    detail=f"Perplexity API error: {response.text}"
-                )
-
-            result = response.json()
-            output_prompt = result["choices"][0]["message"]["content"]
-
-            # Get token counts from response if available
-            usage = result.get("usage", {})
-            total_tokens = usage.get("total_tokens", 0)
-
-            # If tokens not provided by API, calculate them
-            if total_tokens == 0:
-                metrics = calculate_costs_and_metrics(request.INPUT_PROMPT, output_prompt, request.MODEL)
-                total_tokens = metrics["total_tokens"]
-
-            # Store usage data by calling Analytics API
-            analytics_payload = {
-                "INPUT_PROMPT": request.INPUT_PROMPT,
-                "OUTPUT_PROMPT": output_prompt,
-                "MODEL": request.MODEL
-            }
+        # Identical prompts to the same model are answered from the cache
+        cached = await cached_answer(request)
+        if cached is not None:
+            output_prompt = cached.pop("OUTPUT_PROMPT")
+            report_usage(request, output_prompt, cached, cache_hit=True)
+            return LLMResponse(OUTPUT_PROMPT=output_prompt, TOTAL_TOKEN_COUNT=0, CACHED=True)
 
-            try:
-                async with httpx.AsyncClient(timeout=30.0) as analytics_client:
-                    analytics_response = await analytics_client.post(
-                        "http://localhost:8001/store-usage",
-                        json=analytics_payload,
-                    )
-                    analytics_response.raise_for_status()
-            except httpx.RequestError as exc:
-                # Log error but don't fail the main request
-                print(f"Warning: Failed to store usage data to Analytics API: {exc}")
-            except Exception as exc:
-                # Log error but don't fail the main request
-                print(f"Warning: An unexpected error occurred while storing usage data: {exc}")
-
-            return LLMResponse(
-                OUTPUT_PROMPT=output_prompt,
-                TOTAL_TOKEN_COUNT=total_tokens
-            )
+        # Concurrent identical requests share one upstream call
+        completion, coalesced = await completion_flight.do(
+            llm_cache_key(request),
+            lambda: fetch_completion(request, api_key)
+        )
+        output_prompt = completion["OUTPUT_PROMPT"]
+        if coalesced:
+            # Answered by another request's upstream call; nothing was spent for this one
+            report_usage(request, output_prompt, completion["counts"], cache_hit=True)
+            return LLMResponse(OUTPUT_PROMPT=output_prompt, TOTAL_TOKEN_COUNT=0, CACHED=True)
+
+        # Queue usage data for the Analytics API; the reporter sends it in the background
+        report_usage(request, output_prompt, completion["counts"])
+
+        return LLMResponse(
+            OUTPUT_PROMPT=output_prompt,
+            TOTAL_TOKEN_COUNT=completion["TOTAL_TOKEN_COUNT"]
+        )
 
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
     except httpx.TimeoutException:
         raise HTTPException(status_code=504, detail="Request to Perplexity AI timed out")
     except httpx.RequestError as e:
@@ -136,6 +271,121 @@ async def call_llm(request: LLMRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling LLM: {str(e)}")
 
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def relay_completion_stream(request: LLMRequest, upstream: httpx.Response):
+    """Relay Perplexity's stream as SSE, counting completion tokens as the chunks arrive"""
+    counter = StreamingTokenCounter()
+    output_parts = []
+    usage: Dict[str, Any] = {}
+    finished = False
+    try:
+        async for line in upstream.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            if chunk.get("usage"):
+                usage = chunk["usage"]
+            for choice in chunk.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    output_parts.append(content)
+                    completion_tokens = counter.feed(content)
+                    yield sse_event("delta", {"content": content, "completion_tokens": completion_tokens})
+
+        finished = True
+        counts = await streamed_token_counts(request, counter, usage)
+        yield sse_event("usage", {**counts, "TOTAL_TOKEN_COUNT": counts["prompt_tokens"] + counts["completion_tokens"]})
+        if output_parts:
+            await cache_answer(request, "".join(output_parts), counts)
+    except httpx.HTTPError as e:
+        yield sse_event("error", {"detail": f"Error streaming from Perplexity AI: {e}"})
+    finally:
+        # Record whatever was generated, also when the client disconnected mid-stream
+        if output_parts:
+            counts = reported_token_counts(usage) if finished else {"completion_tokens": counter.finish()}
+            report_usage(request, "".join(output_parts), counts)
+        await upstream.aclose()
+
+async def relay_cached_answer(request: LLMRequest, cached: Dict[str, Any]):
+    """Replay a cached answer in the same event format as a live stream"""
+    output_prompt = cached.pop("OUTPUT_PROMPT")
+    report_usage(request, output_prompt, cached, cache_hit=True)
+    yield sse_event("delta", {"content": output_prompt, "completion_tokens": 0})
+    yield sse_event("usage", {"prompt_tokens": 0, "completion_tokens": 0, "TOTAL_TOKEN_COUNT": 0, "cached": True})
+
+async def streamed_token_counts(request: LLMRequest, counter: StreamingTokenCounter,
+                                usage: Dict[str, Any]) -> Dict[str, int]:
+    """Provider-reported counts where present, otherwise our own"""
+    counts = reported_token_counts(usage)
+    counts.setdefault("completion_tokens", counter.finish())
+    if "prompt_tokens" not in counts:
+        counts["prompt_tokens"] = await offload(count_tokens, request.INPUT_PROMPT, size=len(request.INPUT_PROMPT))
+    usage.update(counts)
+    return counts
+
+@app.post("/call-llm/stream")
+async def call_llm_stream(request: LLMRequest):
+    """Call Perplexity AI and relay the completion as Server-Sent Events while it is generated"""
+    api_key = os.getenv("PERPLEXITY_API_KEY")
+    if not api_key:
+        raise HTTPException(
+            status_code=500,
+            detail="PERPLEXITY_API_KEY not found in environment. Please set it in your .env file."
+        )
+
+    cached = await cached_answer(request)
+    if cached is not None:
+        return StreamingResponse(
+            relay_cached_answer(request, cached),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    try:
+        upstream = await llm_stream_upstream.send(
+            "POST",
+            "/chat/completions",
+            stream=True,
+            headers={
+                "accept": "text/event-stream",
+                "content-type": "application/json",
+                "Authorization": f"Bearer {api_key}",
+            },
+            json={
+                "model": request.MODEL,
+                "messages": [
+                    {"role": "user", "content": request.INPUT_PROMPT}
+                ],
+                "stream": True
+            }
+        )
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=504, detail="Request to Perplexity AI timed out")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=f"Error calling Perplexity AI: {e.request.url} - {e}")
+
+    if upstream.status_code != 200:
+        detail = (await upstream.aread()).decode("utf-8", "replace")
+        await upstream.aclose()
+        raise HTTPException(status_code=upstream.status_code, detail=f"Perplexity API error: {detail}")
+
+    return StreamingResponse(
+        relay_completion_stream(request, upstream),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8002)
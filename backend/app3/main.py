@@ -1,24 +1,42 @@
+import asyncio
+import json
 import os
 import re
 import sys
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
-import httpx
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from database.cache_store import TwoTierCache
 from database.models import create_tables
-from utils.calculations import optimize_prompt_for_green
+from utils.calculations import optimize_prompt_for_green, optimize_prompts_for_green, summarize_green_savings
+from utils.json_stream import iter_json_array, iter_ndjson
+from utils.offload import acquire_offloader, get_offloader, offload, release_offloader
+from utils.http_clients import HTTPClients
+from utils.readiness import Readiness
+from utils.reasoning import ThinkBlockFilter
+from utils.singleflight import SingleFlight
+from utils.tokenizer import TOKENIZER_RETRY_SECONDS, prewarm_tokenizer
+from utils.upstream import ResilientUpstream, UpstreamPolicy
 
 load_dotenv()
 
+# Batch optimization limits (override through environment variables)
+GREEN_BATCH_MAX_PROMPTS = int(os.getenv("GREEN_BATCH_MAX_PROMPTS", "20000"))
+GREEN_BATCH_CHUNK_SIZE = max(1, int(os.getenv("GREEN_BATCH_CHUNK_SIZE", "64")))  # Prompts per offloaded task
+# The rule-based optimizer is pure-Python string work that holds the GIL, so batches use the
+# process pool whatever OFFLOAD_PROCESS_MIN_CHARS says about single requests
+GREEN_BATCH_USE_PROCESSES = os.getenv("GREEN_BATCH_USE_PROCESSES", "true").lower() in ("1", "true", "yes")
+
 app = FastAPI(
     title="Green Prompt Generator API",
     description="API for generating environmentally optimized prompts",
@@ -33,6 +51,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Long-lived HTTP clients (connection pooling and keep-alive across requests)
+http_clients = HTTPClients()
+
+# Coalesces concurrent identical Perplexity calls
+completion_flight = SingleFlight()
+
+# Startup steps reported by /ready
+readiness = Readiness()
+
+# Memo of LLM-generated green prompts keyed by the request fields (rule-based fallbacks are not stored)
+GREEN_MEMO_ENABLED = os.getenv("GREEN_MEMO_ENABLED", "true").lower() in ("1", "true", "yes")
+green_memo = TwoTierCache(
+    "green_prompt",
+    ttl_seconds=float(os.getenv("GREEN_MEMO_TTL_SECONDS", "604800")),
+    memory_entries=int(os.getenv("GREEN_MEMO_MEMORY_ENTRIES", "1024")),
+    max_entries=int(os.getenv("GREEN_MEMO_MAX_ENTRIES", "50000")),
+) if GREEN_MEMO_ENABLED else None
+
+# LLM answers that missed their latency budget but are still memoized when they arrive
+GREEN_LATENCY_BUDGET_MS = float(os.getenv("GREEN_LATENCY_BUDGET_MS", "0"))  # 0 waits for the LLM
+late_answers: Set["asyncio.Task[Optional[str]]"] = set()
+latency_budget_stats = {"budgeted": 0, "budget_missed": 0, "late_answers_memoized": 0}
+
+# Both endpoints fall back to the rule-based optimizer, so they give up on Perplexity sooner than app2
+optimize_upstream = ResilientUpstream(
+    "optimize_green_prompt",
+    lambda: http_clients.perplexity,
+    UpstreamPolicy("optimize_green_prompt", timeout_seconds=30.0, deadline_seconds=40.0, retries=1),
+)
+generate_upstream = ResilientUpstream(
+    "generate_green_prompt",
+    lambda: http_clients.perplexity,
+    UpstreamPolicy("generate_green_prompt", timeout_seconds=30.0, deadline_seconds=40.0, retries=1),
+)
+
+
+# Compiled once; extract_final_prompt runs on every LLM answer
+CODE_FENCE_PATTERN = re.compile(r"``````", flags=re.DOTALL)
+THINK_BLOCK_PATTERN = re.compile(r"<think>.*?</think>", flags=re.DOTALL | re.IGNORECASE)
+ANSWER_LABEL_PATTERN = re.compile(
+    r"^(Here is the optimized prompt:|Here's the optimized prompt:|Optimized Prompt:|Green Prompt:|Final Prompt:)\s*",
+    flags=re.IGNORECASE,
+)
+
 
 def extract_final_prompt(response_text: str) -> str:
     """
@@ -40,16 +102,11 @@ def extract_final_prompt(response_text: str) -> str:
     Removes markdown, conversational text, and unnecessary formatting.
     """
     # Remove code blocks and think tags
-    response_text = re.sub(r"``````", "", response_text, flags=re.DOTALL)
-    response_text = re.sub(r"<think>.*?</think>", "", response_text, flags=re.DOTALL | re.IGNORECASE)
+    response_text = CODE_FENCE_PATTERN.sub("", response_text)
+    response_text = THINK_BLOCK_PATTERN.sub("", response_text)
 
     # Remove common prefixes, headers, and labels
-    response_text = re.sub(
-        r"^(Here is the optimized prompt:|Here's the optimized prompt:|Optimized Prompt:|Green Prompt:|Final Prompt:)\s*",
-        "",
-        response_text,
-        flags=re.IGNORECASE,
-    )
+    response_text = ANSWER_LABEL_PATTERN.sub("", response_text)
 
     # Strip markdown quotes, bold, whitespace
     response_text = response_text.strip().strip("*_`\"'").strip()
@@ -63,6 +120,12 @@ class GreenPromptRequest(BaseModel):
 
 class GreenPromptResponse(BaseModel):
     GREEN_PROMPT: str = Field(..., description="The optimized green prompt response.")
+    CACHED: bool = Field(False, description="Whether the prompt was served from the memo store.")
+
+
+class GreenPromptBatchResponse(BaseModel):
+    RESULTS: List[Dict[str, Any]] = Field(..., description="Per-prompt optimization results (or errors) by index.")
+    SUMMARY: Dict[str, Any] = Field(..., description="Aggregate savings over the optimized prompts.")
 
 
 class GreenPromptGenerationRequest(BaseModel):
@@ -75,11 +138,250 @@ class GreenPromptGenerationResponse(BaseModel):
     GREEN_PROMPT: str
     token_savings: Optional[int] = None
     carbon_savings: Optional[float] = None
+    CACHED: bool = False
 
 
 @app.on_event("startup")
 async def startup():
-    create_tables()
+    acquire_offloader()
+    readiness.run("create_tables", create_tables)
+    # Loaded in the background; /ready reports 503 until it is done
+    readiness.start("tokenizer", prewarm_tokenizer, retry_seconds=TOKENIZER_RETRY_SECONDS)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    readiness.stop()
+    for task in list(late_answers):
+        task.cancel()
+    await http_clients.aclose()
+    release_offloader()
+
+
+async def stream_green_prompt(upstream: ResilientUpstream, headers: dict, payload: dict) -> Optional[str]:
+    """
+    Stream a completion and extract the green prompt as it arrives: the <think> reasoning is
+    dropped chunk by chunk and the stream is closed as soon as the answer is finished.
+    Returns None for an error status or a reasoning block that never closed.
+    """
+    response = await upstream.send(
+        "POST",
+        "/chat/completions",
+        stream=True,
+        headers={**headers, "accept": "text/event-stream"},
+        json={**payload, "stream": True},
+    )
+    try:
+        if response.status_code != 200:
+            return None
+        if not response.headers.get("content-type", "").startswith("text/event-stream"):
+            # The provider answered in one piece
+            await response.aread()
+            return extract_final_prompt(response.json()["choices"][0]["message"]["content"])
+
+        reasoning = ThinkBlockFilter()
+        answer_parts = []
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            try:
+                chunk = json.loads(data)
+            except ValueError:
+                continue
+            choices = chunk.get("choices") or []
+            for choice in choices:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    answer_parts.append(reasoning.feed(content))
+            # The answer is complete; skip the trailing usage and citation chunks
+            if any(choice.get("finish_reason") for choice in choices):
+                break
+
+        answer_parts.append(reasoning.finish())
+        if reasoning.inside:
+            return None
+        return extract_final_prompt("".join(answer_parts))
+    finally:
+        await response.aclose()
+
+
+async def fetch_green_prompt(upstream: ResilientUpstream, headers: dict, payload: dict) -> Optional[str]:
+    """Stream the green prompt for a payload; concurrent identical payloads share one upstream call"""
+    key = json.dumps(payload, sort_keys=True)
+    green_prompt, _ = await completion_flight.do(key, lambda: stream_green_prompt(upstream, headers, payload))
+    return green_prompt
+
+
+def memo_policy(http_request: Request) -> Tuple[bool, bool]:
+    """(look up, store) for a request: Cache-Control no-cache skips the lookup, no-store skips both"""
+    if green_memo is None:
+        return False, False
+    directives = {directive.strip().lower() for directive in http_request.headers.get("cache-control", "").split(",")}
+    if "no-store" in directives:
+        return False, False
+    return "no-cache" not in directives, True
+
+
+def memo_key(endpoint: str, *fields: Optional[str]) -> str:
+    """Memo key for an endpoint and its request fields (None and "" are kept apart)"""
+    return TwoTierCache.make_key(endpoint, json.dumps(fields))
+
+
+def latency_budget(http_request: Request) -> Optional[float]:
+    """Seconds the LLM may take before the rule-based prompt is returned instead, or None to wait"""
+    value = http_request.headers.get("x-latency-budget-ms")
+    if value is None:
+        budget_ms = GREEN_LATENCY_BUDGET_MS
+    else:
+        try:
+            budget_ms = float(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="X-Latency-Budget-Ms must be a number of milliseconds")
+    return budget_ms / 1000 if budget_ms > 0 else None
+
+
+async def llm_green_prompt(upstream: ResilientUpstream, api_key: str, system_prompt: str, user_message: str,
+                           key: str, store: bool) -> Optional[str]:
+    """The green prompt from sonar-reasoning-pro (memoized when store is set), or None if the call fails"""
+    headers = {
+        "accept": "application/json",
+        "content-type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+    }
+
+    payload = {
+        "model": "sonar-reasoning-pro",
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_message},
+        ],
+    }
+
+    try:
+        clean_prompt = await fetch_green_prompt(upstream, headers, payload)
+    except Exception:
+        return None
+    if clean_prompt is None:
+        return None
+
+    if store:
+        await green_memo.set(key, clean_prompt)
+    return clean_prompt
+
+
+def _count_late_answer(task: "asyncio.Task[Optional[str]]") -> None:
+    late_answers.discard(task)
+    if not task.cancelled() and task.result() is not None:
+        latency_budget_stats["late_answers_memoized"] += 1
+
+
+async def race_llm(llm: "asyncio.Task[Optional[str]]", budget: Optional[float], store: bool) -> Optional[str]:
+    """
+    Wait for the LLM answer, at most `budget` seconds when one is set. An answer that misses the
+    budget keeps running in the background if it will be memoized for the next identical request.
+    """
+    if budget is None:
+        return await llm
+
+    latency_budget_stats["budgeted"] += 1
+    done, _ = await asyncio.wait({llm}, timeout=budget)
+    if done:
+        return llm.result()
+
+    latency_budget_stats["budget_missed"] += 1
+    if store:
+        late_answers.add(llm)
+        llm.add_done_callback(_count_late_answer)
+    else:
+        llm.cancel()
+    return None
+
+
+async def optimize_prompt(prompt: str) -> dict:
+    """Run the rule-based optimizer, off the event loop for long prompts"""
+    return await offload(optimize_prompt_for_green, prompt, size=len(prompt))
+
+
+async def read_batch_prompts(request: Request) -> Tuple[List[Tuple[int, str]], List[Dict[str, Any]]]:
+    """Parse a batch body into (index, prompt) pairs and per-item errors"""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = iter_ndjson(request.stream())
+    else:
+        items = iter_json_array(request.stream())
+
+    prompts: List[Tuple[int, str]] = []
+    errors: List[Dict[str, Any]] = []
+    try:
+        index = 0
+        async for value, error in items:
+            if index >= GREEN_BATCH_MAX_PROMPTS:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Batch exceeds the limit of {GREEN_BATCH_MAX_PROMPTS} prompts"
+                )
+            if isinstance(value, dict):
+                value = value.get("USER_PROMPT")
+            if error is None and not isinstance(value, str):
+                error = "Expected a prompt string or an object with USER_PROMPT"
+            if error is None:
+                prompts.append((index, value))
+            else:
+                errors.append({"index": index, "error": error})
+            index += 1
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch body: {str(e)}")
+    return prompts, errors
+
+
+async def optimize_batch(prompts: List[Tuple[int, str]]) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Run the rule-based optimizer over (index, prompt) pairs in chunks, yielding each chunk's
+    results (with their index) as soon as it completes. Small batches run inline, larger ones on
+    the process pool (GREEN_BATCH_USE_PROCESSES) or where the offloader puts a payload that size.
+    """
+    size = sum(len(prompt) for _, prompt in prompts)
+    if size > get_offloader().inline_max_chars and GREEN_BATCH_USE_PROCESSES:
+        kind = "process"
+    else:
+        kind = get_offloader().choose(size)
+
+    async def run_chunk(chunk: List[Tuple[int, str]]) -> List[Dict[str, Any]]:
+        results = await get_offloader().run_in(kind, optimize_prompts_for_green, [prompt for _, prompt in chunk])
+        return [
+            {"index": index, **{key: value for key, value in result.items() if key != "original_prompt"}}
+            for (index, _), result in zip(chunk, results)
+        ]
+
+    tasks = [
+        asyncio.ensure_future(run_chunk(prompts[start:start + GREEN_BATCH_CHUNK_SIZE]))
+        for start in range(0, len(prompts), GREEN_BATCH_CHUNK_SIZE)
+    ]
+    try:
+        for completed in asyncio.as_completed(tasks):
+            yield await completed
+    finally:
+        # Client went away or a chunk failed: drop the chunks that haven't started
+        for task in tasks:
+            task.cancel()
+
+
+async def stream_batch_results(prompts: List[Tuple[int, str]], errors: List[Dict[str, Any]]):
+    """NDJSON: one line per prompt in completion order, then a summary line"""
+    for error in errors:
+        yield json.dumps(error) + "\n"
+    results: List[Dict[str, Any]] = []
+    try:
+        async for chunk in optimize_batch(prompts):
+            results.extend(chunk)
+            yield "".join(json.dumps(result) + "\n" for result in chunk)
+    except Exception as e:
+        yield json.dumps({"error": f"Error optimizing prompt batch: {str(e)}"}) + "\n"
+        return
+    yield json.dumps({"summary": {**summarize_green_savings(results), "failed": len(errors)}}) + "\n"
 
 
 @app.get("/health")
@@ -91,13 +393,52 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """503 until the startup steps (tables, tokenizer warmup) are done"""
+    return JSONResponse(readiness.stats(), status_code=200 if readiness.ready else 503)
+
+
+@app.get("/http-pool-stats")
+async def http_pool_stats():
+    return http_clients.stats()
+
+
+@app.get("/upstream-stats")
+async def upstream_stats():
+    return {upstream.name: upstream.stats() for upstream in (optimize_upstream, generate_upstream)}
+
+
+@app.get("/green-memo-stats")
+async def green_memo_stats():
+    return green_memo.stats() if green_memo is not None else {"enabled": False}
+
+
+@app.get("/latency-budget-stats")
+async def latency_budget_stats_endpoint():
+    return {**latency_budget_stats, "late_answers_pending": len(late_answers)}
+
+
+@app.get("/coalescing-stats")
+async def coalescing_stats():
+    return completion_flight.stats()
+
+
 @app.post("/optimize-green-prompt", response_model=GreenPromptResponse)
-async def optimize_green_prompt(request: GreenPromptRequest):
+async def optimize_green_prompt(request: GreenPromptRequest, http_request: Request):
+    budget = latency_budget(http_request)
     api_key = os.getenv("PERPLEXITY_API_KEY")
 
+    lookup, store = memo_policy(http_request) if api_key else (False, False)
+    key = memo_key("optimize-green-prompt", request.USER_PROMPT)
+    if lookup:
+        memoized = await green_memo.get(key)
+        if memoized is not None:
+            return GreenPromptResponse(GREEN_PROMPT=memoized, CACHED=True)
+
     if not api_key:
         # Fallback to rule-based optimization if API key missing
-        res = optimize_prompt_for_green(request.USER_PROMPT)
+        res = await optimize_prompt(request.USER_PROMPT)
         return GreenPromptResponse(GREEN_PROMPT=res["green_prompt"])
 
     system_prompt = f"""You are an expert Green Prompt Optimizer dedicated to reducing AI prompt token usage and carbon footprint while preserving the complete meaning, clarity, and functionality of the original user prompt.
@@ -114,62 +455,81 @@ Original Prompt:
 Provide ONLY the optimized green prompt, shorter by 20-50%, that maintains full intent and quality.
 """
 
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
+    llm = asyncio.ensure_future(llm_green_prompt(
+        optimize_upstream, api_key, system_prompt, "Generate the optimized green prompt.", key, store
+    ))
+    # With a latency budget the rule-based prompt is prepared while the LLM works
+    rules = asyncio.ensure_future(optimize_prompt(request.USER_PROMPT)) if budget is not None else None
 
-    payload = {
-        "model": "sonar-reasoning-pro",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": "Generate the optimized green prompt."}
-        ],
-    }
+    clean_prompt = await race_llm(llm, budget, store)
+    if clean_prompt is not None:
+        if rules is not None:
+            rules.cancel()
+        return GreenPromptResponse(GREEN_PROMPT=clean_prompt)
 
-    try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload,
-            )
+    # Fallback to rule-based optimization if the LLM failed or missed the budget
+    res = await (rules if rules is not None else optimize_prompt(request.USER_PROMPT))
+    return GreenPromptResponse(GREEN_PROMPT=res["green_prompt"])
 
-        if response.status_code != 200:
-            res = optimize_prompt_for_green(request.USER_PROMPT)
-            return GreenPromptResponse(GREEN_PROMPT=res["green_prompt"])
 
-        response_json = response.json()
-        llm_content = response_json["choices"][0]["message"]["content"]
-        clean_prompt = extract_final_prompt(llm_content)
+@app.post("/optimize-green-prompt/batch", response_model=GreenPromptBatchResponse)
+async def optimize_green_prompt_batch(request: Request, stream: bool = False):
+    """
+    Rule-based optimization of many prompts (NDJSON or JSON-array body of prompt strings or
+    {"USER_PROMPT": ...} objects), run on the process pool. With ?stream=true, results are sent
+    as NDJSON lines as they complete, followed by a summary line.
+    """
+    prompts, errors = await read_batch_prompts(request)
 
-        return GreenPromptResponse(GREEN_PROMPT=clean_prompt)
+    if stream:
+        return StreamingResponse(stream_batch_results(prompts, errors), media_type="application/x-ndjson")
 
-    except Exception:
-        res = optimize_prompt_for_green(request.USER_PROMPT)
-        return GreenPromptResponse(GREEN_PROMPT=res["green_prompt"])
+    try:
+        results: List[Dict[str, Any]] = []
+        async for chunk in optimize_batch(prompts):
+            results.extend(chunk)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error optimizing prompt batch: {str(e)}")
+
+    summary = {**summarize_green_savings(results), "failed": len(errors)}
+    results.extend(errors)
+    results.sort(key=lambda result: result["index"])
+    return GreenPromptBatchResponse(RESULTS=results, SUMMARY=summary)
 
 
 @app.post("/generate-green-prompt", response_model=GreenPromptGenerationResponse)
-async def generate_green_prompt_advanced(request: GreenPromptGenerationRequest):
+async def generate_green_prompt_advanced(request: GreenPromptGenerationRequest, http_request: Request):
+    budget = latency_budget(http_request)
     base_prompt = f"Task: {request.task_intent}"
     if request.strict_guidelines:
         base_prompt += f"\n\nGuidelines:\n{request.strict_guidelines}"
     if request.expected_output:
         base_prompt += f"\n\nExpected Output Format:\n{request.expected_output}"
 
-    optimization_result = optimize_prompt_for_green(base_prompt)
-    token_savings = optimization_result.get("token_reduction", 0)
-    carbon_savings = optimization_result.get("carbon_savings_gco2", 0)
+    # The rule-based optimization (needed for the savings figures) runs alongside the LLM call
+    rules = asyncio.ensure_future(optimize_prompt(base_prompt))
 
     api_key = os.getenv("PERPLEXITY_API_KEY")
+    lookup, store = memo_policy(http_request) if api_key else (False, False)
+    key = memo_key("generate-green-prompt", request.task_intent, request.strict_guidelines, request.expected_output)
+    if lookup:
+        memoized = await green_memo.get(key)
+        if memoized is not None:
+            optimization_result = await rules
+            return GreenPromptGenerationResponse(
+                GREEN_PROMPT=memoized,
+                token_savings=optimization_result.get("token_reduction", 0),
+                carbon_savings=optimization_result.get("carbon_savings_gco2", 0),
+                CACHED=True,
+            )
+
     if not api_key:
         # Fallback rule-based
+        optimization_result = await rules
         return GreenPromptGenerationResponse(
             GREEN_PROMPT=optimization_result["green_prompt"],
-            token_savings=token_savings,
-            carbon_savings=carbon_savings,
+            token_savings=optimization_result.get("token_reduction", 0),
+            carbon_savings=optimization_result.get("carbon_savings_gco2", 0),
         )
 
     system_prompt = f"""You are an AI prompt engineer specialized in generating carbon-efficient prompts that maintain full task fidelity.
@@ -188,57 +548,24 @@ TASK:
         "while maintaining all functional and quality requirements. Return ONLY the final optimized green prompt."
     )
 
-    headers = {
-        "accept": "application/json",
-        "content-type": "application/json",
-        "Authorization": f"Bearer {api_key}",
-    }
-
-    payload = {
-        "model": "sonar-reasoning-pro",
-        "messages": [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": "Generate the green prompt."},
-        ],
-    }
-
-    try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            response = await client.post(
-                "https://api.perplexity.ai/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-
-        if response.status_code != 200:
-            return GreenPromptGenerationResponse(
-                GREEN_PROMPT=optimization_result["green_prompt"],
-                token_savings=token_savings,
-                carbon_savings=carbon_savings,
-            )
-
-        response_json = response.json()
-        llm_content = response_json["choices"][0]["message"]["content"]
-        clean_prompt = extract_final_prompt(llm_content)
-
-        return GreenPromptGenerationResponse(
-            GREEN_PROMPT=clean_prompt,
-            token_savings=token_savings,
-            carbon_savings=carbon_savings,
-        )
-
-    except Exception:
-        return GreenPromptGenerationResponse(
-            GREEN_PROMPT=optimization_result["green_prompt"],
-            token_savings=token_savings,
-            carbon_savings=carbon_savings,
-        )
+    llm = asyncio.ensure_future(llm_green_prompt(
+        generate_upstream, api_key, system_prompt, "Generate the green prompt.", key, store
+    ))
+    clean_prompt = await race_llm(llm, budget, store)
+    optimization_result = await rules
+
+    # Fallback rule-based if the LLM failed or missed the budget
+    return GreenPromptGenerationResponse(
+        GREEN_PROMPT=clean_prompt if clean_prompt is not None else optimization_result["green_prompt"],
+        token_savings=optimization_result.get("token_reduction", 0),
+        carbon_savings=optimization_result.get("carbon_savings_gco2", 0),
+    )
 
 
 @app.get("/optimization-analysis/{user_prompt}")
 async def get_optimization_analysis(user_prompt: str):
     try:
-        analysis = optimize_prompt_for_green(user_prompt)
+        analysis = await optimize_prompt(user_prompt)
         recommendations = [
             "Remove excessive politeness words",
             "Consolidate redundant phrases",
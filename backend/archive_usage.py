@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Move closed days of usage_records into the Parquet archive (cold tier)
+Every UTC day older than --keep-days is written to USAGE_ARCHIVE_DIR/date=YYYY-MM-DD/usage.parquet
+and deleted from usage_records. The rollups keep their totals and /analytics/range still reads
+the archived days, so this can run daily from cron:
+
+    python archive_usage.py --keep-days 30
+"""
+
+import argparse
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.archive import USAGE_ARCHIVE_AFTER_DAYS, UsageArchive, archive_cutoff, live_days_before
+from database.models import SessionLocal, create_tables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keep-days", type=int, default=USAGE_ARCHIVE_AFTER_DAYS,
+                        help="days kept in usage_records (default: USAGE_ARCHIVE_AFTER_DAYS)")
+    parser.add_argument("--dry-run", action="store_true", help="only list the days that would be archived")
+    args = parser.parse_args()
+
+    create_tables()
+    archive = UsageArchive()
+    db = SessionLocal()
+    try:
+        if args.dry_run:
+            days = live_days_before(db, archive_cutoff(args.keep_days))
+            print(f"{len(days)} day(s) would be archived to {archive.root}")
+            for day in days:
+                print(f"  {day.isoformat()}")
+            return
+
+        moved = archive.archive_closed_days(db, keep_days=args.keep_days)
+        for day, rows in moved.items():
+            print(f"  {day.isoformat()}: {rows} rows")
+        print(f"Archived {sum(moved.values())} usage records from {len(moved)} day(s) to {archive.root}.")
+    except Exception as e:
+        print(f"Error archiving usage: {str(e)}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
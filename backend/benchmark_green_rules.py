@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Green prompt rewrite benchmark on prompts from 10 KB to 1 MB:
+- legacy: the former hard-coded passes, re-lowercasing the prompt for every politeness rule
+- rules: the rule file applied by RewriteRules to the prompt lowercased once (must match legacy)
+- one-pass: all rules compiled into one alternation regex and rewritten in a single re.sub scan,
+  for reference (it only matches legacy when no rewrite forms or overlaps another rule's match)
+
+    python benchmark_green_rules.py --sizes 10000 100000 1000000 --repeat 5
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.green_rules import GREEN_RULES_PATH, get_green_rules
+
+PARAGRAPH = (
+    "Hello! Could you please give me a detailed and comprehensive overview of how solar panels work? "
+    "I would really appreciate it if the explanation should be provided in simple terms, covering "
+    "all the important aspects of photovoltaic cells, inverters and batteries. Various different "
+    "installation options are highly important to me, so examples should be given where possible. "
+    "Thank you very much for your help with this question about renewable energy systems.\n"
+)
+
+
+def legacy_rewrite(prompt, groups):
+    """Steps 1-3 as they were: lower() and replace per politeness rule, then one replace per rule"""
+    for verbose, concise in groups[0].items():
+        prompt = prompt.lower().replace(verbose, concise)
+    for group in groups[1:]:
+        for pattern, replacement in group.items():
+            prompt = prompt.replace(pattern, replacement)
+    return prompt
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(GREEN_RULES_PATH, encoding="utf-8") as rule_file:
+        groups = [group["rules"] for group in json.load(rule_file)["replacements"]]
+    rewrite = get_green_rules().rewrite
+    replacements = dict(reversed(rewrite.rules))
+    one_pass = re.compile("|".join(re.escape(pattern) for pattern in sorted(replacements, key=len, reverse=True)))
+
+    print(f"{'size':>10}  {'legacy':>10}  {'rules':>10}  {'one-pass':>10}")
+    for size in args.sizes:
+        prompt = (PARAGRAPH * (size // len(PARAGRAPH) + 1))[:size]
+        legacy_seconds, expected = best_of(args.repeat, legacy_rewrite, prompt, groups)
+        rules_seconds, result = best_of(args.repeat, lambda text: rewrite.apply(text.lower()), prompt)
+        if result != expected:
+            raise SystemExit(f"Rule file output differs from legacy for a {size}-character prompt")
+        one_pass_seconds, _ = best_of(
+            args.repeat, lambda text: one_pass.sub(lambda match: replacements[match.group()], text.lower()), prompt
+        )
+        print(f"{size / 1000:7.0f} KB  {legacy_seconds * 1000:7.2f} ms  {rules_seconds * 1000:7.2f} ms  "
+              f"{one_pass_seconds * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
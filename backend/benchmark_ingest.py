@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Ingestion benchmark: per-request commits (current /store-usage path) vs write-behind group commit.
+Each mode writes into its own throwaway SQLite database.
+
+    python benchmark_ingest.py --records 5000 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.models import Base, UsageRecord, get_llm_model
+from database.migrations import run_migrations
+from database.ingest import UsageWriter, build_usage_row
+from database.rollups import apply_usage_to_rollups
+from utils.calculations import calculate_costs_and_metrics
+
+MODELS = ["sonar-reasoning-pro", "sonar-pro", "sonar"]
+PROMPT = "Explain how solar panels generate electricity"
+RESPONSE = "Solar panels convert sunlight into electricity through photovoltaic cells. " * 4
+
+
+def make_session_factory(path):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    return engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def per_request_commit(session_factory, records, concurrency, metrics):
+    """One session, INSERT and COMMIT per record, like the direct /store-usage path"""
+    errors = 0
+
+    def store(i):
+        nonlocal errors
+        db = session_factory()
+        try:
+            model = MODELS[i % len(MODELS)]
+            record = UsageRecord(
+                model_ref=get_llm_model(db, model),
+                input_prompt=PROMPT,
+                output_prompt=RESPONSE,
+                created_at=datetime.utcnow(),
+                **metrics[model]
+            )
+            db.add(record)
+            apply_usage_to_rollups(db, [record])
+            db.commit()
+            db.refresh(record)
+        except Exception:
+            errors += 1
+            db.rollback()
+        finally:
+            db.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(store, range(records)))
+    return time.perf_counter() - started, errors
+
+
+async def write_behind(session_factory, records, concurrency, metrics, durability):
+    """Concurrent submitters feeding one background group-commit writer"""
+    writer = UsageWriter(session_factory, durability=durability)
+    await writer.start()
+
+    async def submitter(offset):
+        for i in range(offset, records, concurrency):
+            model = MODELS[i % len(MODELS)]
+            await writer.submit(build_usage_row(PROMPT, RESPONSE, model, metrics[model]))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submitter(offset) for offset in range(concurrency)))
+    await writer.stop()
+    return time.perf_counter() - started, writer.rows_failed, writer.batches_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--durability", choices=["commit", "enqueue"], default="commit")
+    args = parser.parse_args()
+
+    metrics = {model: calculate_costs_and_metrics(PROMPT, RESPONSE, model) for model in MODELS}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, factory = make_session_factory(os.path.join(tmp, "per_request.db"))
+        elapsed, errors = per_request_commit(factory, args.records, args.concurrency, metrics)
+        engine.dispose()
+        print(f"Per-request commit : {args.records / elapsed:10.0f} inserts/s "
+              f"({elapsed:.2f}s, {errors} failed)")
+
+        engine, factory = make_session_factory(os.path.join(tmp, "write_behind.db"))
+        elapsed, errors, batches = asyncio.run(
+            write_behind(factory, args.records, args.concurrency, metrics, args.durability)
+        )
+        engine.dispose()
+        print(f"Write-behind ({args.durability}): {args.records / elapsed:10.0f} inserts/s "
+              f"({elapsed:.2f}s, {batches} batches, {errors} failed)")
+
+
+if __name__ == "__main__":
+    main()
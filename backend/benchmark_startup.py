@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: for each app, the module import time in a fresh interpreter and the time
+from launching uvicorn until /ready answers 200 and a first real request succeeds.
+Exits with status 1 when a median exceeds its budget, so it can gate cold-start regressions.
+Every launch gets an empty SQLite database and archive directory in a temporary directory, so runs
+start alike and never touch database/analytics.db.
+
+    python benchmark_startup.py --targets app1 app2 app3 combined --repeat 3 \
+        --max-import-seconds 2.5 --max-first-request-seconds 10
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Module, /ready path and a first request that needs no Perplexity call
+TARGETS = {
+    "app1": ("app1.main", "/ready", "/analytics"),
+    "app2": ("app2.main", "/ready", "/health"),
+    "app3": ("app3.main", "/ready", "/optimization-analysis/Could you please explain solar panels"),
+    "combined": ("combined.main", "/ready", "/app3/optimization-analysis/Could you please explain solar panels"),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_seconds(module):
+    """Import time of module in a new interpreter"""
+    code = f"import time; started = time.perf_counter(); import {module}; print(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, check=True,
+                            capture_output=True, text=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def wait_for(client, url, deadline):
+    while time.monotonic() < deadline:
+        try:
+            if client.get(url).status_code == 200:
+                return time.monotonic()
+        except httpx.TransportError:
+            pass
+        time.sleep(0.02)
+    raise TimeoutError(f"{url} did not answer 200 in time")
+
+
+def cold_start(module, ready_path, first_path, timeout):
+    """(seconds until /ready is 200, seconds until the first request succeeded) after launch"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'analytics.db')}",
+            "USAGE_ARCHIVE_DIR": os.path.join(tmp, "archive"),
+        }
+        started = time.monotonic()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", f"{module}:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env,
+        )
+        try:
+            with httpx.Client(timeout=timeout) as client:
+                ready = wait_for(client, base_url + ready_path, started + timeout)
+                first = wait_for(client, base_url + first_path, started + timeout)
+            return ready - started, first - started
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--targets", nargs="+", choices=list(TARGETS), default=list(TARGETS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-import-seconds", type=float, default=2.5)
+    parser.add_argument("--max-first-request-seconds", type=float, default=10.0)
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'target':>10}  {'import':>9}  {'ready':>9}  {'first request':>13}")
+    for target in args.targets:
+        module, ready_path, first_path = TARGETS[target]
+        imports, readies, firsts = [], [], []
+        for _ in range(args.repeat):
+            imports.append(import_seconds(module))
+            ready, first = cold_start(module, ready_path, first_path, args.timeout)
+            readies.append(ready)
+            firsts.append(first)
+        import_median, ready_median, first_median = (statistics.median(values) for values in (imports, readies, firsts))
+        print(f"{target:>10}  {import_median:8.2f}s  {ready_median:8.2f}s  {first_median:12.2f}s")
+
+        if import_median > args.max_import_seconds:
+            failures.append(f"{target}: import took {import_median:.2f}s (budget {args.max_import_seconds:.2f}s)")
+        if first_median > args.max_first_request_seconds:
+            failures.append(f"{target}: first request after {first_median:.2f}s "
+                            f"(budget {args.max_first_request_seconds:.2f}s)")
+
+    for failure in failures:
+        print(f"Startup budget exceeded - {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
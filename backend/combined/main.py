@@ -0,0 +1,74 @@
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from datetime import datetime
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app1 import main as analytics_api
+from app2 import main as llm_api
+from app3 import main as green_api
+
+# Each service keeps its own paths under a prefix, e.g. http://localhost:8000/app2/call-llm
+# instead of http://localhost:8002/call-llm
+MOUNTS = [
+    ("/app1", analytics_api.app),
+    ("/app2", llm_api.app),
+    ("/app3", green_api.app),
+]
+
+app = FastAPI(
+    title="LLM Analytics Backend",
+    description="Analytics, LLM Calling and Green Prompt APIs served from one process",
+    version="1.0.0"
+)
+
+for prefix, service in MOUNTS:
+    app.mount(prefix, service)
+
+# app2 stores usage through app1 directly instead of posting it to localhost:8001
+llm_api.usage_sink = analytics_api.store_usage_events
+
+# Each mounted app's module tracks its own startup steps
+READINESS = {
+    "/app1": analytics_api.readiness,
+    "/app2": llm_api.readiness,
+    "/app3": green_api.readiness,
+}
+
+# Mounted apps don't receive lifespan events, so their hooks run from here
+@app.on_event("startup")
+async def startup():
+    for _, service in MOUNTS:
+        await service.router.startup()
+
+# Reverse order: app2 flushes its queued usage into app1 before app1 stops
+@app.on_event("shutdown")
+async def shutdown():
+    for _, service in reversed(MOUNTS):
+        await service.router.shutdown()
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {
+        "status": "healthy",
+        "timestamp": datetime.utcnow(),
+        "service": "LLM Analytics Backend",
+        "mounts": {prefix: service.title for prefix, service in MOUNTS}
+    }
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until every mounted app has finished starting up"""
+    ready = all(readiness.ready for readiness in READINESS.values())
+    return JSONResponse(
+        {"ready": ready, "mounts": {prefix: readiness.stats() for prefix, readiness in READINESS.items()}},
+        status_code=200 if ready else 503
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,311 @@
+import functools
+import operator
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, delete, func, select
+from sqlalchemy.orm import Session
+
+from database.models import LLMModel, UsageRecord
+from database.rollups import ROLLUP_METRICS, SUMMED_USAGE_COLUMNS, _empty_metrics, grouped_usage_sums
+
+if TYPE_CHECKING:
+    import pyarrow
+
+# Cold tier settings (override through environment variables)
+USAGE_ARCHIVE_DIR = os.getenv("USAGE_ARCHIVE_DIR", "./database/archive")
+USAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("USAGE_ARCHIVE_AFTER_DAYS", "30"))  # Days kept in usage_records
+USAGE_ARCHIVE_COMPRESSION = os.getenv("USAGE_ARCHIVE_COMPRESSION", "zstd")
+USAGE_ARCHIVE_ROW_GROUP_SIZE = int(os.getenv("USAGE_ARCHIVE_ROW_GROUP_SIZE", "8192"))
+
+PARTITION_PREFIX = "date="
+ARCHIVE_FILE = "usage.parquet"
+
+# usage_records columns kept in the archive; model_id is replaced by the model name
+ARCHIVED_COLUMNS = [column for column in UsageRecord.__table__.columns if column.name != "model_id"]
+_DELETE_BATCH = 500  # ids per DELETE, below SQLite's bound-parameter limit
+
+ROUNDING = {"total_cost": 6, "energy_consumed": 8, "energy_avoided": 8, "carbon_emission": 4, "carbon_avoided": 4}
+
+
+def _pyarrow():
+    """pyarrow, imported on first use: only the Parquet tier needs it"""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("The Parquet usage archive needs pyarrow (pip install pyarrow)") from exc
+    return pyarrow
+
+
+def archive_schema() -> "pyarrow.Schema":
+    """Arrow schema of the archive files"""
+    pa = _pyarrow()
+    types = ((Boolean, pa.bool_()), (Integer, pa.int64()), (Float, pa.float64()), (DateTime, pa.timestamp("us")))
+    fields = [pa.field("model", pa.string(), nullable=False)]
+    for column in ARCHIVED_COLUMNS:
+        arrow_type = next((arrow for sql, arrow in types if isinstance(column.type, sql)), pa.string())
+        fields.append(pa.field(column.name, arrow_type, nullable=False))
+    return pa.schema(fields)
+
+
+def day_range(first: date, last: date) -> Tuple[datetime, datetime]:
+    """[start, end) timestamps covering the UTC days first..last"""
+    return datetime.combine(first, time.min), datetime.combine(last + timedelta(days=1), time.min)
+
+
+def archive_cutoff(keep_days: int = USAGE_ARCHIVE_AFTER_DAYS, today: Optional[date] = None) -> date:
+    """First day kept in usage_records; the current day always stays open"""
+    return (today or datetime.utcnow().date()) - timedelta(days=max(keep_days, 1))
+
+
+def _as_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+class UsageArchive:
+    """
+    Cold tier of usage_records: closed UTC days as Parquet files, <root>/date=YYYY-MM-DD/usage.parquet.
+    Rows are sorted by created_at and stored in compressed row groups with min/max statistics, so a
+    range scan skips other days by directory and the parts of a day outside the range by statistics.
+    The rollup tables keep counting archived rows; only usage_records shrinks.
+    """
+
+    def __init__(self, root: str = USAGE_ARCHIVE_DIR, compression: str = USAGE_ARCHIVE_COMPRESSION,
+                 row_group_size: int = USAGE_ARCHIVE_ROW_GROUP_SIZE):
+        self.root = root
+        self.compression = compression
+        self.row_group_size = row_group_size
+
+    def _day_path(self, day: date) -> str:
+        return os.path.join(self.root, f"{PARTITION_PREFIX}{day.isoformat()}", ARCHIVE_FILE)
+
+    def days(self) -> List[date]:
+        """Archived days, from the directory names (no Parquet access)"""
+        if not os.path.isdir(self.root):
+            return []
+        days = []
+        for name in os.listdir(self.root):
+            if not name.startswith(PARTITION_PREFIX):
+                continue
+            try:
+                day = date.fromisoformat(name[len(PARTITION_PREFIX):])
+            except ValueError:
+                continue
+            if os.path.exists(self._day_path(day)):
+                days.append(day)
+        return sorted(days)
+
+    def write_day(self, db: Session, day: date) -> List[int]:
+        """
+        Write the rows usage_records holds for a day into the day's file, merging them with rows
+        archived earlier; returns their ids (the caller deletes them from usage_records)
+        """
+        pa = _pyarrow()
+        start, end = day_range(day, day)
+        rows = db.execute(
+            select(LLMModel.name.label("model"), *ARCHIVED_COLUMNS)
+            .join(LLMModel, UsageRecord.model_id == LLMModel.id)
+            .where(UsageRecord.created_at >= start, UsageRecord.created_at < end)
+        ).all()
+        if not rows:
+            return []
+
+        table = pa.Table.from_pylist([row._asdict() for row in rows], schema=archive_schema())
+        path = self._day_path(day)
+        if os.path.exists(path):
+            # Late rows for an archived day; the same ids again if an earlier delete never committed
+            existing = pa.parquet.ParquetFile(path).read()
+            existing = existing.filter(pa.compute.invert(pa.compute.is_in(existing["id"], value_set=table["id"])))
+            table = pa.concat_tables([existing, table])
+        table = table.sort_by([("created_at", "ascending"), ("id", "ascending")])
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Dot-prefixed files are ignored by dataset scans until the rename publishes them
+        partial = os.path.join(os.path.dirname(path), f".{ARCHIVE_FILE}.partial")
+        pa.parquet.write_table(table, partial, compression=self.compression, row_group_size=self.row_group_size)
+        os.replace(partial, path)
+        return [row.id for row in rows]
+
+    def archive_day(self, db: Session, day: date) -> int:
+        """Move a day of usage_records into the archive; returns the number of rows moved"""
+        ids = self.write_day(db, day)
+        for index in range(0, len(ids), _DELETE_BATCH):
+            db.execute(delete(UsageRecord).where(UsageRecord.id.in_(ids[index:index + _DELETE_BATCH])))
+        db.commit()
+        return len(ids)
+
+    def archive_closed_days(self, db: Session, keep_days: int = USAGE_ARCHIVE_AFTER_DAYS,
+                            today: Optional[date] = None) -> Dict[date, int]:
+        """Archive every day before archive_cutoff(keep_days); returns the rows moved per day"""
+        return {day: self.archive_day(db, day) for day in live_days_before(db, archive_cutoff(keep_days, today))}
+
+    def scan(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+             columns: Optional[List[str]] = None, exclude_ids: Iterable[int] = (),
+             days: Optional[Iterable[date]] = None) -> Tuple["pyarrow.Table", Dict[str, int]]:
+        """
+        Archived rows with start <= created_at < end (either bound optional), minus exclude_ids and
+        limited to `days` when given, and how many files and row groups had to be read
+        """
+        pa = _pyarrow()
+        ds = pa.dataset
+        stats = {"files": 0, "row_groups": 0, "rows": 0}
+        if not self.days():
+            schema = archive_schema()
+            return schema.empty_table().select(columns or schema.names), stats
+
+        dataset = ds.dataset(
+            self.root, format="parquet",
+            partitioning=ds.partitioning(pa.schema([("date", pa.date32())]), flavor="hive"),
+        )
+        conditions = []
+        if start is not None:
+            conditions += [ds.field("date") >= start.date(),
+                           ds.field("created_at") >= pa.scalar(start, pa.timestamp("us"))]
+        if end is not None:
+            conditions += [ds.field("date") <= (end - timedelta(microseconds=1)).date(),
+                           ds.field("created_at") < pa.scalar(end, pa.timestamp("us"))]
+        if days is not None:
+            conditions.append(ds.field("date").isin(list(days)))
+        excluded = list(exclude_ids)
+        if excluded:
+            conditions.append(~ds.field("id").isin(excluded))
+        expression = functools.reduce(operator.and_, conditions) if conditions else None
+
+        # Partition pruning drops the other days' files, then the created_at statistics drop row groups
+        fragments = list(dataset.get_fragments(filter=expression)) if expression is not None else list(dataset.get_fragments())
+        row_groups = [group for fragment in fragments for group in fragment.split_by_row_group(expression, schema=dataset.schema)]
+        tables = [group.to_table(schema=dataset.schema, columns=columns, filter=expression) for group in row_groups]
+        table = pa.concat_tables(tables) if tables else dataset.schema.empty_table().select(columns or dataset.schema.names)
+        stats.update(files=len(fragments), row_groups=len(row_groups), rows=table.num_rows)
+        return table, stats
+
+    def grouped_sums(self, bucket: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                     exclude_ids: Iterable[int] = (), days: Optional[Iterable[date]] = None
+                     ) -> Tuple[Dict[Tuple[Any, str], Dict[str, Any]], Dict[str, int]]:
+        """Rollup metrics of the archived rows in range grouped by ("hour" or "day", model), plus scan stats"""
+        days = None if days is None else list(days)
+        if not self.days() or days == []:
+            return {}, {"files": 0, "row_groups": 0, "rows": 0}
+        pa = _pyarrow()
+        pc = pa.compute
+        columns = ["id", "model", "created_at", "cache_hit", *SUMMED_USAGE_COLUMNS]
+        table, stats = self.scan(start, end, columns, exclude_ids, days)
+        if bucket == "hour":
+            buckets = pc.floor_temporal(table["created_at"], unit="hour")
+        else:
+            buckets = pc.cast(table["created_at"], pa.date32())
+        table = table.append_column("bucket", buckets).append_column("cache_hits", pc.cast(table["cache_hit"], pa.int64()))
+
+        summed = (*SUMMED_USAGE_COLUMNS, "cache_hits")
+        grouped = table.group_by(["bucket", "model"]).aggregate([("id", "count")] + [(name, "sum") for name in summed])
+        sums = {}
+        for row in grouped.to_pylist():
+            metrics = {name: row[f"{name}_sum"] for name in summed}
+            metrics["request_count"] = row["id_count"]
+            sums[(row["bucket"], row["model"])] = metrics
+        return sums, stats
+
+
+_archive: Optional[UsageArchive] = None
+_archive_lock = threading.Lock()
+
+
+def get_usage_archive() -> UsageArchive:
+    """Return the process-wide archive at USAGE_ARCHIVE_DIR"""
+    global _archive
+    if _archive is None:
+        with _archive_lock:
+            if _archive is None:
+                _archive = UsageArchive()
+    return _archive
+
+
+def live_days_before(db: Session, cutoff: date) -> List[date]:
+    """UTC days before cutoff that still have rows in usage_records"""
+    day = func.date(UsageRecord.created_at)
+    rows = db.query(day).filter(UsageRecord.created_at < datetime.combine(cutoff, time.min)).distinct().all()
+    return sorted(_as_date(value) for value, in rows)
+
+
+def _days_in_range(days: Iterable[date], start: Optional[datetime], end: Optional[datetime]) -> List[date]:
+    return [
+        day for day in days
+        if (start is None or day >= start.date()) and (end is None or datetime.combine(day, time.min) < end)
+    ]
+
+
+def live_sums_and_overlap(db: Session, archive: UsageArchive, bucket, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> Tuple[list, Set[int], List[date]]:
+    """
+    grouped_usage_sums of usage_records, the ids of its rows on archived days (late rows, or an
+    archive run whose delete hasn't committed) and the archived days in range. A scan of just those
+    days without those ids counts every row once: the archive is listed before and after the
+    statement, and the statement is repeated if a day was published in between, so any day
+    published later still had all its rows in usage_records when the statement ran.
+    """
+    days = _days_in_range(archive.days(), start, end)
+    while True:
+        rows, overlap = grouped_usage_sums(db, bucket, start, end, ids_on_days=days)
+        listed = _days_in_range(archive.days(), start, end)
+        if listed == days:
+            return rows, overlap, days
+        days = listed
+
+
+def live_daily_sums(db: Session, archive: UsageArchive, start: datetime,
+                    end: datetime) -> Tuple[Dict[Tuple[date, str], Dict[str, Any]], Set[int], List[date]]:
+    """live_sums_and_overlap for [start, end) grouped by (UTC day, model)"""
+    rows, overlap, days = live_sums_and_overlap(db, archive, func.date(UsageRecord.created_at), start, end)
+    sums = {(_as_date(row.bucket), row.model): {name: getattr(row, name) or 0 for name in ROLLUP_METRICS} for row in rows}
+    return sums, overlap, days
+
+
+def _rounded(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: round(value, ROUNDING[name]) if name in ROUNDING else value for name, value in metrics.items()}
+
+
+def usage_range_report(first: date, last: date, live: Dict[Tuple[date, str], Dict[str, Any]],
+                       archived: Dict[Tuple[date, str], Dict[str, Any]], stats: Dict[str, int]) -> Dict[str, Any]:
+    """Combine the per-day sums of both tiers into the /analytics/range payload"""
+    daily: Dict[Tuple[date, str], Dict[str, Any]] = {}
+    totals = _empty_metrics()
+    for part in (live, archived):
+        for key, sums in part.items():
+            merged = daily.setdefault(key, _empty_metrics())
+            for name in ROLLUP_METRICS:
+                merged[name] += sums[name]
+                totals[name] += sums[name]
+
+    return {
+        "start": first.isoformat(),
+        "end": last.isoformat(),
+        "daily": [
+            {"date": day.isoformat(), "model": model, **_rounded(sums)}
+            for (day, model), sums in sorted(daily.items())
+        ],
+        "totals": _rounded(totals),
+        "sources": {
+            "live_rows": sum(sums["request_count"] for sums in live.values()),
+            "archived_rows": stats["rows"],
+            "archive_files_read": stats["files"],
+            "archive_row_groups_read": stats["row_groups"],
+        },
+    }
+
+
+def usage_by_day(db: Session, first: date, last: date, archive: Optional[UsageArchive] = None) -> Dict[str, Any]:
+    """Daily usage per model for the UTC days first..last from usage_records and the archive"""
+    archive = archive or get_usage_archive()
+    start, end = day_range(first, last)
+    live, overlap, days = live_daily_sums(db, archive, start, end)
+    archived, stats = archive.grouped_sums("day", start, end, overlap, days)
+    return usage_range_report(first, last, live, archived, stats)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database.models import AsyncSessionLocal, CacheEntry, dialect_insert
+
+
+class TwoTierCache:
+    """
+    Exact-match cache of JSON values: an in-process LRU in front of the cache_entries table.
+    Entries expire after ttl_seconds and both tiers are size-bounded, evicting the least
+    recently used entries first. Disk errors degrade to cache misses.
+    """
+
+    def __init__(self, namespace: str, ttl_seconds: float, memory_entries: int, max_entries: int,
+                 session_factory: Callable[[], AsyncSession] = AsyncSessionLocal,
+                 evict_every: int = 100):
+        self.namespace = namespace
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        self.evict_every = max(1, evict_every)
+        self._memory: "OrderedDict[str, Tuple[datetime, str]]" = OrderedDict()  # key -> (expires_at, json)
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evicted = 0
+        self.errors = 0
+
+    @staticmethod
+    def make_key(*parts: str) -> str:
+        """Stable key for the given lookup parts (e.g. model and normalized prompt)"""
+        return hashlib.sha256("\x00".join(parts).encode("utf-8", "surrogatepass")).hexdigest()
+
+    def _remember(self, key: str, expires_at: datetime, value: str) -> None:
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss or expired entry"""
+        now = datetime.utcnow()
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return json.loads(value)
+            del self._memory[key]
+
+        try:
+            async with self.session_factory() as db:
+                row = (await db.execute(
+                    select(CacheEntry.value, CacheEntry.expires_at).where(
+                        CacheEntry.namespace == self.namespace,
+                        CacheEntry.key == key,
+                        CacheEntry.expires_at > now,
+                    )
+                )).one_or_none()
+                if row is not None:
+                    await db.execute(
+                        update(CacheEntry)
+                        .where(CacheEntry.namespace == self.namespace, CacheEntry.key == key)
+                        .values(last_used_at=now)
+                    )
+                    await db.commit()
+        except Exception as exc:
+            self.errors += 1
+            print(f"Warning: {self.namespace} cache lookup failed: {exc}")
+            row = None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, row.expires_at, row.value)
+        return json.loads(row.value)
+
+    async def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers"""
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        serialized = json.dumps(value, separators=(",", ":"))
+        self._remember(key, expires_at, serialized)
+
+        try:
+            async with self.session_factory() as db:
+                statement = dialect_insert(db.bind, CacheEntry.__table__).values(
+                    namespace=self.namespace,
+                    key=key,
+                    value=serialized,
+                    created_at=now,
+                    expires_at=expires_at,
+                    last_used_at=now,
+                )
+                await db.execute(statement.on_conflict_do_update(
+                    index_elements=["namespace", "key"],
+                    set_={"value": serialized, "created_at": now, "expires_at": expires_at, "last_used_at": now},
+                ))
+                self.writes += 1
+                if self.writes % self.evict_every == 0:
+                    await self._evict(db, now)
+                await db.commit()
+        except Exception as exc:
+            self.errors += 1
+            print(f"Warning: {self.namespace} cache write failed: {exc}")
+
+    async def _evict(self, db: AsyncSession, now: datetime) -> None:
+        """Drop expired entries, then the least recently used ones beyond max_entries"""
+        namespace = CacheEntry.namespace == self.namespace
+        expired = await db.execute(delete(CacheEntry).where(namespace, CacheEntry.expires_at <= now))
+        self.evicted += expired.rowcount or 0
+
+        count = (await db.execute(select(func.count()).select_from(CacheEntry).where(namespace))).scalar_one()
+        excess = count - self.max_entries
+        if excess > 0:
+            oldest = select(CacheEntry.key).where(namespace).order_by(CacheEntry.last_used_at).limit(excess)
+            evicted = await db.execute(delete(CacheEntry).where(namespace, CacheEntry.key.in_(oldest)))
+            self.evicted += evicted.rowcount or 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "namespace": self.namespace,
+            "memory_entries": len(self._memory),
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evicted": self.evicted,
+            "errors": self.errors,
+        }
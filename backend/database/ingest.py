@@ -0,0 +1,196 @@
+import asyncio
+import os
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from database.models import UsageRecord, get_llm_model
+from database.rollups import apply_usage_to_rollups
+
+# Ingestion settings (override through environment variables)
+USAGE_INGEST_MODE = os.getenv("USAGE_INGEST_MODE", "direct")  # "direct" or "write_behind"
+USAGE_INGEST_BATCH_SIZE = int(os.getenv("USAGE_INGEST_BATCH_SIZE", "500"))
+USAGE_INGEST_FLUSH_MS = float(os.getenv("USAGE_INGEST_FLUSH_MS", "50"))
+USAGE_INGEST_QUEUE_SIZE = int(os.getenv("USAGE_INGEST_QUEUE_SIZE", "10000"))
+USAGE_INGEST_DURABILITY = os.getenv("USAGE_INGEST_DURABILITY", "commit")  # "commit" or "enqueue"
+
+
+def build_usage_row(input_prompt: str, output_prompt: str, model: str, metrics: Dict[str, Any],
+                    created_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """Flatten one usage event into the column values of a usage_records row"""
+    return {
+        "model": model,
+        "prompt_tokens": metrics["prompt_tokens"],
+        "completion_tokens": metrics["completion_tokens"],
+        "total_tokens": metrics["total_tokens"],
+        "search_context_size": metrics["search_context_size"],
+        "input_tokens_cost": metrics["input_tokens_cost"],
+        "output_tokens_cost": metrics["output_tokens_cost"],
+        "request_cost": metrics["request_cost"],
+        "total_cost": metrics["total_cost"],
+        "input_prompt": input_prompt,
+        "output_prompt": output_prompt,
+        "created_at": created_at or datetime.utcnow(),
+        "energy_consumed": metrics["energy_consumed"],
+        "carbon_emission": metrics["carbon_emission"],
+        "cache_hit": metrics.get("cache_hit", False),
+        "energy_avoided": metrics.get("energy_avoided", 0.0),
+        "carbon_avoided": metrics.get("carbon_avoided", 0.0),
+    }
+
+
+def bulk_insert_usage(db: Session, rows: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert many usage rows with one multi-row INSERT (COPY for large batches on PostgreSQL) and
+    update the rollups; caller commits
+    """
+    if not rows:
+        return []
+
+    model_ids = {name: get_llm_model(db, name).id for name in {row["model"] for row in rows}}
+    values = []
+    for row in rows:
+        value = {key: item for key, item in row.items() if key != "model"}
+        value["model_id"] = model_ids[row["model"]]
+        values.append(value)
+
+    if db.get_bind().dialect.name == "postgresql":
+        from database.postgres import POSTGRES_COPY_MIN_ROWS, copy_usage_rows, ensure_usage_partitions
+
+        ensure_usage_partitions(db, [row["created_at"] for row in rows])
+        if len(values) >= POSTGRES_COPY_MIN_ROWS:
+            ids = copy_usage_rows(db, values)
+            apply_usage_to_rollups(db, rows)
+            return ids
+
+    result = db.execute(
+        insert(UsageRecord).returning(UsageRecord.id, sort_by_parameter_order=True),
+        values,
+    )
+    ids = list(result.scalars())
+    apply_usage_to_rollups(db, rows)
+    return ids
+
+
+class UsageWriter:
+    """
+    Write-behind ingestion: requests enqueue rows and a background task group-commits them
+    with one bulk INSERT per batch of at most batch_size rows.
+
+    durability="commit"  - submit() returns the row id once its batch is committed; a batch is
+                           flushed as soon as the writer is free, so rows arriving during a
+                           flush are committed together in the next one
+    durability="enqueue" - submit() returns immediately and batches linger up to the flush
+                           interval; queued rows are lost if the process dies
+    """
+
+    def __init__(self, session_factory: Callable[[], Session],
+                 batch_size: int = USAGE_INGEST_BATCH_SIZE,
+                 flush_interval_ms: float = USAGE_INGEST_FLUSH_MS,
+                 max_queue: int = USAGE_INGEST_QUEUE_SIZE,
+                 durability: str = USAGE_INGEST_DURABILITY,
+                 on_commit: Optional[Callable[[int], None]] = None):
+        if durability not in ("commit", "enqueue"):
+            raise ValueError(f"Unknown durability mode: {durability}")
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.durability = durability
+        self.on_commit = on_commit
+        self._queue: "asyncio.Queue[Tuple[Dict[str, Any], Optional[asyncio.Future]]]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_failed = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Flush everything still queued, then stop the background writer"""
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, row: Dict[str, Any]) -> Optional[int]:
+        """Queue one row; waits for queue space, and for the commit when durability="commit" """
+        if self._task is None:
+            raise RuntimeError("UsageWriter is not running")
+        future = asyncio.get_running_loop().create_future() if self.durability == "commit" else None
+        await self._queue.put((row, future))
+        if future is None:
+            return None
+        return await future
+
+    async def _next_batch(self) -> List[Tuple[Dict[str, Any], Optional[asyncio.Future]]]:
+        batch = [await self._queue.get()]
+        while len(batch) < self.batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        if self.durability == "commit":
+            # Submitters are blocked on this batch: flush now, later arrivals form the next group
+            return batch
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _write(self, rows: List[Dict[str, Any]]) -> List[int]:
+        db = self.session_factory()
+        try:
+            ids = bulk_insert_usage(db, rows)
+            db.commit()
+            return ids
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                ids = await asyncio.to_thread(self._write, [row for row, _ in batch])
+            except Exception as exc:
+                self.rows_failed += len(batch)
+                print(f"Warning: Failed to write {len(batch)} usage records: {exc}")
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(exc)
+            else:
+                self.rows_written += len(batch)
+                self.batches_written += 1
+                if self.on_commit is not None:
+                    self.on_commit(len(batch))
+                for (_, future), record_id in zip(batch, ids):
+                    if future is not None and not future.done():
+                        future.set_result(record_id)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "durability": self.durability,
+            "queued": self._queue.qsize(),
+            "rows_written": self.rows_written,
+            "batches_written": self.batches_written,
+            "rows_failed": self.rows_failed,
+        }
@@ -0,0 +1,119 @@
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+
+from database.models import LLMModel, UsageRecord, UsageRollupHourly, UsageRollupDaily
+
+# Bookkeeping table recording which schema migrations have been applied
+_migration_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migration_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(200), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+USAGE_COLUMNS = (
+    "id",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "search_context_size",
+    "input_tokens_cost",
+    "output_tokens_cost",
+    "request_cost",
+    "total_cost",
+    "input_prompt",
+    "output_prompt",
+    "created_at",
+    "energy_consumed",
+    "carbon_emission",
+)
+
+
+def create_usage_indexes(conn: Connection) -> None:
+    # IF NOT EXISTS rather than checkfirst, whose reflection misses PostgreSQL partitioned indexes
+    for index in UsageRecord.__table__.indexes:
+        conn.execute(CreateIndex(index, if_not_exists=True))
+
+
+def _migrate_model_dictionary(conn: Connection) -> None:
+    """Move usage_records.model into llm_models and add the created_at indexes"""
+    columns = {column["name"] for column in inspect(conn).get_columns("usage_records")}
+    if "model" not in columns:
+        # Created with the current schema; only make sure the indexes exist
+        create_usage_indexes(conn)
+        return
+
+    LLMModel.__table__.create(conn, checkfirst=True)
+    conn.execute(text(
+        "INSERT INTO llm_models (name) "
+        "SELECT DISTINCT model FROM usage_records "
+        "WHERE model NOT IN (SELECT name FROM llm_models)"
+    ))
+
+    # Rebuild the table (SQLite cannot drop a column in place on older versions)
+    for index in inspect(conn).get_indexes("usage_records"):
+        conn.execute(text(f'DROP INDEX IF EXISTS "{index["name"]}"'))
+    conn.execute(text("ALTER TABLE usage_records RENAME TO usage_records_legacy"))
+    UsageRecord.__table__.create(conn)
+
+    column_list = ", ".join(USAGE_COLUMNS)
+    legacy_columns = ", ".join(f"u.{name}" for name in USAGE_COLUMNS)
+    conn.execute(text(
+        f"INSERT INTO usage_records ({column_list}, model_id) "
+        f"SELECT {legacy_columns}, m.id FROM usage_records_legacy u "
+        f"JOIN llm_models m ON m.name = u.model"
+    ))
+    conn.execute(text("DROP TABLE usage_records_legacy"))
+
+
+def _add_missing_columns(conn: Connection, table) -> None:
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(
+            f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type} '
+            f"NOT NULL DEFAULT {column.server_default.arg}"
+        ))
+
+
+def _migrate_cache_savings(conn: Connection) -> None:
+    """Add the cache-hit flag and avoided energy/carbon to usage_records and the rollups"""
+    for table in (UsageRecord.__table__, UsageRollupHourly.__table__, UsageRollupDaily.__table__):
+        _add_missing_columns(conn, table)
+
+
+# (version, name, migration) in application order; never renumber applied entries
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "usage_records_model_dictionary_and_time_indexes", _migrate_model_dictionary),
+    (2, "usage_cache_hit_and_avoided_emissions", _migrate_cache_savings),
+]
+
+
+def run_migrations(engine: Engine) -> List[int]:
+    """Apply every migration that has not been recorded yet; returns the versions applied"""
+    _migration_metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        applied = set(conn.execute(schema_migrations.select().with_only_columns(schema_migrations.c.version)).scalars())
+
+    newly_applied = []
+    for version, name, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                name=name,
+                applied_at=datetime.utcnow(),
+            ))
+        newly_applied.append(version)
+    return newly_applied
@@ -0,0 +1,127 @@
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.util import await_only
+
+from database.migrations import create_usage_indexes
+from database.models import UsageRecord
+
+# PostgreSQL storage settings (override through environment variables)
+POSTGRES_PARTITION_MONTHS_BACK = int(os.getenv("POSTGRES_PARTITION_MONTHS_BACK", "12"))
+POSTGRES_PARTITION_MONTHS_AHEAD = int(os.getenv("POSTGRES_PARTITION_MONTHS_AHEAD", "3"))
+POSTGRES_COPY_MIN_ROWS = int(os.getenv("POSTGRES_COPY_MIN_ROWS", "50"))  # Smaller batches use INSERT
+
+USAGE_TABLE = UsageRecord.__table__
+
+# (database url, month) of the partitions known to exist, shared by every session in the process
+_partitions: Set[Tuple[str, date]] = set()
+_partitions_lock = threading.Lock()
+
+
+def month_start(moment: datetime) -> date:
+    return date(moment.year, moment.month, 1)
+
+
+def shift_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{USAGE_TABLE.name}_p{month:%Y_%m}"
+
+
+def _create_partition(conn: Connection, month: date) -> None:
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(month)} PARTITION OF {USAGE_TABLE.name} "
+        f"FOR VALUES FROM ('{month}') TO ('{shift_months(month, 1)}')"
+    ))
+
+
+def create_partitioned_usage_table(conn: Connection) -> None:
+    """
+    Create usage_records range-partitioned by month of created_at, with partitions from
+    POSTGRES_PARTITION_MONTHS_BACK months ago to POSTGRES_PARTITION_MONTHS_AHEAD months ahead.
+    The primary key has to include the partition key; a default partition takes rows outside
+    every monthly range.
+    """
+    columns = ",\n    ".join(str(CreateColumn(column).compile(dialect=conn.dialect)) for column in USAGE_TABLE.columns)
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {USAGE_TABLE.name} (\n    {columns},\n"
+        f"    PRIMARY KEY (id, created_at),\n"
+        f"    FOREIGN KEY (model_id) REFERENCES llm_models (id)\n"
+        f") PARTITION BY RANGE (created_at)"
+    ))
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {USAGE_TABLE.name}_default PARTITION OF {USAGE_TABLE.name} DEFAULT"))
+    # Indexes on the parent cascade to every partition, including ones created later. created_at
+    # is BRIN: rows arrive in created_at order, so block ranges summarize well; it goes first, so
+    # create_usage_indexes finds it and skips the model's B-tree definition of the same name
+    conn.execute(text(
+        f"CREATE INDEX IF NOT EXISTS ix_usage_records_created_at ON {USAGE_TABLE.name} USING brin (created_at)"
+    ))
+    create_usage_indexes(conn)
+
+    current = month_start(datetime.utcnow())
+    for months in range(-POSTGRES_PARTITION_MONTHS_BACK, POSTGRES_PARTITION_MONTHS_AHEAD + 1):
+        _create_partition(conn, shift_months(current, months))
+
+
+def ensure_usage_partitions(db: Session, moments: Iterable[datetime]) -> None:
+    """Create the monthly partitions for these timestamps if this process hasn't seen them yet"""
+    bind = db.get_bind()
+    url = str(bind.url)
+    missing = {month_start(moment) for moment in moments} - {month for key, month in _partitions if key == url}
+    for month in sorted(missing):
+        try:
+            # Own short transaction, so the request's transaction doesn't hold the DDL lock
+            with bind.begin() as conn:
+                _create_partition(conn, month)
+        except DBAPIError as exc:
+            # E.g. the default partition already holds rows of that month; they stay there
+            print(f"Warning: Could not create usage partition {partition_name(month)}: {exc}")
+        with _partitions_lock:
+            _partitions.add((url, month))
+
+
+async def _copy_async(driver_connection: Any, statement: str, records: List[tuple]) -> None:
+    async with driver_connection.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for record in records:
+                await copy.write_row(record)
+
+
+def copy_usage_rows(db: Session, values: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert usage_records rows with COPY inside the session's transaction; ids are drawn from
+    the id sequence in one query first, since COPY returns none. Returns the ids in row order.
+    """
+    conn = db.connection()
+    ids = list(conn.execute(
+        text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :count)"),
+        {"table": USAGE_TABLE.name, "count": len(values)},
+    ).scalars())
+
+    columns = [column.name for column in USAGE_TABLE.columns]
+    records = [
+        tuple(record_id if name == "id" else value[name] for name in columns)
+        for record_id, value in zip(ids, values)
+    ]
+    statement = f"COPY {USAGE_TABLE.name} ({', '.join(columns)}) FROM STDIN"
+
+    driver_connection = conn.connection.driver_connection
+    if conn.dialect.is_async:
+        # Running under AsyncSession.run_sync: drive psycopg's async COPY from this greenlet
+        await_only(_copy_async(driver_connection, statement, records))
+    else:
+        with driver_connection.cursor() as cursor:
+            with cursor.copy(statement) as copy:
+                for record in records:
+                    copy.write_row(record)
+    return ids
@@ -0,0 +1,189 @@
+from collections import defaultdict
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import Integer, cast, func, delete, insert, null, select, union_all
+from sqlalchemy.orm import Session
+
+from database.models import LLMModel, UsageRecord, UsageRollupHourly, UsageRollupDaily, dialect_insert
+
+ROLLUP_METRICS = (
+    "request_count",
+    "prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "total_cost",
+    "energy_consumed",
+    "carbon_emission",
+    "cache_hits",
+    "energy_avoided",
+    "carbon_avoided",
+)
+
+# Rollup sums taken directly from the usage_records column of the same name
+SUMMED_USAGE_COLUMNS = tuple(name for name in ROLLUP_METRICS if name not in ("request_count", "cache_hits"))
+
+
+def hour_bucket(moment: datetime) -> datetime:
+    """Truncate a timestamp to the start of its hour"""
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def _empty_metrics() -> Dict[str, Any]:
+    return {name: 0 for name in ROLLUP_METRICS}
+
+
+def _record_value(record: Any, name: str) -> Any:
+    if isinstance(record, dict):
+        return record[name]
+    return getattr(record, name)
+
+
+def _aggregate(records: Iterable[Any]) -> Tuple[Dict[Tuple[datetime, str], Dict[str, Any]], Dict[Tuple[date, str], Dict[str, Any]]]:
+    """Fold usage records (ORM objects or row dicts) into hourly and daily partial sums"""
+    hourly: Dict[Tuple[datetime, str], Dict[str, Any]] = defaultdict(_empty_metrics)
+    daily: Dict[Tuple[date, str], Dict[str, Any]] = defaultdict(_empty_metrics)
+
+    for record in records:
+        created_at = _record_value(record, "created_at")
+        model = _record_value(record, "model")
+        for bucket in (hourly[(hour_bucket(created_at), model)], daily[(created_at.date(), model)]):
+            bucket["request_count"] += 1
+            # Unflushed ORM objects haven't had their column defaults applied yet
+            bucket["cache_hits"] += 1 if _record_value(record, "cache_hit") else 0
+            for name in SUMMED_USAGE_COLUMNS:
+                bucket[name] += _record_value(record, name) or 0
+
+    return hourly, daily
+
+
+def _upsert_increment(db: Session, table, key_columns: Tuple[str, ...], rows: list) -> None:
+    """Insert rollup rows, adding to the existing sums when the bucket already exists"""
+    statement = dialect_insert(db.get_bind(), table)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(key_columns),
+        set_={name: table.c[name] + statement.excluded[name] for name in ROLLUP_METRICS},
+    )
+    db.execute(statement, rows)
+
+
+def apply_usage_to_rollups(db: Session, records: Iterable[Any]) -> None:
+    """Add new usage records to the hourly and daily rollups within the caller's transaction"""
+    hourly, daily = _aggregate(records)
+
+    if hourly:
+        _upsert_increment(
+            db,
+            UsageRollupHourly.__table__,
+            ("bucket_start", "model"),
+            [{"bucket_start": bucket, "model": model, **sums} for (bucket, model), sums in hourly.items()],
+        )
+    if daily:
+        _upsert_increment(
+            db,
+            UsageRollupDaily.__table__,
+            ("bucket_date", "model"),
+            [{"bucket_date": day, "model": model, **sums} for (day, model), sums in daily.items()],
+        )
+
+
+def _hour_expression(db: Session):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.date_trunc("hour", UsageRecord.created_at)
+    return func.strftime("%Y-%m-%d %H:00:00", UsageRecord.created_at)
+
+
+def grouped_usage_sums(db: Session, bucket, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                       ids_on_days: Iterable[date] = ()) -> Tuple[list, Set[int]]:
+    """
+    Rollup metrics of usage_records grouped by (bucket expression, model), optionally for [start, end),
+    and the ids of the rows on ids_on_days (days in the Parquet archive, see database.archive).
+    Both come from one statement, so they see the same snapshot while an archive run deletes rows.
+    """
+    bucket = bucket.label("bucket")
+    sums = select(
+        bucket,
+        LLMModel.name.label("model"),
+        func.count(UsageRecord.id).label("request_count"),
+        func.sum(UsageRecord.prompt_tokens).label("prompt_tokens"),
+        func.sum(UsageRecord.completion_tokens).label("completion_tokens"),
+        func.sum(UsageRecord.total_tokens).label("total_tokens"),
+        func.sum(UsageRecord.total_cost).label("total_cost"),
+        func.sum(UsageRecord.energy_consumed).label("energy_consumed"),
+        func.sum(UsageRecord.carbon_emission).label("carbon_emission"),
+        func.sum(cast(UsageRecord.cache_hit, Integer)).label("cache_hits"),
+        func.sum(UsageRecord.energy_avoided).label("energy_avoided"),
+        func.sum(UsageRecord.carbon_avoided).label("carbon_avoided"),
+        null().label("overlap_id"),
+    ).join(LLMModel, UsageRecord.model_id == LLMModel.id)
+    if start is not None:
+        sums = sums.where(UsageRecord.created_at >= start)
+    if end is not None:
+        sums = sums.where(UsageRecord.created_at < end)
+    statement = sums.group_by(bucket, LLMModel.name)
+
+    days = sorted(set(ids_on_days))
+    if days:
+        # The ids ride along as extra rows with every other column NULL
+        ids = select(
+            *(null().label(name) for name in ("bucket", "model", *ROLLUP_METRICS)), UsageRecord.id
+        ).where(
+            UsageRecord.created_at >= datetime.combine(days[0], time.min),
+            UsageRecord.created_at < datetime.combine(days[-1] + timedelta(days=1), time.min),
+            func.date(UsageRecord.created_at).in_(days),
+        )
+        statement = union_all(statement, ids)
+
+    rows = db.execute(statement).all()
+    return [row for row in rows if row.overlap_id is None], {row.overlap_id for row in rows if row.overlap_id is not None}
+
+
+def rebuild_rollups(db: Session, archive=None) -> int:
+    """
+    Recreate both rollup tables from usage_records plus the days already moved to the Parquet
+    archive (database.archive); returns the number of hourly buckets
+    """
+    from database.archive import get_usage_archive, live_sums_and_overlap
+
+    archive = archive or get_usage_archive()
+    rows, overlap, archived_days = live_sums_and_overlap(db, archive, _hour_expression(db))
+
+    hourly: Dict[Tuple[datetime, str], Dict[str, Any]] = defaultdict(_empty_metrics)
+    for row in rows:
+        bucket = row.bucket if isinstance(row.bucket, datetime) else datetime.fromisoformat(row.bucket)
+        hourly[(bucket, row.model)] = {name: getattr(row, name) or 0 for name in ROLLUP_METRICS}
+    if archived_days:
+        archived, _ = archive.grouped_sums("hour", exclude_ids=overlap, days=archived_days)
+        for key, sums in archived.items():
+            bucket = hourly[key]
+            for name in ROLLUP_METRICS:
+                bucket[name] += sums[name]
+
+    daily: Dict[Tuple[date, str], Dict[str, Any]] = defaultdict(_empty_metrics)
+    for (bucket, model), sums in hourly.items():
+        day = daily[(bucket.date(), model)]
+        for name in ROLLUP_METRICS:
+            day[name] += sums[name]
+
+    db.execute(delete(UsageRollupHourly))
+    db.execute(delete(UsageRollupDaily))
+    if hourly:
+        db.execute(
+            insert(UsageRollupHourly),
+            [{"bucket_start": bucket, "model": model, **sums} for (bucket, model), sums in hourly.items()],
+        )
+        db.execute(
+            insert(UsageRollupDaily),
+            [{"bucket_date": day, "model": model, **sums} for (day, model), sums in daily.items()],
+        )
+    db.commit()
+    return len(hourly)
+
+
+def ensure_rollups(db: Session) -> None:
+    """Backfill the rollups for databases created before they existed"""
+    from database.archive import get_usage_archive
+
+    has_rollups = db.query(UsageRollupDaily.bucket_date).first() is not None
+    if not has_rollups and (db.query(UsageRecord.id).first() is not None or get_usage_archive().days()):
+        rebuild_rollups(db)
@@ -8,12 +8,12 @@ import sys
 import random
 from datetime import datetime, timedelta
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
 
 # Add current directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from database.models import Base, UsageRecord, DATABASE_URL
+from database.models import UsageRecord, DATABASE_URL, create_database_engine, create_schema, get_llm_model
+from database.rollups import rebuild_rollups
 from utils.calculations import calculate_costs_and_metrics
 
 # Sample prompts and responses for dummy data
@@ -69,8 +69,8 @@ def create_dummy_data():
     """Create 14 days of dummy usage data"""
 
     # Create database engine and session
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(bind=engine)
+    engine = create_database_engine(DATABASE_URL)
+    create_schema(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     db = SessionLocal()
@@ -88,6 +88,7 @@ def create_dummy_data():
                 # Clear existing data
                 db.query(UsageRecord).delete()
                 db.commit()
+                rebuild_rollups(db)
                 print("Cleared existing data.")
 
         print("Creating 14 days of dummy data...")
@@ -126,7 +127,7 @@ def create_dummy_data():
 
                 # Create database record
                 usage_record = UsageRecord(
-                    model=model,
+                    model_ref=get_llm_model(db, model),
                     prompt_tokens=metrics["prompt_tokens"],
                     completion_tokens=metrics["completion_tokens"],
                     total_tokens=metrics["total_tokens"],
@@ -145,8 +146,9 @@ def create_dummy_data():
                 db.add(usage_record)
                 total_records += 1
 
-        # Commit all records
+        # Commit all records and refresh the analytics rollups
         db.commit()
+        rebuild_rollups(db)
         print(f"Successfully created {total_records} dummy records across 14 days!")
 
         # Print summary statistics
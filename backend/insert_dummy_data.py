@@ -8,8 +8,8 @@ import sys
 import random
 from datetime import datetime, timedelta
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
-from database.models import Base, UsageRecord, DATABASE_URL
+from database.models import UsageRecord, DATABASE_URL, create_database_engine, create_schema, get_llm_model
+from database.rollups import rebuild_rollups
 from utils.calculations import calculate_costs_and_metrics
 
 # Sample prompts and responses for dummy data
@@ -52,8 +52,8 @@ SAMPLE_RESPONSES = [
 MODELS = ["sonar-reasoning-pro", "sonar-pro", "sonar"]
 
 def insert_dummy_data():
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-    Base.metadata.create_all(bind=engine)
+    engine = create_database_engine(DATABASE_URL)
+    create_schema(engine)
     SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     db = SessionLocal()
 
@@ -81,7 +81,7 @@ def insert_dummy_data():
                 metrics = calculate_costs_and_metrics(prompt, response, model)
 
                 usage_record = UsageRecord(
-                    model=model,
+                    model_ref=get_llm_model(db, model),
                     prompt_tokens=metrics["prompt_tokens"],
                     completion_tokens=metrics["completion_tokens"],
                     total_tokens=metrics["total_tokens"],
@@ -101,6 +101,7 @@ def insert_dummy_data():
                 total_records += 1
 
         db.commit()
+        rebuild_rollups(db)
         print(f"Successfully inserted {total_records} records across 15 days.")
 
     except Exception as e:
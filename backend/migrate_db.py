@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Apply pending schema migrations to the analytics database
+"""
+
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.models import create_schema, engine
+
+
+def main():
+    applied = create_schema(engine)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(version) for version in applied)}")
+    else:
+        print("Database schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+Rebuild the hourly/daily usage rollup tables from usage_records and the Parquet archive
+"""
+
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.models import SessionLocal, create_tables
+from database.rollups import rebuild_rollups
+
+
+def main():
+    create_tables()
+    db = SessionLocal()
+    try:
+        buckets = rebuild_rollups(db)
+        print(f"Rebuilt usage rollups: {buckets} hourly buckets.")
+    except Exception as e:
+        print(f"Error rebuilding rollups: {str(e)}")
+        db.rollback()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -26,6 +26,9 @@ if not exist "logs" mkdir logs
 
 echo Starting all applications...
 
+REM app2 reports token counts and cache hits to app1; share a secret so app1 trusts them
+if "%USAGE_TRUSTED_TOKEN%"=="" for /f %%i in ('python -c "import secrets; print(secrets.token_hex(16))"') do set USAGE_TRUSTED_TOKEN=%%i
+
 REM Start App1 (Analytics API) on port 8001
 echo Starting Analytics API on port 8001...
 start "Analytics API" cmd /c "python -m uvicorn app1.main:app --host 0.0.0.0 --port 8001 > logs/app1.log 2>&1"
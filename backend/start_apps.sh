@@ -24,8 +24,34 @@ python init_db.py
 # Create log directory
 mkdir -p logs
 
+# Single-process mode: ./start_apps.sh single serves all three APIs on port 8000
+if [ "$1" == "single" ]; then
+    echo "Starting combined API on port 8000..."
+    nohup python -m uvicorn combined.main:app --host 0.0.0.0 --port 8000 > logs/combined.log 2>&1 &
+    COMBINED_PID=$!
+    echo "$COMBINED_PID" > pids.txt
+    echo "Combined API started with PID: $COMBINED_PID"
+
+    echo "Waiting for services to start..."
+    sleep 5
+    curl -s http://localhost:8000/health > /dev/null && echo "✓ Combined API (8000) is running" || echo "✗ Combined API (8000) failed to start"
+
+    echo ""
+    echo "📊 API Documentation:"
+    echo "   Analytics API: http://localhost:8000/app1/docs"
+    echo "   LLM Calling API: http://localhost:8000/app2/docs"
+    echo "   Green Prompt API: http://localhost:8000/app3/docs"
+    echo ""
+    echo "To stop, run: ./stop_apps.sh"
+    echo "To view logs: tail -f logs/combined.log"
+    exit 0
+fi
+
 echo "Starting all applications..."
 
+# app2 reports token counts and cache hits to app1; share a secret so app1 trusts them
+export USAGE_TRUSTED_TOKEN="${USAGE_TRUSTED_TOKEN:-$(python -c 'import secrets; print(secrets.token_hex(16))')}"
+
 # Start App1 (Analytics API) on port 8001
 echo "Starting Analytics API on port 8001..."
 nohup python -m uvicorn app1.main:app --host 0.0.0.0 --port 8001 > logs/app1.log 2>&1 &
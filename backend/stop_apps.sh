@@ -24,6 +24,7 @@ else
     pkill -f "uvicorn.*8001" 2>/dev/null && echo "Stopped process on port 8001"
     pkill -f "uvicorn.*8002" 2>/dev/null && echo "Stopped process on port 8002"
     pkill -f "uvicorn.*8003" 2>/dev/null && echo "Stopped process on port 8003"
+    pkill -f "uvicorn.*8000" 2>/dev/null && echo "Stopped process on port 8000"
 fi
 
 # Wait for processes to terminate
@@ -34,5 +35,6 @@ echo "Checking if ports are free..."
 lsof -ti:8001 >/dev/null && echo "⚠️  Port 8001 still in use" || echo "✓ Port 8001 is free"
 lsof -ti:8002 >/dev/null && echo "⚠️  Port 8002 still in use" || echo "✓ Port 8002 is free"
 lsof -ti:8003 >/dev/null && echo "⚠️  Port 8003 still in use" || echo "✓ Port 8003 is free"
+lsof -ti:8000 >/dev/null && echo "⚠️  Port 8000 still in use" || echo "✓ Port 8000 is free"
 
 echo "🛑 LLM Analytics Backend System stopped!"
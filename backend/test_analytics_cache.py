@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+/analytics response cache tests
+A matching If-None-Match gets a 304, a /store-usage write makes the next request recompute the
+body under a new ETag, and a cached body expires after its TTL
+"""
+
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import response_cache
+from utils.response_cache import VersionedResponseCache, etag_matches
+
+USAGE = {"INPUT_PROMPT": "How do heat pumps work?", "OUTPUT_PROMPT": "They move heat.", "MODEL": "sonar"}
+
+
+def test_analytics_etag_and_write_invalidation(analytics_client):
+    first = analytics_client.get("/analytics")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.json()["overview"]["TOTAL_APIS"] == 0
+
+    cached = analytics_client.get("/analytics", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+    assert analytics_client.get("/analytics", headers={"If-None-Match": f'"other", W/{etag}'}).status_code == 304
+
+    assert analytics_client.post("/store-usage", json=USAGE).status_code == 200
+
+    fresh = analytics_client.get("/analytics", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert fresh.json()["overview"]["TOTAL_APIS"] == 1
+    assert analytics_client.get("/analytics", headers={"If-None-Match": fresh.headers["etag"]}).status_code == 304
+
+
+def test_cached_body_expires_after_ttl(monkeypatch):
+    # Only the module's clock: asyncio's event loop reads time.monotonic too
+    now = [1000.0]
+    monkeypatch.setattr(response_cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    cache = VersionedResponseCache(ttl_seconds=30)
+    computed = []
+
+    async def compute():
+        computed.append(len(computed))
+        return {"computed": len(computed)}
+
+    def get():
+        return asyncio.run(cache.get_or_compute(compute))
+
+    body, etag = get()
+    now[0] += 30
+    assert get() == (body, etag)
+    assert len(computed) == 1
+
+    now[0] += 1
+    assert get()[0] == b'{"computed":2}'
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["recomputes"] == 2
+
+
+def test_concurrent_misses_share_one_recompute():
+    cache = VersionedResponseCache(ttl_seconds=30)
+    computed = []
+
+    async def compute():
+        computed.append(1)
+        await asyncio.sleep(0.01)
+        return {"rows": 1}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute(compute) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+    assert len(computed) == 1
+    assert len(set(results)) == 1
+
+
+def test_etag_matching():
+    assert etag_matches('"abc"', '"abc"')
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches("*", '"abc"')
+    assert not etag_matches('"abd"', '"abc"')
+    assert not etag_matches(None, '"abc"')
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Query-budget test for GET /analytics
+Runs build_analytics against a throwaway database (SQLite, and PostgreSQL when TEST_POSTGRES_URL
+is set) and pins the number of SQL statements
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app1.main import build_analytics
+from database.models import UsageRecord, create_database_engine, create_schema, get_llm_model
+from database.rollups import apply_usage_to_rollups
+from utils.calculations import calculate_costs_and_metrics
+
+# overview totals + latest entries + one hourly scan
+ANALYTICS_QUERY_BUDGET = 3
+
+
+def _seed(db, count=200):
+    now = datetime.utcnow()
+    models = ["sonar-reasoning-pro", "sonar-pro", "sonar"]
+    records = []
+    for i in range(count):
+        model = models[i % len(models)]
+        prompt = f"Prompt number {i} about renewable energy"
+        response = f"Response number {i} " * (i % 7 + 1)
+        metrics = calculate_costs_and_metrics(prompt, response, model)
+        records.append(UsageRecord(
+            model_ref=get_llm_model(db, model),
+            input_prompt=prompt,
+            output_prompt=response,
+            created_at=now - timedelta(hours=i),
+            **metrics
+        ))
+    db.add_all(records)
+    apply_usage_to_rollups(db, records)
+    db.commit()
+    return records
+
+
+def test_analytics_query_count(database_url):
+    """GET /analytics must not grow beyond its query budget"""
+    engine = create_database_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        records = _seed(db)
+        expected_tokens = sum(r.total_tokens for r in records)
+        db.expunge_all()
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+        result = build_analytics(db)
+
+        assert len(statements) == ANALYTICS_QUERY_BUDGET, statements
+        assert result["overview"]["TOTAL_APIS"] == len(records)
+        assert result["overview"]["TOTAL_TOKEN_COUNT"] == expected_tokens
+        assert len(result["latest_entries"]) == 30
+        assert set(result) == {
+            "overview",
+            "latest_entries",
+            "carbon_line_graph_data",
+            "energy_line_graph_data",
+            "carbon_heatmap_data",
+            "energy_heatmap_data",
+        }
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_analytics_daily_series_matches_hourly(database_url):
+    """Daily line graph values are the sums of the hourly heatmap cells"""
+    engine = create_database_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        _seed(db)
+        result = build_analytics(db)
+
+        hourly_by_day = {}
+        for cell in result["energy_heatmap_data"]:
+            hourly_by_day[cell["date"]] = hourly_by_day.get(cell["date"], 0) + cell["energy_consumed"]
+        for day in result["energy_line_graph_data"]:
+            assert abs(day["energy_consumed"] - hourly_by_day[day["date"]]) < 1e-6
+        assert [d["date"] for d in result["carbon_line_graph_data"]] == sorted(hourly_by_day)
+    finally:
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'analytics.db')}"
+        schema_engine = create_database_engine(url)
+        create_schema(schema_engine)
+        schema_engine.dispose()
+        test_analytics_query_count(url)
+        test_analytics_daily_series_matches_hourly(url)
+    print("✓ /analytics query budget respected")
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Smoke test for the combined single-process app (combined.main)
+The mounted apps answer under their prefixes, /ready reports every mount, app2's usage events
+reach app1 through the in-process sink, shutdown flushes app2's queue into app1 before
+app1 stops, and the shared offloader pools outlive every app but the last to stop. Runs in a child process so the app's database engines bind to a throwaway database.
+"""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EVENT = {
+    "INPUT_PROMPT": "How do heat pumps work?",
+    "OUTPUT_PROMPT": "They move heat instead of making it.",
+    "MODEL": "sonar",
+    "prompt_tokens": 111,
+    "completion_tokens": 22,
+}
+
+
+def _scenario():
+    """Runs in the child process; prints what it observed as JSON"""
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func
+
+    from combined import main as combined
+    from database.models import LLMModel, SessionLocal, UsageRecord
+    from utils import offload as offload_module
+
+    # Hold app2's reporter until shutdown has begun (app3 stops first), so its events are still
+    # queued then, and record when they reach app1 relative to app1 stopping
+    order = []
+    analytics_sink = combined.llm_api.usage_sink
+
+    async def sink(events):
+        while "app3 stopped" not in order:
+            await asyncio.sleep(0.01)
+        result = await analytics_sink(events)
+        order.append(f"stored {result['stored']}")
+        return result
+
+    combined.llm_api.usage_sink = sink
+    # Whether each app's shutdown left the pools the apps started with in place
+    seen = {"pools": {}}
+
+    def stopped(name):
+        order.append(f"{name} stopped")
+        seen["pools"][name] = offload_module._offloader is pools
+
+    for name, api in (("app3", combined.green_api), ("app2", combined.llm_api), ("app1", combined.analytics_api)):
+        api.app.router.on_shutdown.append(lambda name=name: stopped(name))
+
+    with TestClient(combined.app) as client:
+        pools = offload_module.get_offloader()
+        seen["health"] = {path: client.get(path).status_code
+                          for path in ("/health", "/app1/health", "/app2/health", "/app3/health")}
+        ready = client.get("/ready")
+        body = ready.json()
+        seen["ready"] = {
+            "status": ready.status_code,
+            "ready": body["ready"],
+            "mounts": sorted(body["mounts"]),
+            "all_mounts_ready": all(mount["ready"] for mount in body["mounts"].values()),
+        }
+
+        # Per-event validation on the in-process path, as on /store-usage/batch
+        stored = client.portal.call(combined.analytics_api.store_usage_events, [EVENT, {"MODEL": "sonar"}])
+        seen["direct"] = {"stored": stored["stored"], "failed": stored["failed"],
+                          "errors": [result["index"] for result in stored["results"] if "error" in result]}
+
+        # Queued in app2 and only sent by its reporter: shutdown must flush them into app1
+        reporter = combined.llm_api.usage_reporter
+        seen["queued"] = sum(client.portal.call(reporter.report, {**EVENT, "MODEL": "sonar-pro"}) for _ in range(3))
+
+    seen["order"] = order
+    seen["reporter"] = reporter.stats()
+    db = SessionLocal()
+    try:
+        seen["rows"] = {model: [count, tokens] for model, count, tokens in
+                        db.query(LLMModel.name, func.count(), func.sum(UsageRecord.prompt_tokens))
+                        .join(UsageRecord.model_ref).group_by(LLMModel.name)}
+    finally:
+        db.close()
+    print(json.dumps(seen))
+
+
+def test_combined_app_smoke():
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{os.path.join(tmp, 'analytics.db')}"}
+        child = subprocess.run([sys.executable, os.path.abspath(__file__)], cwd=BACKEND_DIR, env=env,
+                               capture_output=True, text=True, timeout=120)
+    assert child.returncode == 0, child.stderr
+    seen = json.loads(child.stdout.strip().splitlines()[-1])
+
+    assert set(seen["health"].values()) == {200}
+    mounts = seen["ready"]
+    assert mounts["mounts"] == ["/app1", "/app2", "/app3"]
+    assert mounts["ready"] == mounts["all_mounts_ready"]
+    assert mounts["status"] == (200 if mounts["ready"] else 503)
+
+    assert seen["direct"] == {"stored": 1, "failed": 1, "errors": [1]}
+
+    order = [step for step in seen["order"] if step != "app2 stopped"]
+    assert order[0] == "app3 stopped" and order[-1] == "app1 stopped"
+    assert sum(int(step.split()[1]) for step in order[1:-1]) == 3
+    assert seen["pools"] == {"app3": True, "app2": True, "app1": False}
+
+    # Reported token counts are trusted on the in-process path
+    assert seen["queued"] == 3
+    assert seen["reporter"]["sent"] == 3
+    assert seen["reporter"]["queued"] == 0
+    assert seen["rows"] == {"sonar": [1, 111], "sonar-pro": [3, 333]}
+
+
+if __name__ == "__main__":
+    _scenario()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Endpoint tests for POST /optimize-green-prompt/batch
+NDJSON and JSON-array bodies, per-index errors, the prompt limit (413) and ?stream=true, with
+the batch split over several chunks; large batches run on the process pool by default
+"""
+
+import json
+import os
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app3.main as app3
+from utils.calculations import optimize_prompt_for_green
+from utils.offload import get_offloader
+
+PROMPTS = [
+    "Could you please explain in detail how solar panels work?",
+    "I would like you to basically summarize the history of wind energy.",
+    "Please kindly list the main benefits of electric vehicles, thank you.",
+    "Explain heat pumps.",
+    "Can you actually tell me what a carbon footprint is?",
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app3, "GREEN_BATCH_CHUNK_SIZE", 2)
+    return TestClient(app3.app)  # No startup hooks: the batch endpoint needs no upstream
+
+
+def _expected(prompt):
+    return optimize_prompt_for_green(prompt)["green_prompt"]
+
+
+def test_json_array_body_with_per_index_errors(client):
+    body = [PROMPTS[0], {"USER_PROMPT": PROMPTS[1]}, 42, PROMPTS[2], {"PROMPT": "wrong key"}, PROMPTS[3]]
+    response = client.post("/optimize-green-prompt/batch", json=body)
+    assert response.status_code == 200
+    results = response.json()["RESULTS"]
+
+    assert [result["index"] for result in results] == list(range(len(body)))
+    assert [index for index, result in enumerate(results) if "error" in result] == [2, 4]
+    for index, prompt in ((0, PROMPTS[0]), (1, PROMPTS[1]), (3, PROMPTS[2]), (5, PROMPTS[3])):
+        assert results[index]["green_prompt"] == _expected(prompt)
+    summary = response.json()["SUMMARY"]
+    assert summary["prompts"] == 4
+    assert summary["failed"] == 2
+
+
+def test_ndjson_body(client):
+    body = "\n".join(json.dumps(prompt) for prompt in PROMPTS) + "\n{not json\n"
+    response = client.post("/optimize-green-prompt/batch", content=body,
+                           headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    results = response.json()["RESULTS"]
+    assert [result.get("green_prompt") for result in results[:-1]] == [_expected(prompt) for prompt in PROMPTS]
+    assert results[-1]["index"] == len(PROMPTS)
+    assert "Invalid JSON" in results[-1]["error"]
+
+
+def test_prompt_limit(client, monkeypatch):
+    monkeypatch.setattr(app3, "GREEN_BATCH_MAX_PROMPTS", 3)
+    assert client.post("/optimize-green-prompt/batch", json=PROMPTS[:3]).status_code == 200
+    response = client.post("/optimize-green-prompt/batch", json=PROMPTS[:4])
+    assert response.status_code == 413
+    assert "limit of 3" in response.json()["detail"]
+
+
+def test_malformed_array_is_rejected(client):
+    response = client.post("/optimize-green-prompt/batch", content=b'["a", "b"',
+                           headers={"content-type": "application/json"})
+    assert response.status_code == 400
+
+
+def test_streamed_results(client):
+    body = PROMPTS + [None]
+    response = client.post("/optimize-green-prompt/batch?stream=true", json=body)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+
+    *items, last = lines
+    assert last["summary"]["prompts"] == len(PROMPTS)
+    assert last["summary"]["failed"] == 1
+    by_index = {item["index"]: item for item in items}
+    assert sorted(by_index) == list(range(len(body)))
+    assert "error" in by_index[len(PROMPTS)]
+    assert [by_index[index]["green_prompt"] for index in range(len(PROMPTS))] == [_expected(p) for p in PROMPTS]
+
+
+def test_zero_chunk_size_is_clamped(monkeypatch):
+    monkeypatch.setenv("GREEN_BATCH_CHUNK_SIZE", "0")
+    import importlib
+    reloaded = importlib.reload(app3)
+    try:
+        assert reloaded.GREEN_BATCH_CHUNK_SIZE == 1
+        response = TestClient(reloaded.app).post("/optimize-green-prompt/batch", json=PROMPTS[:3])
+        assert [result["green_prompt"] for result in response.json()["RESULTS"]] == [_expected(p) for p in PROMPTS[:3]]
+    finally:
+        monkeypatch.delenv("GREEN_BATCH_CHUNK_SIZE")
+        importlib.reload(app3)
+
+
+@pytest.mark.parametrize("use_processes, kind", [(True, "process"), (False, "thread")])
+def test_large_batches_use_the_process_pool(client, monkeypatch, use_processes, kind):
+    monkeypatch.setattr(app3, "GREEN_BATCH_USE_PROCESSES", use_processes)
+    offloader = get_offloader()
+    monkeypatch.setattr(offloader, "process_min_chars", 0)  # The single-request default: no processes
+    body = PROMPTS * (offloader.inline_max_chars // len("".join(PROMPTS)) + 1)
+    before = dict(offloader.calls)
+
+    response = client.post("/optimize-green-prompt/batch", json=body)
+    assert response.status_code == 200
+    assert [result["green_prompt"] for result in response.json()["RESULTS"][:len(PROMPTS)]] == [_expected(p) for p in PROMPTS]
+    calls = {name: count - before[name] for name, count in offloader.calls.items()}
+    assert calls[kind] == -(-len(body) // app3.GREEN_BATCH_CHUNK_SIZE)
+    assert sum(calls.values()) == calls[kind]
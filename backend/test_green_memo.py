@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Green prompt memo tests for app3
+A repeated request is answered from the memo without calling the LLM, Cache-Control: no-cache
+skips the lookup (and refreshes the entry), no-store skips the memo entirely, and memo keys keep
+the request fields apart
+"""
+
+import os
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app3.main import memo_key
+
+PROMPT = {"USER_PROMPT": "Could you please explain in detail how solar panels work?"}
+TASK = {"task_intent": "Summarize a solar panel datasheet", "expected_output": "Three bullet points"}
+LLM_ANSWER = "Explain how solar panels work."
+
+
+def optimize(client, **headers):
+    response = client.post("/optimize-green-prompt", json=PROMPT, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_repeated_prompt_is_served_from_the_memo(green_client):
+    assert optimize(green_client) == {"GREEN_PROMPT": LLM_ANSWER, "CACHED": False}
+    assert optimize(green_client) == {"GREEN_PROMPT": LLM_ANSWER, "CACHED": True}
+    assert green_client.perplexity.calls == 1
+    assert green_client.get("/green-memo-stats").json()["memory_hits"] == 1
+
+
+def test_no_cache_bypasses_the_memo_and_refreshes_it(green_client):
+    perplexity = green_client.perplexity
+    optimize(green_client)
+    perplexity.answer = "Explain solar panels."
+    assert optimize(green_client, **{"Cache-Control": "no-cache"}) == {"GREEN_PROMPT": "Explain solar panels.", "CACHED": False}
+    assert perplexity.calls == 2
+    assert optimize(green_client) == {"GREEN_PROMPT": "Explain solar panels.", "CACHED": True}
+
+
+def test_no_store_neither_reads_nor_writes_the_memo(green_client):
+    optimize(green_client, **{"Cache-Control": "no-store"})
+    assert optimize(green_client) == {"GREEN_PROMPT": LLM_ANSWER, "CACHED": False}
+    assert optimize(green_client, **{"Cache-Control": "max-age=0, No-Store"})["CACHED"] is False
+    assert green_client.perplexity.calls == 3
+
+
+def test_generation_requests_are_memoized_by_all_fields(green_client):
+    def generate(body):
+        response = green_client.post("/generate-green-prompt", json=body)
+        assert response.status_code == 200
+        return response.json()
+
+    first = generate(TASK)
+    assert (first["GREEN_PROMPT"], first["CACHED"]) == (LLM_ANSWER, False)
+    assert generate(TASK)["CACHED"] is True
+    assert generate({**TASK, "strict_guidelines": ""})["CACHED"] is False
+    assert green_client.perplexity.calls == 2
+
+    assert memo_key("generate-green-prompt", "a", None, "b") != memo_key("generate-green-prompt", "a", "", "b")
+    assert memo_key("optimize-green-prompt", "a") != memo_key("generate-green-prompt", "a", None, None)
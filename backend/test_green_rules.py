@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Equivalence test for the data-driven green prompt rules
+optimize_prompt_for_green must give exactly what the original hard-coded passes gave, also for
+prompts where the rules interact
+"""
+
+import os
+import random
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.calculations import optimize_prompt_for_green
+from utils.green_rules import get_green_rules
+
+# The rule tables and steps as they were hard-coded in optimize_prompt_for_green
+LEGACY_POLITENESS = {
+    "please could you kindly": "please",
+    "i would really appreciate": "",
+    "if possible": "",
+    "thank you very much": "",
+    "please kindly": "please",
+    "could you please": "please",
+    "would you mind": "",
+    "i would be grateful": ""
+}
+LEGACY_REDUNDANCY = {
+    "detailed and comprehensive": "comprehensive",
+    "complete and thorough": "thorough",
+    "step-by-step instructions": "instructions",
+    "all the important aspects": "key aspects",
+    "various different": "various",
+    "absolutely essential": "essential",
+    "highly important": "important",
+    "extremely detailed": "detailed"
+}
+LEGACY_PASSIVE_TO_ACTIVE = {
+    "explanation should be provided": "explain",
+    "information needs to be included": "include",
+    "examples should be given": "provide examples",
+    "details must be covered": "cover details"
+}
+LEGACY_FILLER_WORDS = {"really", "quite", "very", "extremely", "absolutely", "definitely", "certainly"}
+
+
+def legacy_green_prompt(user_prompt):
+    optimized_prompt = user_prompt
+    for verbose, concise in LEGACY_POLITENESS.items():
+        optimized_prompt = optimized_prompt.lower().replace(verbose, concise)
+    for redundant, concise in LEGACY_REDUNDANCY.items():
+        optimized_prompt = optimized_prompt.replace(redundant, concise)
+    for passive, active in LEGACY_PASSIVE_TO_ACTIVE.items():
+        optimized_prompt = optimized_prompt.replace(passive, active)
+    if "explanation" in optimized_prompt.lower() and len(optimized_prompt) > 100:
+        if "machine learning" in optimized_prompt.lower():
+            optimized_prompt = "Explain machine learning algorithms with examples and key concepts."
+        elif "quantum computing" in optimized_prompt.lower():
+            optimized_prompt = "Explain quantum computing principles with practical examples."
+        elif len(optimized_prompt) > 200:
+            optimized_prompt = "Provide a comprehensive explanation with examples and key points."
+    optimized_prompt = " ".join(optimized_prompt.split())
+    if len(optimized_prompt) >= len(user_prompt) * 0.85:
+        words = optimized_prompt.split()
+        optimized_prompt = " ".join(word for word in words if word.lower() not in LEGACY_FILLER_WORDS)
+    return optimized_prompt
+
+
+def _fragments():
+    patterns = list(LEGACY_POLITENESS) + list(LEGACY_REDUNDANCY) + list(LEGACY_PASSIVE_TO_ACTIVE)
+    pieces = patterns + [pattern.upper() for pattern in patterns]
+    for pattern in patterns:
+        cut = len(pattern) // 2
+        pieces += [pattern[:cut], pattern[cut:]]
+    pieces += ["explain", "explanation", "machine learning", "quantum computing", "Really", "very",
+               "the", "solar panels", "   ", "\n", ".", "İ", "Σ"]
+    return pieces
+
+
+def _random_prompt(rng, pieces):
+    return "".join(rng.choice(pieces) + rng.choice(["", " ", "  "]) for _ in range(rng.randint(1, 60)))
+
+
+def test_rule_file_matches_legacy_rules():
+    rules = get_green_rules()
+    legacy = list(LEGACY_POLITENESS.items()) + list(LEGACY_REDUNDANCY.items()) + list(LEGACY_PASSIVE_TO_ACTIVE.items())
+    assert rules.rewrite.rules == legacy
+    assert rules.filler_words == LEGACY_FILLER_WORDS
+
+
+def test_interacting_rules_keep_sequential_semantics():
+    prompts = [
+        "could you please kindly explain",             # a replacement creates a later rule's match
+        "could you please could you kindly help",      # overlapping matches of different rules
+        "if pif possibleossible, thank you very much",  # a deletion joins a new match
+        "Please Could You Kindly list the highly important and absolutely essential points",
+    ]
+    for prompt in prompts:
+        assert optimize_prompt_for_green(prompt)["green_prompt"] == legacy_green_prompt(prompt)
+
+
+def test_green_prompt_matches_legacy_implementation():
+    rng = random.Random(2024)
+    pieces = _fragments()
+    for _ in range(1000):
+        prompt = _random_prompt(rng, pieces)
+        assert optimize_prompt_for_green(prompt)["green_prompt"] == legacy_green_prompt(prompt)
+
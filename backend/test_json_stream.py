@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Streaming body parser tests
+iter_json_array and iter_ndjson must return the same values as json.loads whatever way the body
+is split into chunks: inside numbers ("1." + "5"), exponents, escapes and multibyte UTF-8
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+
+import pytest
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.json_stream import iter_json_array, iter_ndjson
+
+ELEMENTS = [
+    "1.5", "-0.25", "2e3", "1E-7", "-4.5e+12", "0", "123456789", "true", "false", "null",
+    '"plain"', '"say \\"hi\\""', '"back\\\\slash"', '"café 漢字 \U0001f30d"', '"\\u00e9\\n"',
+    '{"MODEL": "sonar", "INPUT_PROMPT": "Résumé \\"quoted\\"", "prompt_tokens": 12}',
+    '[1.0, [2e-1, "]"], {"a": ","}]',
+]
+
+
+def collect(parser, chunks):
+    async def stream():
+        for chunk in chunks:
+            yield chunk
+
+    async def run():
+        return [item async for item in parser(stream())]
+
+    return asyncio.run(run())
+
+
+def random_chunks(rng, body):
+    chunks, start = [], 0
+    while start < len(body):
+        size = rng.randint(1, 6)
+        chunks.append(body[start:start + size])
+        start += size
+    return chunks
+
+
+def test_number_split_at_chunk_boundary():
+    assert collect(iter_json_array, [b"[1.", b"5]"]) == [(1.5, None)]
+    assert collect(iter_json_array, [b"[2e", b"3]"]) == [(2000.0, None)]
+    assert collect(iter_json_array, [b"[-", b"1", b".", b"5", b"e", b"-", b"2", b" ]"]) == [(-0.015, None)]
+    assert collect(iter_json_array, [b"[1.5]"]) == [(1.5, None)]
+
+
+def test_json_array_matches_json_loads_for_any_chunking():
+    rng = random.Random(7)
+    for _ in range(500):
+        elements = [rng.choice(ELEMENTS) for _ in range(rng.randint(0, 8))]
+        body = ("[" + rng.choice(["", " ", "\n"]) + " ,\n".join(elements) + " ]").encode("utf-8")
+        values = [value for value, error in collect(iter_json_array, random_chunks(rng, body))]
+        assert values == json.loads(body)
+
+
+def test_ndjson_matches_json_loads_for_any_chunking():
+    rng = random.Random(11)
+    for _ in range(500):
+        elements = [rng.choice(ELEMENTS) for _ in range(rng.randint(0, 8))]
+        body = "\n".join(elements + [""] * rng.randint(0, 2)).encode("utf-8")
+        assert collect(iter_ndjson, random_chunks(rng, body)) == [(json.loads(element), None) for element in elements]
+
+
+def test_ndjson_reports_bad_lines_and_continues():
+    items = collect(iter_ndjson, [b'{"a": 1}\n{"a": \n', b"2.5e\n3"])
+    assert [value for value, _ in items] == [{"a": 1}, None, None, 3]
+    assert [error is not None for _, error in items] == [False, True, True, False]
+
+
+@pytest.mark.parametrize("body", [b"[1 2]", b"[1,,2]", b"[1.x]", b'{"a": 1}', b"[1, 2", b"[2e]"])
+def test_malformed_arrays_raise(body):
+    with pytest.raises(ValueError):
+        collect(iter_json_array, [body[:2], body[2:]])
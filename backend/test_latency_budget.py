@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Latency-budget tests for app3
+Within the budget the LLM's green prompt is returned; past it the rule-based prompt comes back
+without waiting, and the late LLM call is memoized for the next identical request or, when the
+answer may not be stored (Cache-Control: no-store), cancelled
+"""
+
+import os
+import sys
+import time
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.calculations import optimize_prompt_for_green
+
+PROMPT = {"USER_PROMPT": "Could you please explain in detail how solar panels work?"}
+LLM_ANSWER = "Explain how solar panels work."
+RULE_BASED = optimize_prompt_for_green(PROMPT["USER_PROMPT"])["green_prompt"]
+
+
+def post(client, budget_ms=None, **headers):
+    if budget_ms is not None:
+        headers["X-Latency-Budget-Ms"] = str(budget_ms)
+    started = time.perf_counter()
+    response = client.post("/optimize-green-prompt", json=PROMPT, headers=headers)
+    assert response.status_code == 200
+    return response.json(), time.perf_counter() - started
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_answer_within_budget_is_the_llms(green_client):
+    green_client.perplexity.delay = 0.05
+    body, _ = post(green_client, budget_ms=2000)
+    assert body == {"GREEN_PROMPT": LLM_ANSWER, "CACHED": False}
+    stats = green_client.get("/latency-budget-stats").json()
+    assert (stats["budgeted"], stats["budget_missed"]) == (1, 0)
+
+
+def test_without_budget_the_llm_is_awaited(green_client):
+    green_client.perplexity.delay = 0.3
+    body, elapsed = post(green_client, **{"Cache-Control": "no-store"})
+    assert body["GREEN_PROMPT"] == LLM_ANSWER
+    assert elapsed >= 0.3
+    assert green_client.get("/latency-budget-stats").json()["budgeted"] == 0
+
+
+def test_late_answer_is_memoized_for_the_next_request(green_client):
+    perplexity = green_client.perplexity
+    perplexity.delay = 0.5
+    body, elapsed = post(green_client, budget_ms=50)
+    assert body == {"GREEN_PROMPT": RULE_BASED, "CACHED": False}
+    assert elapsed < 0.4
+
+    wait_for(lambda: green_client.get("/latency-budget-stats").json()["late_answers_pending"] == 0)
+    stats = green_client.get("/latency-budget-stats").json()
+    assert (stats["budget_missed"], stats["late_answers_memoized"]) == (1, 1)
+
+    body, _ = post(green_client, budget_ms=50)
+    assert body == {"GREEN_PROMPT": LLM_ANSWER, "CACHED": True}
+    assert (perplexity.calls, perplexity.completed) == (1, 1)
+
+
+def test_late_answer_that_cannot_be_stored_is_cancelled(green_client):
+    perplexity = green_client.perplexity
+    perplexity.delay = 5
+    body, elapsed = post(green_client, budget_ms=50, **{"Cache-Control": "no-store"})
+    assert body["GREEN_PROMPT"] == RULE_BASED
+    assert elapsed < 1
+
+    wait_for(lambda: perplexity.cancelled == 1)
+    assert perplexity.completed == 0
+    stats = green_client.get("/latency-budget-stats").json()
+    assert (stats["budget_missed"], stats["late_answers_memoized"], stats["late_answers_pending"]) == (1, 0, 0)
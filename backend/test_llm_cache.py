@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+LLM response cache tests
+TwoTierCache promotes disk hits into its LRU, evicts least recently used entries from both tiers
+and expires entries after the TTL. A /call-llm answer served from the cache is stored by app1 as a
+cache hit: nothing spent, the original energy and carbon recorded as avoided.
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import cache_store
+from database.cache_store import TwoTierCache
+from database.models import CacheEntry, UsageRecord, create_async_database_engine
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [datetime(2026, 1, 1, 12, 0)]
+
+    class FrozenDateTime(datetime):
+        @classmethod
+        def utcnow(cls):
+            return now[0]
+
+    monkeypatch.setattr(cache_store, "datetime", FrozenDateTime)
+    return now
+
+
+def run_with_sessions(database_url, scenario):
+    """Run scenario(sessions) on a fresh async engine for the test database"""
+    async def main():
+        engine = create_async_database_engine(database_url)
+        try:
+            return await scenario(async_sessionmaker(engine, expire_on_commit=False))
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_disk_hit_is_promoted_to_memory(database_url, clock):
+    async def scenario(sessions):
+        writer = TwoTierCache("test", 60, memory_entries=10, max_entries=100, session_factory=sessions)
+        await writer.set("key", {"answer": 42})
+
+        reader = TwoTierCache("test", 60, memory_entries=10, max_entries=100, session_factory=sessions)
+        values = [await reader.get("key"), await reader.get("key")]
+        return values, reader.stats()
+
+    values, stats = run_with_sessions(database_url, scenario)
+    assert values == [{"answer": 42}, {"answer": 42}]
+    assert (stats["disk_hits"], stats["memory_hits"], stats["memory_entries"]) == (1, 1, 1)
+
+
+@pytest.mark.parametrize("tier", ["memory", "disk"])
+def test_least_recently_used_entries_are_evicted(database_url, clock, tier):
+    async def scenario(sessions):
+        # The disk tier tracks use on disk reads, so it is exercised without the memory tier
+        cache = TwoTierCache("test", 3600, memory_entries=2 if tier == "memory" else 0, max_entries=2,
+                             session_factory=sessions, evict_every=1 if tier == "disk" else 100)
+        for key in ("a", "b"):
+            await cache.set(key, key)
+            clock[0] += timedelta(seconds=1)
+        assert await cache.get("a") == "a"  # Now more recently used than b
+        clock[0] += timedelta(seconds=1)
+        await cache.set("c", "c")
+
+        async with sessions() as db:
+            disk = sorted((await db.execute(select(CacheEntry.key))).scalars())
+        return list(cache._memory), disk, cache.stats()
+
+    memory, disk, stats = run_with_sessions(database_url, scenario)
+    if tier == "memory":
+        assert memory == ["a", "c"]
+        assert stats["memory_hits"] == 1
+    else:
+        assert disk == ["a", "c"]
+        assert (stats["disk_hits"], stats["evicted"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(database_url, clock):
+    async def scenario(sessions):
+        cache = TwoTierCache("test", 60, memory_entries=10, max_entries=100, session_factory=sessions)
+        await cache.set("key", "value")
+        clock[0] += timedelta(seconds=59)
+        fresh = await cache.get("key")
+        clock[0] += timedelta(seconds=2)
+        expired = await cache.get("key")
+        cold = await TwoTierCache("test", 60, memory_entries=10, max_entries=100, session_factory=sessions).get("key")
+        return fresh, expired, cold, cache.stats()
+
+    fresh, expired, cold, stats = run_with_sessions(database_url, scenario)
+    assert (fresh, expired, cold) == ("value", None, None)
+    assert (stats["memory_hits"], stats["misses"], stats["memory_entries"]) == (1, 1, 0)
+
+
+def test_cached_answer_is_stored_as_cache_hit(database_url, analytics_client, monkeypatch):
+    from app1 import main as app1
+    from app2 import main as app2
+    from utils.upstream import ResilientUpstream
+
+    upstream_calls = []
+
+    def perplexity(request):
+        upstream_calls.append(request)
+        return httpx.Response(200, json={
+            "choices": [{"message": {"content": "Heat pumps move heat instead of making it."}}],
+            "usage": {"prompt_tokens": 40, "completion_tokens": 12, "total_tokens": 52},
+        })
+
+    class CapturingReporter:
+        def __init__(self):
+            self.events = []
+
+        def report(self, event):
+            self.events.append(event)
+            return True
+
+    engine = create_async_database_engine(database_url)
+    perplexity_client = httpx.AsyncClient(base_url="http://perplexity.test", transport=httpx.MockTransport(perplexity))
+    monkeypatch.setenv("PERPLEXITY_API_KEY", "test-key")
+    monkeypatch.setattr(app2, "llm_cache", TwoTierCache("llm_response", 3600, 16, 100, async_sessionmaker(engine)))
+    monkeypatch.setattr(app2, "llm_upstream", ResilientUpstream("call_llm", lambda: perplexity_client))
+    reporter = CapturingReporter()
+    monkeypatch.setattr(app2, "usage_reporter", reporter)
+    monkeypatch.setattr(app2.app.router, "on_startup", [])
+    monkeypatch.setattr(app2.app.router, "on_shutdown", [])
+
+    request = {"INPUT_PROMPT": "How do  heat pumps work?", "MODEL": "sonar"}
+    with TestClient(app2.app) as client:
+        first = client.post("/call-llm", json=request).json()
+        second = client.post("/call-llm", json={**request, "INPUT_PROMPT": "How do heat pumps work?"}).json()
+        client.portal.call(engine.dispose)
+
+    assert len(upstream_calls) == 1
+    assert (first["CACHED"], second["CACHED"]) == (False, True)
+    events = reporter.events
+    assert [event.get("cache_hit", False) for event in events] == [False, True]
+
+    stored = analytics_client.portal.call(app1.store_usage_events, events)
+    assert stored["stored"] == 2
+    db = app1.SessionLocal()
+    try:
+        live, cached = db.query(UsageRecord).order_by(UsageRecord.id).all()
+    finally:
+        db.close()
+    assert (live.cache_hit, live.prompt_tokens, live.completion_tokens) == (False, 40, 12)
+    assert (cached.cache_hit, cached.prompt_tokens, cached.completion_tokens) == (True, 0, 0)
+    assert cached.energy_consumed == 0
+    assert cached.energy_avoided == pytest.approx(live.energy_consumed)
+    assert cached.carbon_avoided == pytest.approx(live.carbon_emission)
+    assert analytics_client.get("/analytics").json()["overview"]["TOTAL_CACHE_HITS"] == 1
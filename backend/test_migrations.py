@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Schema migration tests
+A database created with the original schema (usage_records.model as a string column) is upgraded
+by create_schema: every row keeps its id and values and references its model through llm_models,
+the created_at indexes exist, the migrations are recorded once, and the rollups are backfilled
+from the migrated rows. The original schema only ever existed on SQLite.
+"""
+
+import os
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, Text, inspect
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import archive as archive_module
+from database.archive import UsageArchive
+from database.models import UsageRecord, UsageRollupDaily, create_database_engine, create_schema
+from database.rollups import ensure_rollups
+
+# usage_records as the first version of database/models.py created it
+legacy_metadata = MetaData()
+legacy_usage_records = Table(
+    "usage_records",
+    legacy_metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("model", String(100), nullable=False),
+    Column("prompt_tokens", Integer, nullable=False),
+    Column("completion_tokens", Integer, nullable=False),
+    Column("total_tokens", Integer, nullable=False),
+    Column("search_context_size", Integer, nullable=False, default=0),
+    Column("input_tokens_cost", Float, nullable=False),
+    Column("output_tokens_cost", Float, nullable=False),
+    Column("request_cost", Float, nullable=False),
+    Column("total_cost", Float, nullable=False),
+    Column("input_prompt", Text, nullable=False),
+    Column("output_prompt", Text, nullable=False),
+    Column("created_at", DateTime, nullable=False),
+    Column("energy_consumed", Float, nullable=False),
+    Column("carbon_emission", Float, nullable=False),
+)
+
+MODELS = ["sonar", "sonar-pro", "sonar-reasoning-pro"]
+
+
+def legacy_rows(count=60):
+    start = datetime(2026, 3, 1, 22, 0)
+    return [
+        {
+            "id": index * 3 + 5,  # Gaps, as left by deleted rows
+            "model": MODELS[index % 3],
+            "prompt_tokens": 10 + index,
+            "completion_tokens": 20 + index,
+            "total_tokens": 30 + 2 * index,
+            "search_context_size": index % 2,
+            "input_tokens_cost": 0.001 * index,
+            "output_tokens_cost": 0.002 * index,
+            "request_cost": 0.005,
+            "total_cost": 0.005 + 0.003 * index,
+            "input_prompt": f"Prompt {index}",
+            "output_prompt": f"Response {index}",
+            "created_at": start + timedelta(minutes=17 * index),
+            "energy_consumed": 0.0001 * index,
+            "carbon_emission": 0.05 * index,
+        }
+        for index in range(count)
+    ]
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    legacy_metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(legacy_usage_records.insert(), legacy_rows())
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def test_legacy_schema_is_migrated(legacy_engine, tmp_path, monkeypatch):
+    rows = legacy_rows()
+    assert create_schema(legacy_engine) == [1, 2]
+    assert create_schema(legacy_engine) == []
+
+    schema = inspect(legacy_engine)
+    columns = {column["name"] for column in schema.get_columns("usage_records")}
+    assert "model" not in columns and {"model_id", "cache_hit", "energy_avoided"} <= columns
+    assert "usage_records_legacy" not in schema.get_table_names()
+    indexes = {index["name"] for index in schema.get_indexes("usage_records")}
+    assert {"ix_usage_records_created_at", "ix_usage_records_created_at_metrics"} <= indexes
+
+    monkeypatch.setattr(archive_module, "_archive", UsageArchive(str(tmp_path / "archive")))
+    db = sessionmaker(bind=legacy_engine)()
+    try:
+        migrated = {record.id: record for record in db.query(UsageRecord)}
+        assert sorted(migrated) == [row["id"] for row in rows]
+        for row in rows:
+            record = migrated[row["id"]]
+            assert record.model_ref.name == row["model"]
+            for name, value in row.items():
+                if name not in ("id", "model"):
+                    assert getattr(record, name) == value, name
+            assert (record.cache_hit, record.energy_avoided, record.carbon_avoided) == (False, 0, 0)
+
+        ensure_rollups(db)
+        expected = defaultdict(lambda: [0, 0, 0.0])
+        for row in rows:
+            sums = expected[(row["created_at"].date(), row["model"])]
+            sums[0] += 1
+            sums[1] += row["total_tokens"]
+            sums[2] += row["total_cost"]
+        daily = {
+            (rollup.bucket_date, rollup.model): [rollup.request_count, rollup.total_tokens, rollup.total_cost]
+            for rollup in db.query(UsageRollupDaily)
+        }
+    finally:
+        db.close()
+    assert daily.keys() == expected.keys()
+    for key, (count, tokens, cost) in expected.items():
+        assert daily[key][:2] == [count, tokens]
+        assert daily[key][2] == pytest.approx(cost)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Request coalescing tests (SingleFlight)
+Concurrent callers on one key share a single upstream call and its result or exception, the key
+is released once the call finishes, and a caller going away doesn't cancel the call for the rest,
+only the last one does
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.singleflight import SingleFlight
+
+
+class Upstream:
+    """Counts calls; each call waits for `release` so callers pile up on it"""
+
+    def __init__(self, error=None):
+        self.calls = 0
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return {"answer": self.calls}
+
+
+async def join(flight, upstream, count, key="key"):
+    """Start `count` callers on one key and let them all join before the call finishes"""
+    callers = [asyncio.ensure_future(flight.do(key, upstream)) for _ in range(count)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    return callers
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        results = await asyncio.gather(*await join(flight, upstream, 10))
+        return flight, upstream, results
+
+    flight, upstream, results = asyncio.run(scenario())
+    assert upstream.calls == 1
+    assert [result for result, _ in results] == [{"answer": 1}] * 10
+    assert all(result is results[0][0] for result, _ in results)
+    assert sorted(coalesced for _, coalesced in results) == [False] + [True] * 9
+    assert flight.stats() == {"in_flight": 0, "calls": 1, "coalesced": 9}
+
+
+def test_leader_exception_reaches_every_caller_and_releases_the_key():
+    async def scenario():
+        flight, failing = SingleFlight(), Upstream(ConnectionError("upstream down"))
+        outcomes = await asyncio.gather(*await join(flight, failing, 5), return_exceptions=True)
+        in_flight = flight.stats()["in_flight"]
+
+        retry = Upstream()
+        retry.release.set()
+        return outcomes, in_flight, await flight.do("key", retry), retry.calls
+
+    outcomes, in_flight, retried, retry_calls = asyncio.run(scenario())
+    assert all(isinstance(outcome, ConnectionError) for outcome in outcomes)
+    assert len({id(outcome) for outcome in outcomes}) == 1
+    assert in_flight == 0
+    assert retried == ({"answer": 1}, False)
+    assert retry_calls == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        leader = asyncio.ensure_future(flight.do("key", upstream))
+        follower = asyncio.ensure_future(flight.do("key", upstream))
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower, upstream.calls
+
+    (result, coalesced), calls = asyncio.run(scenario())
+    assert (result, coalesced, calls) == ({"answer": 1}, True, 1)
+
+
+def test_different_keys_do_not_coalesce():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        upstream.release.set()
+        return await asyncio.gather(flight.do("a", upstream), flight.do("b", upstream)), upstream.calls
+
+    results, calls = asyncio.run(scenario())
+    assert calls == 2
+    assert [coalesced for _, coalesced in results] == [False, False]
+
+
+def test_call_is_cancelled_when_every_caller_is_gone():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        callers = [asyncio.ensure_future(flight.do("key", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        shared = flight._calls["key"]
+        for caller in callers:
+            caller.cancel()
+            await asyncio.sleep(0)
+            if caller is not callers[-1]:
+                assert not shared.cancelled() and not shared.done()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return shared, flight.stats()
+
+    shared, stats = asyncio.run(scenario())
+    assert shared.cancelled()
+    assert stats["in_flight"] == 0
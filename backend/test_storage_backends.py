@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Storage tests shared by both database backends
+Bulk ingestion (multi-row INSERT, or COPY for large batches on PostgreSQL), the rollups it
+maintains and the monthly usage_records partitions; PostgreSQL runs need TEST_POSTGRES_URL
+"""
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.ingest import build_usage_row, bulk_insert_usage
+from database.models import (
+    UsageRecord, UsageRollupDaily, UsageRollupHourly, create_async_database_engine, create_database_engine
+)
+from database.rollups import ROLLUP_METRICS, rebuild_rollups
+from utils.calculations import calculate_costs_and_metrics
+
+MODELS = ["sonar-reasoning-pro", "sonar-pro", "sonar"]
+
+
+def _rows(count, start=None, step=timedelta(minutes=7)):
+    start = start or datetime.utcnow() - step * count
+    rows = []
+    for i in range(count):
+        model = MODELS[i % len(MODELS)]
+        prompt = f"Prompt {i} about renewable energy"
+        response = f"Response {i} " * (i % 5 + 1)
+        metrics = calculate_costs_and_metrics(prompt, response, model)
+        if i % 4 == 0:
+            metrics.update(cache_hit=True, energy_avoided=0.001, carbon_avoided=0.5)
+        rows.append(build_usage_row(prompt, response, model, metrics, created_at=start + step * i))
+    return rows
+
+
+def _rollup_snapshot(db, table, key):
+    return {
+        (getattr(row, key), row.model): tuple(round(getattr(row, name), 9) for name in ROLLUP_METRICS)
+        for row in db.query(table).all()
+    }
+
+
+@pytest.mark.parametrize("count", [3, 120])  # Below and above POSTGRES_COPY_MIN_ROWS
+def test_bulk_insert_returns_ids_in_row_order(database_url, count):
+    engine = create_database_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        rows = _rows(count)
+        ids = bulk_insert_usage(db, rows)
+        db.commit()
+
+        assert len(set(ids)) == count
+        stored = {record.id: record for record in db.query(UsageRecord).all()}
+        assert [stored[record_id].input_prompt for record_id in ids] == [row["input_prompt"] for row in rows]
+        assert [stored[record_id].model for record_id in ids] == [row["model"] for row in rows]
+        assert [stored[record_id].cache_hit for record_id in ids] == [row["cache_hit"] for row in rows]
+
+        requests, cache_hits = db.query(
+            func.sum(UsageRollupDaily.request_count), func.sum(UsageRollupDaily.cache_hits)
+        ).one()
+        assert requests == count
+        assert cache_hits == sum(1 for row in rows if row["cache_hit"])
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_async_bulk_insert(database_url):
+    """The request path inserts through AsyncSession.run_sync (COPY included)"""
+    async def scenario():
+        engine = create_async_database_engine(database_url)
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        try:
+            async with sessions() as db:
+                ids = await db.run_sync(bulk_insert_usage, _rows(80))
+                await db.commit()
+            async with sessions() as db:
+                count = (await db.execute(select(func.count(UsageRecord.id)))).scalar_one()
+            return ids, count
+        finally:
+            await engine.dispose()
+
+    ids, count = asyncio.run(scenario())
+    assert len(set(ids)) == count == 80
+
+
+def test_incremental_rollups_match_rebuild(database_url):
+    engine = create_database_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        # Six months of usage, so PostgreSQL spreads it over several partitions
+        for batch in range(3):
+            bulk_insert_usage(db, _rows(90, start=datetime.utcnow() - timedelta(days=180 - batch), step=timedelta(days=2)))
+        db.commit()
+        hourly = _rollup_snapshot(db, UsageRollupHourly, "bucket_start")
+        daily = _rollup_snapshot(db, UsageRollupDaily, "bucket_date")
+
+        rebuild_rollups(db)
+        assert _rollup_snapshot(db, UsageRollupHourly, "bucket_start") == hourly
+        assert _rollup_snapshot(db, UsageRollupDaily, "bucket_date") == daily
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_usage_records_are_partitioned_by_month(database_url):
+    if not database_url.startswith("postgres"):
+        pytest.skip("Partitioning is PostgreSQL-only")
+    from database.postgres import month_start, partition_name
+
+    engine = create_database_engine(database_url)
+    db = sessionmaker(bind=engine)()
+    try:
+        # Older than the partitions created with the schema, so created on ingest
+        old = datetime.utcnow() - timedelta(days=800)
+        rows = _rows(60, start=old, step=timedelta(hours=1))
+        bulk_insert_usage(db, rows)
+        db.commit()
+
+        partitions = dict(db.execute(text(
+            "SELECT tableoid::regclass::text, count(*) FROM usage_records GROUP BY 1"
+        )).all())
+        assert set(partitions) == {partition_name(month_start(row["created_at"])) for row in rows}
+        assert sum(partitions.values()) == 60
+        assert db.execute(text(
+            "SELECT am.amname FROM pg_class c JOIN pg_am am ON am.oid = c.relam "
+            "WHERE c.relname = 'ix_usage_records_created_at'"
+        )).scalar_one() == "brin"
+    finally:
+        db.close()
+        engine.dispose()
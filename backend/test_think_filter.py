@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Equivalence test for the streaming <think> filter
+Whatever way the text is split into chunks, ThinkBlockFilter must keep exactly what the
+non-streaming <think>.*?</think> substitution keeps
+"""
+
+import os
+import random
+import re
+import sys
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.reasoning import ThinkBlockFilter
+
+THINK_BLOCK = re.compile(r"<think>.*?</think>", flags=re.DOTALL | re.IGNORECASE)
+
+
+def filter_chunks(chunks):
+    reasoning = ThinkBlockFilter()
+    answer = "".join(reasoning.feed(chunk) for chunk in chunks) + reasoning.finish()
+    return answer, reasoning
+
+
+def _random_chunks(rng, text):
+    chunks, start = [], 0
+    while start < len(text):
+        size = rng.randint(1, 9)
+        chunks.append(text[start:start + size])
+        start += size
+    return chunks
+
+
+def test_tags_split_across_chunks():
+    chunks = ["<thi", "nk>weighing options", "</TH", "INK>", "Final", " prompt: <t", "able>"]
+    answer, reasoning = filter_chunks(chunks)
+    assert answer == "Final prompt: <table>"
+    assert reasoning.reasoning_chars == len("weighing options")
+    assert not reasoning.inside
+
+
+def test_unclosed_reasoning_is_reported():
+    answer, reasoning = filter_chunks(["Draft <think>still reasoning", "</thi"])
+    assert answer == "Draft "
+    assert reasoning.inside
+
+
+def test_filter_matches_regex_for_any_chunking():
+    rng = random.Random(2024)
+    pieces = ["<think>", "</think>", "<THINK>", "</Think>", "<thin", "k>", "</", "<", ">", "think",
+              "reasoning ", "Final prompt", "\n", "`", "İ"]
+    for _ in range(2000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 30)))
+        answer, reasoning = filter_chunks(_random_chunks(rng, text))
+        if not reasoning.inside:
+            assert answer == THINK_BLOCK.sub("", text)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tokenizer tests
+A failed encoding load falls back to approximate counts for TOKENIZER_RETRY_SECONDS only: the
+load is retried afterwards, estimates are never cached and stats() reports the fallback. A failed
+startup warmup fails the tokenizer readiness step, so /ready reports 503 until a retried warmup
+succeeds. Streamed token counts match a full encode however the text is chunked
+"""
+
+import asyncio
+import os
+import random
+import sys
+
+import pytest
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import tiktoken
+
+from utils import tokenizer
+from utils.readiness import Readiness
+from utils.tokenizer import StreamingTokenCounter, TokenizerEngine, approximate_tokens
+
+
+class FakeEncoding:
+    """One token per whitespace-separated word"""
+
+    def encode(self, text, disallowed_special=()):
+        return text.split()
+
+    def encode_batch(self, texts, num_threads=1, disallowed_special=()):
+        return [self.encode(text) for text in texts]
+
+
+class FlakyLoader:
+    """Stands in for tiktoken's loaders: fails while `failing` is set, counts every attempt"""
+
+    def __init__(self):
+        self.failing = True
+        self.attempts = 0
+
+    def __call__(self, name):
+        self.attempts += 1
+        if self.failing:
+            raise ConnectionError("could not download the BPE ranks")
+        return FakeEncoding()
+
+
+def unknown_model(name):
+    raise KeyError(f"Could not automatically map {name} to a tokeniser")
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    loader = FlakyLoader()
+    monkeypatch.setattr(tiktoken, "get_encoding", loader)
+    monkeypatch.setattr(tiktoken, "encoding_for_model", unknown_model)
+    return loader
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tokenizer.time, "monotonic", lambda: now[0])
+    return now
+
+
+TEXT = "Explain how solar panels turn sunlight into electricity"
+
+
+def test_failed_load_is_retried_after_the_interval(loader, clock):
+    engine = TokenizerEngine(retry_seconds=60)
+
+    assert engine.count_tokens(TEXT) == approximate_tokens(TEXT)
+    assert engine.count_tokens(TEXT) == approximate_tokens(TEXT)
+    assert loader.attempts == 1
+
+    stats = engine.stats()
+    assert stats["fallback_encodings"]["cl100k_base"]["error"] == "could not download the BPE ranks"
+    assert stats["approximated_counts"] == 2
+    assert stats["cache_entries"] == 0
+
+    loader.failing = False
+    clock[0] += 30
+    assert engine.count_tokens(TEXT) == approximate_tokens(TEXT)
+    assert loader.attempts == 1
+
+    clock[0] += 31
+    assert engine.count_tokens(TEXT) == len(TEXT.split())
+    stats = engine.stats()
+    assert stats["fallback_encodings"] == {}
+    assert stats["encodings_loaded"] == 1
+
+
+def test_loaded_encoding_is_kept(loader, clock):
+    loader.failing = False
+    engine = TokenizerEngine()
+    assert engine.count_tokens_many([TEXT, "two words"]) == [len(TEXT.split()), 2]
+
+    loader.failing = True
+    clock[0] += 3600
+    assert engine.count_tokens("three more words") == 3
+    assert loader.attempts == 1
+
+
+def test_model_names_are_mapped_to_their_encoding(loader, monkeypatch):
+    monkeypatch.setattr(tiktoken, "encoding_for_model", lambda name: FakeEncoding() if name == "gpt-4" else unknown_model(name))
+    engine = TokenizerEngine()
+    assert engine.count_tokens(TEXT, "gpt-4") == len(TEXT.split())
+    assert engine.get_encoding("sonar") is None
+    assert "Could not automatically map sonar" in engine.stats()["fallback_encodings"]["sonar"]["error"]
+    assert loader.attempts == 0
+
+
+def test_failed_prewarm_keeps_ready_at_503(loader):
+    """The startup warmup is the readiness check for the tokenizer: a failed load must fail it"""
+    async def scenario():
+        readiness = Readiness()
+        readiness.start("tokenizer", TokenizerEngine().prewarm, ["cl100k_base"])
+        await asyncio.gather(*readiness._tasks)
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    step = readiness.stats()["steps"]["tokenizer"]
+    assert not readiness.ready
+    assert step["status"] == "failed"
+    assert step["error"] == "Tokenizer encodings failed to load (cl100k_base: could not download the BPE ranks)"
+
+    loader.failing = False
+    assert TokenizerEngine().prewarm(["cl100k_base"]) == {"cl100k_base": True}
+
+
+def test_prewarm_step_is_retried_until_the_load_succeeds(loader):
+    """A transient load failure must not keep /ready at 503 for the life of the process"""
+    engine = TokenizerEngine(retry_seconds=0)
+
+    async def scenario():
+        readiness = Readiness()
+        readiness.start("tokenizer", engine.prewarm, ["cl100k_base"], retry_seconds=0.01)
+        while readiness.stats()["steps"]["tokenizer"].get("attempts", 0) < 2:
+            await asyncio.sleep(0.005)
+        assert not readiness.ready
+        loader.failing = False
+        await asyncio.wait_for(asyncio.gather(*readiness._tasks), 5)
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    step = readiness.stats()["steps"]["tokenizer"]
+    assert readiness.ready
+    assert step["status"] == "done"
+    assert step["attempts"] >= 3
+    assert "error" not in step
+
+
+# cl100k_base's pre-tokenizer with a small vocabulary, so counts change wherever a streamed count
+# would split a piece the full encode keeps whole (the real ranks need a download)
+CL100K_PATTERN = r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+VOCABULARY = [
+    ".\n\n", ".\n", "!\n", "?\n\n", ":\n", ".)\n", "\n\n", " \n", "\r\n", "  ", "...", ", ",
+    "Done", "Next", " step", " the", " café", " 漢字", "'s", "123", " (", "é",
+]
+FRAGMENTS = [
+    "Done", ".", "\n", "\n\n", " step", " the", "!", "?", ":", ")", " (", " ", "  ", "\t", "\r\n",
+    "123", "45", " café", " 漢字", "e\u0301", "'s", "...", ",", "Next", "_", " 🌍",
+]
+
+
+def cl100k_like_encoding():
+    ranks = {bytes([byte]): byte for byte in range(256)}
+    for word in VOCABULARY:
+        encoded = word.encode("utf-8")
+        for end in range(2, len(encoded) + 1):  # Every prefix, so BPE can merge its way up
+            ranks.setdefault(encoded[:end], len(ranks))
+    return tiktoken.Encoding("cl100k_like", pat_str=CL100K_PATTERN, mergeable_ranks=ranks, special_tokens={})
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    encoding = cl100k_like_encoding()
+    monkeypatch.setattr(tiktoken, "get_encoding", lambda name: encoding)
+    return encoding
+
+
+def streamed_count(chunks):
+    counter = StreamingTokenCounter(engine=TokenizerEngine())
+    for chunk in chunks:
+        counter.feed(chunk)
+    return counter.finish()
+
+
+def test_streamed_count_keeps_punctuation_with_its_newlines(encoding):
+    text = "Done.\n\nNext step"
+    assert len(encoding.encode(text)) < len(encoding.encode("Done.")) + len(encoding.encode("\n\nNext step"))
+    assert streamed_count(["Done.", "\n\n", "Next", " step"]) == len(encoding.encode(text))
+    assert streamed_count(["Done!\n", "Next step?\n\n"]) == len(encoding.encode("Done!\nNext step?\n\n"))
+
+
+def test_streamed_count_matches_full_encode_for_any_chunking(encoding):
+    rng = random.Random(5)
+    for _ in range(500):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 30)))
+        chunks, start = [], 0
+        while start < len(text):
+            size = rng.randint(1, 8)
+            chunks.append(text[start:start + size])
+            start += size
+        assert streamed_count(chunks) == len(encoding.encode(text)), repr(text)
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker and hedging tests
+State transitions of CircuitBreaker (closed -> open -> half-open -> closed or open again),
+ResilientUpstream always settling the half-open probe, whatever way an attempt ends, and hedged
+attempts: sent only after the hedge delay, within HEDGE_MAX_RATIO, with the loser cancelled
+"""
+
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils import upstream
+from utils.upstream import CircuitBreaker, CircuitOpenError, ResilientUpstream, UpstreamPolicy
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the module's clock: asyncio's event loop reads time.monotonic too
+    now = [1000.0]
+    monkeypatch.setattr(upstream, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.min_calls):
+        assert breaker.allow()
+        breaker.record(False)
+    assert breaker.state == "open"
+
+
+def test_opens_at_the_failure_rate_once_min_calls_are_seen(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, cooldown_seconds=30)
+    for _ in range(3):
+        breaker.record(False)
+    assert breaker.state == "closed"  # Every call failed, but only 3 were seen
+
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=4, cooldown_seconds=30)
+    for success in (False, True, True, True, True):
+        breaker.record(success)
+    assert breaker.state == "closed"  # The failure slid out of the window
+    breaker.record(False)
+    assert breaker.state == "closed"  # 1 of 4
+    breaker.record(False)
+    assert breaker.state == "open"    # 2 of 4
+    assert breaker.times_opened == 1
+    assert breaker.stats()["recent_calls"] == 0
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=2, cooldown_seconds=30)
+    open_breaker(breaker)
+    assert not breaker.allow()
+    clock[0] += 10
+    assert breaker.retry_after() == pytest.approx(20)
+
+    clock[0] += 20
+    assert breaker.allow()           # The single probe
+    assert breaker.state == "half_open"
+    assert not breaker.allow()       # Everyone else waits for its outcome
+    breaker.record(False)
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+    assert breaker.retry_after() == pytest.approx(30)
+
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_released_probe_lets_the_next_call_probe(clock):
+    breaker = CircuitBreaker(failure_rate=0.5, window=4, min_calls=2, cooldown_seconds=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow()
+    breaker.release()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def half_open_upstream(clock, handler):
+    policy = UpstreamPolicy("test", retries=0, breaker_min_calls=2, breaker_cooldown_seconds=30)
+    client = httpx.AsyncClient(base_url="http://upstream.test", transport=httpx.MockTransport(handler))
+    resilient = ResilientUpstream("test", lambda: client, policy)
+    open_breaker(resilient.breaker)
+    clock[0] += 30
+    return resilient
+
+
+@pytest.mark.parametrize("error", [httpx.ReadTimeout("slow"), ValueError("bad payload"), RuntimeError("bug")])
+def test_any_failed_probe_reopens_the_breaker(clock, error):
+    def handler(request):
+        raise error
+
+    resilient = half_open_upstream(clock, handler)
+    with pytest.raises(type(error)):
+        asyncio.run(resilient.post("/chat"))
+    assert resilient.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(resilient.post("/chat"))
+
+
+def test_cancelled_probe_is_released(clock):
+    async def handler(request):
+        await asyncio.sleep(10)
+
+    async def scenario():
+        resilient = half_open_upstream(clock, handler)
+        task = asyncio.ensure_future(resilient.post("/chat"))
+        await asyncio.sleep(0.01)
+        assert not resilient.breaker.allow()  # Probe in flight
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return resilient
+
+    resilient = asyncio.run(scenario())
+    assert resilient.breaker.state == "half_open"
+    assert resilient.breaker.allow()
+
+
+def test_probe_response_decides_the_state(clock):
+    statuses = [503, 200]
+    resilient = half_open_upstream(clock, lambda request: httpx.Response(statuses.pop(0)))
+
+    assert asyncio.run(resilient.post("/chat")).status_code == 503
+    assert resilient.breaker.state == "open"
+    clock[0] += 30
+    assert asyncio.run(resilient.post("/chat")).status_code == 200
+    assert resilient.breaker.state == "closed"
+
+
+class SlowFirstAttempt:
+    """Mock upstream: an attempt takes `slow` seconds unless another one is already in flight"""
+
+    def __init__(self, slow=0.5):
+        self.slow = slow
+        self.in_flight = 0
+        self.started = []
+        self.cancelled = 0
+
+    async def __call__(self, request):
+        self.started.append(time.perf_counter())
+        delay = self.slow if self.in_flight == 0 else 0.0
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.in_flight -= 1
+        return httpx.Response(200, json={"attempt": len(self.started)})
+
+
+def hedging_upstream(handler, **policy):
+    settings = dict(retries=0, hedge_percentile=50, hedge_min_samples=5, hedge_min_delay_ms=50, hedge_max_ratio=1.0)
+    client = httpx.AsyncClient(base_url="http://upstream.test", transport=httpx.MockTransport(handler))
+    resilient = ResilientUpstream("test", lambda: client, UpstreamPolicy("test", **{**settings, **policy}))
+    resilient._latencies.extend([0.01] * 5)  # Calibrated: p50 10ms, so the 50ms floor applies
+    return resilient
+
+
+def test_hedge_is_sent_after_the_delay_and_the_loser_cancelled():
+    handler = SlowFirstAttempt()
+    resilient = hedging_upstream(handler)
+
+    async def scenario():
+        started = time.perf_counter()
+        response = await resilient.post("/chat")
+        return response, time.perf_counter() - started
+
+    response, elapsed = asyncio.run(scenario())
+    assert response.json() == {"attempt": 2}
+    assert len(handler.started) == 2
+    assert handler.started[1] - handler.started[0] >= 0.05
+    assert elapsed < 0.4
+    assert handler.cancelled == 1
+    assert (resilient.hedges, resilient.hedge_wins) == (1, 1)
+
+
+def test_no_hedge_when_the_first_attempt_is_fast_or_uncalibrated():
+    handler = SlowFirstAttempt(slow=0.01)
+    resilient = hedging_upstream(handler)
+    asyncio.run(resilient.post("/chat"))
+    assert (len(handler.started), resilient.hedges) == (1, 0)
+
+    handler = SlowFirstAttempt(slow=0.2)
+    resilient = hedging_upstream(handler, hedge_min_samples=50)
+    asyncio.run(resilient.post("/chat"))
+    assert (len(handler.started), resilient.hedges) == (1, 0)
+
+
+def test_hedges_stay_within_the_ratio():
+    handler = SlowFirstAttempt(slow=0.15)
+    resilient = hedging_upstream(handler, hedge_max_ratio=0.5)
+
+    async def scenario():
+        for _ in range(6):
+            await resilient.post("/chat")
+
+    asyncio.run(scenario())
+    assert resilient.requests == 6
+    assert resilient.hedges == 3  # Every other request, once the ratio allows it again
+    assert len(handler.started) == 9
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Parquet cold tier tests
+Archiving closed days must not change what range queries and rebuilt rollups report, range
+scans must skip files and row groups outside the range, and rows left in usage_records by an
+interrupted archive run must not be counted twice
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("pyarrow")
+
+from database import archive as archive_module
+from database.archive import UsageArchive, usage_by_day
+from database.ingest import bulk_insert_usage
+from database.models import UsageRecord, UsageRollupDaily, UsageRollupHourly, create_database_engine
+from database.rollups import rebuild_rollups
+from test_storage_backends import _rollup_snapshot, _rows
+
+TODAY = datetime.utcnow().date()
+
+
+@pytest.fixture
+def db(database_url):
+    engine = create_database_engine(database_url)
+    session = sessionmaker(bind=engine)()
+    try:
+        # Twenty days of usage, one row every 20 minutes
+        start = datetime.combine(TODAY - timedelta(days=19), datetime.min.time())
+        bulk_insert_usage(session, _rows(20 * 72, start=start, step=timedelta(minutes=20)))
+        session.commit()
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+def _report(db, archive, first, last):
+    report = usage_by_day(db, first, last, archive)
+    return report, [(row["date"], row["model"], row["request_count"], row["total_tokens"]) for row in report["daily"]]
+
+
+def test_archive_keeps_range_queries_and_rollups(db, tmp_path):
+    archive = UsageArchive(str(tmp_path), row_group_size=12)
+    first, last = TODAY - timedelta(days=19), TODAY
+    before, before_rows = _report(db, archive, first, last)
+    hourly = _rollup_snapshot(db, UsageRollupHourly, "bucket_start")
+    daily = _rollup_snapshot(db, UsageRollupDaily, "bucket_date")
+
+    moved = archive.archive_closed_days(db, keep_days=5, today=TODAY)
+    assert sorted(moved) == [TODAY - timedelta(days=day) for day in range(19, 5, -1)]
+    assert sum(moved.values()) == 14 * 72
+    assert db.query(UsageRecord).count() == 6 * 72
+    assert archive.days() == sorted(moved)
+
+    after, after_rows = _report(db, archive, first, last)
+    assert after_rows == before_rows
+    assert after["totals"] == before["totals"]
+    assert after["sources"]["archived_rows"] == 14 * 72
+
+    rebuild_rollups(db, archive)
+    assert _rollup_snapshot(db, UsageRollupHourly, "bucket_start") == hourly
+    assert _rollup_snapshot(db, UsageRollupDaily, "bucket_date") == daily
+
+
+def test_scan_skips_days_and_row_groups_outside_range(db, tmp_path):
+    archive = UsageArchive(str(tmp_path), row_group_size=12)  # 72 rows a day: 6 row groups of 4 hours
+    archive.archive_closed_days(db, keep_days=5, today=TODAY)
+    day = TODAY - timedelta(days=10)
+    start = datetime.combine(day, datetime.min.time()) + timedelta(hours=8)
+
+    table, stats = archive.scan(start, start + timedelta(hours=4))
+    assert stats["files"] == 1
+    assert stats["row_groups"] == 1
+    assert table.num_rows == 12
+
+    report, _ = _report(db, archive, day, day)
+    assert report["sources"]["archive_files_read"] == 1
+    assert report["totals"]["request_count"] == 72
+
+
+def test_interrupted_archive_is_not_counted_twice(db, tmp_path):
+    archive = UsageArchive(str(tmp_path))
+    day = TODAY - timedelta(days=12)
+    before, before_rows = _report(db, archive, day - timedelta(days=1), day)
+
+    # The file was written but the delete never committed: the day is in both tiers
+    archive.write_day(db, day)
+    during, during_rows = _report(db, archive, day - timedelta(days=1), day)
+    assert during_rows == before_rows
+    assert during["sources"]["archived_rows"] == 0
+
+    # The next run rewrites the day's file instead of adding the rows again
+    assert archive.archive_day(db, day) == 72
+    after, after_rows = _report(db, archive, day - timedelta(days=1), day)
+    assert after_rows == before_rows
+    assert after["sources"]["archived_rows"] == 72
+
+
+@pytest.mark.parametrize("moment", ["before_read", "after_read", "after_read_interrupted"])
+def test_archive_run_during_range_query_is_counted_once(db, database_url, tmp_path, monkeypatch, moment):
+    archive = UsageArchive(str(tmp_path))
+    day = TODAY - timedelta(days=12)
+    first, last = day - timedelta(days=1), day
+    _, expected = _report(db, archive, first, last)
+
+    # Another process archives the day while the query runs: after the archive was listed but
+    # before the live rows were read, or after that read but before the Parquet scan
+    engine = create_database_engine(database_url)
+    other = sessionmaker(bind=engine)()
+
+    def archive_run():
+        if moment == "after_read_interrupted":
+            archive.write_day(other, day)  # published, delete not committed yet
+        else:
+            archive.archive_day(other, day)
+
+    list_days, read_live = archive.days, archive_module.grouped_usage_sums
+
+    def days_then_archive():
+        days = list_days()
+        if moment == "before_read" and not days:
+            archive_run()
+        return days
+
+    def read_then_archive(*args, **kwargs):
+        result = read_live(*args, **kwargs)
+        if moment != "before_read" and not list_days():
+            archive_run()
+        return result
+
+    monkeypatch.setattr(archive, "days", days_then_archive)
+    monkeypatch.setattr(archive_module, "grouped_usage_sums", read_then_archive)
+    try:
+        report, rows = _report(db, archive, first, last)
+    finally:
+        other.close()
+        engine.dispose()
+    assert list_days() == [day]
+    assert rows == expected
+    assert report["sources"]["live_rows"] + report["sources"]["archived_rows"] == 2 * 72
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Usage reporter accounting tests
+A batch the Analytics API accepts can still reject single records: those count as failed, not
+sent, whether the batch went over HTTP to /store-usage/batch or through the in-process sink
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.usage_reporter import UsageReporter
+
+EVENTS = [{"MODEL": "sonar", "INPUT_PROMPT": "a", "OUTPUT_PROMPT": "b"}, {"MODEL": "sonar"}, {"MODEL": "sonar"}]
+
+
+def batch_result(events):
+    """What /store-usage/batch answers: events without OUTPUT_PROMPT are rejected"""
+    results = [
+        {"index": index, "id": index + 1} if "OUTPUT_PROMPT" in event
+        else {"index": index, "error": "OUTPUT_PROMPT: Field required"}
+        for index, event in enumerate(events)
+    ]
+    stored = sum("id" in result for result in results)
+    return {"message": "Usage batch processed", "stored": stored, "failed": len(results) - stored, "results": results}
+
+
+def report_all(reporter, events):
+    async def scenario():
+        await reporter.start()
+        for event in events:
+            reporter.report(event)
+        await reporter.stop()
+        return reporter.stats()
+
+    return asyncio.run(scenario())
+
+
+def test_rejected_records_in_an_http_batch_count_as_failed():
+    def handler(request):
+        events = [json.loads(line) for line in request.content.decode("utf-8").splitlines()]
+        return httpx.Response(200, json=batch_result(events))
+
+    client = httpx.AsyncClient(base_url="http://analytics.test", transport=httpx.MockTransport(handler))
+    stats = report_all(UsageReporter(lambda: client), EVENTS)
+    assert (stats["sent"], stats["failed"], stats["batches_sent"]) == (1, 2, 1)
+
+
+def test_rejected_records_from_the_sink_count_as_failed():
+    async def sink(events):
+        return batch_result(events)
+
+    stats = report_all(UsageReporter(lambda: None, sink=sink), EVENTS)
+    assert (stats["sent"], stats["failed"], stats["batches_sent"]) == (1, 2, 1)
+
+
+def test_responses_without_results_count_as_sent():
+    client = httpx.AsyncClient(base_url="http://analytics.test",
+                               transport=httpx.MockTransport(lambda request: httpx.Response(200, text="ok")))
+    stats = report_all(UsageReporter(lambda: client), EVENTS)
+    assert (stats["sent"], stats["failed"]) == (3, 0)
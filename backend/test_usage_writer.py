@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Write-behind ingestion tests (UsageWriter)
+Batches flush when full and when the flush interval ends, durability="commit" acknowledges a row
+only once it is committed, failed batches are reported to their submitters, and stop() drains
+everything still queued into the database
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+# Add current directory to path for imports
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database.ingest import UsageWriter
+from database.models import UsageRecord, UsageRollupDaily, create_database_engine
+from test_storage_backends import _rows
+
+
+@pytest.fixture
+def sessions(database_url):
+    engine = create_database_engine(database_url)
+    try:
+        yield sessionmaker(bind=engine)
+    finally:
+        engine.dispose()
+
+
+def stored(sessions):
+    db = sessions()
+    try:
+        return db.query(UsageRecord).count(), sum(row.request_count for row in db.query(UsageRollupDaily))
+    finally:
+        db.close()
+
+
+async def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_full_batches_flush_without_waiting_for_the_interval(sessions):
+    async def scenario():
+        writer = UsageWriter(sessions, batch_size=10, flush_interval_ms=60_000, durability="enqueue")
+        await writer.start()
+        for row in _rows(20):
+            assert await writer.submit(row) is None
+        await wait_for(lambda: writer.rows_written == 20)
+        stats = writer.stats()
+        await writer.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["batches_written"] == 2
+    assert stored(sessions) == (20, 20)
+
+
+def test_partial_batch_flushes_after_the_interval(sessions):
+    async def scenario():
+        writer = UsageWriter(sessions, batch_size=1000, flush_interval_ms=50, durability="enqueue")
+        await writer.start()
+        for row in _rows(5):
+            await writer.submit(row)
+        assert writer.rows_written == 0  # Lingering for more rows
+        await wait_for(lambda: writer.rows_written == 5)
+        stats = writer.stats()
+        await writer.stop()
+        return stats
+
+    stats = asyncio.run(scenario())
+    assert stats["batches_written"] == 1
+    assert stored(sessions) == (5, 5)
+
+
+def test_commit_mode_acknowledges_committed_rows(sessions):
+    async def submit_and_check(writer, row):
+        record_id = await writer.submit(row)
+        db = sessions()  # Another connection: the row must already be committed
+        try:
+            assert db.get(UsageRecord, record_id).input_prompt == row["input_prompt"]
+        finally:
+            db.close()
+        return record_id
+
+    async def scenario():
+        writer = UsageWriter(sessions, batch_size=8, durability="commit")
+        await writer.start()
+        ids = await asyncio.gather(*(submit_and_check(writer, row) for row in _rows(30)))
+        stats = writer.stats()
+        await writer.stop()
+        return ids, stats
+
+    ids, stats = asyncio.run(scenario())
+    assert len(set(ids)) == 30
+    assert stats["rows_written"] == 30
+    assert 4 <= stats["batches_written"] < 30  # Grouped, at most batch_size rows each
+    assert stored(sessions) == (30, 30)
+
+
+def test_failed_batch_reaches_its_submitters_and_the_writer_continues(sessions):
+    good, bad = _rows(2)
+    del bad["prompt_tokens"]
+
+    async def scenario():
+        writer = UsageWriter(sessions, batch_size=1, durability="commit")
+        await writer.start()
+        with pytest.raises(Exception):
+            await writer.submit(bad)
+        record_id = await writer.submit(good)
+        stats = writer.stats()
+        await writer.stop()
+        return record_id, stats
+
+    record_id, stats = asyncio.run(scenario())
+    assert record_id is not None
+    assert (stats["rows_failed"], stats["rows_written"]) == (1, 1)
+    assert stored(sessions) == (1, 1)
+
+
+@pytest.mark.parametrize("durability", ["enqueue", "commit"])
+def test_stop_drains_the_queue(sessions, durability):
+    async def scenario():
+        writer = UsageWriter(sessions, batch_size=7, flush_interval_ms=20, durability=durability)
+        await writer.start()
+        submitted = [asyncio.ensure_future(writer.submit(row)) for row in _rows(100)]
+        await asyncio.sleep(0)  # Everything is queued or being written, nothing awaited yet
+        await writer.stop()
+        assert all(task.done() for task in submitted)
+        return writer.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["queued"] == 0
+    assert stats["rows_written"] == 100
+    assert stored(sessions) == (100, 100)
@@ -1,7 +1,9 @@
-import tiktoken
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 
+from utils import tokenizer
+from utils.green_rules import get_green_rules
+
 # Model pricing (per 1K tokens) - Perplexity AI pricing
 MODEL_PRICING = {
     "sonar-reasoning-pro": {
@@ -20,13 +22,13 @@ MODEL_PRICING = {
 
 
 def count_tokens(text: str, model: str = "cl100k_base") -> int:
-    """Count tokens in text using tiktoken"""
-    try:
-        encoding = tiktoken.get_encoding(model)
-        return len(encoding.encode(text))
-    except Exception:
-        # Fallback: approximate token count (1 token ≈ 4 characters)
-        return len(text) // 4
+    """Count tokens in text using the shared (cached) tiktoken engine"""
+    return tokenizer.count_tokens(text, model)
+
+
+def count_tokens_many(texts: List[str], model: str = "cl100k_base") -> List[int]:
+    """Count tokens for several texts in one batched tiktoken call"""
+    return tokenizer.count_tokens_many(texts, model)
 
 
 def calculate_energy_consumption(total_tokens: int, model: str) -> float:
@@ -53,10 +55,45 @@ def calculate_costs_and_metrics(input_prompt: str, output_prompt: str, model: st
     """Calculate all costs and metrics for a given prompt/response pair"""
 
     # Token counting
-    prompt_tokens = count_tokens(input_prompt)
-    completion_tokens = count_tokens(output_prompt)
+    prompt_tokens, completion_tokens = count_tokens_many([input_prompt, output_prompt])
+    return calculate_metrics_from_tokens(prompt_tokens, completion_tokens, model)
+
+
+def calculate_costs_and_metrics_many(items: List[Tuple[str, str, str]]) -> List[Dict[str, Any]]:
+    """Calculate metrics for many (input_prompt, output_prompt, model) triples with one batched token count"""
+    return calculate_reported_metrics_many([(input_prompt, output_prompt, model, None, None, 0)
+                                            for input_prompt, output_prompt, model in items])
+
+
+def calculate_reported_metrics_many(
+    items: List[Tuple[str, str, str, Optional[int], Optional[int], int]]
+) -> List[Dict[str, Any]]:
+    """
+    Calculate metrics for (input_prompt, output_prompt, model, prompt_tokens, completion_tokens,
+    search_context_size) tuples, tokenizing only the texts whose count was not reported
+    """
+    texts = []
+    for input_prompt, output_prompt, _, prompt_tokens, completion_tokens, _ in items:
+        if prompt_tokens is None:
+            texts.append(input_prompt)
+        if completion_tokens is None:
+            texts.append(output_prompt)
+    counts = iter(count_tokens_many(texts) if texts else [])
+
+    results = []
+    for _, _, model, prompt_tokens, completion_tokens, search_context_size in items:
+        if prompt_tokens is None:
+            prompt_tokens = next(counts)
+        if completion_tokens is None:
+            completion_tokens = next(counts)
+        results.append(calculate_metrics_from_tokens(prompt_tokens, completion_tokens, model, search_context_size))
+    return results
+
+
+def calculate_metrics_from_tokens(prompt_tokens: int, completion_tokens: int, model: str,
+                                  search_context_size: int = 0) -> Dict[str, Any]:
+    """Calculate costs and environmental metrics from already-counted tokens"""
     total_tokens = prompt_tokens + completion_tokens
-    search_context_size = 0  # Default for non-search models
 
     # Cost calculations
     pricing = MODEL_PRICING.get(model, MODEL_PRICING["sonar"])
@@ -83,75 +120,47 @@ def calculate_costs_and_metrics(input_prompt: str, output_prompt: str, model: st
     }
 
 
+def cache_hit_metrics(served_metrics: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Metrics for a response served from cache: nothing spent upstream, the original cost avoided"""
+    metrics = calculate_metrics_from_tokens(0, 0, model)
+    metrics["cache_hit"] = True
+    metrics["energy_avoided"] = served_metrics["energy_consumed"]
+    metrics["carbon_avoided"] = served_metrics["carbon_emission"]
+    return metrics
+
+
 def optimize_prompt_for_green(user_prompt: str) -> Dict[str, Any]:
     """Enhanced analysis and optimization for reduced environmental impact with no quality compromise"""
     original_tokens = count_tokens(user_prompt)
 
-    # Enhanced optimization strategies
-    optimized_prompt = user_prompt
-
-    # 1. Remove excessive politeness while maintaining respect
-    politeness_replacements = {
-        "please could you kindly": "please",
-        "i would really appreciate": "",
-        "if possible": "",
-        "thank you very much": "",
-        "please kindly": "please",
-        "could you please": "please",
-        "would you mind": "",
-        "i would be grateful": ""
-    }
-
-    for verbose, concise in politeness_replacements.items():
-        optimized_prompt = optimized_prompt.lower().replace(verbose, concise)
-
-    # 2. Consolidate redundant descriptors
-    redundancy_replacements = {
-        "detailed and comprehensive": "comprehensive",
-        "complete and thorough": "thorough",
-        "step-by-step instructions": "instructions",
-        "all the important aspects": "key aspects",
-        "various different": "various",
-        "absolutely essential": "essential",
-        "highly important": "important",
-        "extremely detailed": "detailed"
-    }
-
-    for redundant, concise in redundancy_replacements.items():
-        optimized_prompt = optimized_prompt.replace(redundant, concise)
-
-    # 3. Convert passive to active voice patterns
-    passive_to_active = {
-        "explanation should be provided": "explain",
-        "information needs to be included": "include",
-        "examples should be given": "provide examples",
-        "details must be covered": "cover details"
-    }
+    rules = get_green_rules()
 
-    for passive, active in passive_to_active.items():
-        optimized_prompt = optimized_prompt.replace(passive, active)
+    # 1-3. Remove excessive politeness, consolidate redundant descriptors and convert passive to
+    # active voice: one pass over the lowercased prompt with the rules from green_rules.json
+    optimized_prompt = rules.rewrite.apply(user_prompt.lower())
 
     # 4. Structure optimization - convert rambling to direct requests
-    if "explanation" in optimized_prompt.lower() and len(optimized_prompt) > 100:
+    lowered = optimized_prompt.lower()
+    if rules.restructure_trigger in lowered and len(optimized_prompt) > rules.restructure_min_length:
         # Extract core topic and requirements
-        if "machine learning" in optimized_prompt.lower():
-            optimized_prompt = "Explain machine learning algorithms with examples and key concepts."
-        elif "quantum computing" in optimized_prompt.lower():
-            optimized_prompt = "Explain quantum computing principles with practical examples."
-        elif len(optimized_prompt) > 200:
-            # Generic fallback for overly verbose prompts
-            optimized_prompt = "Provide a comprehensive explanation with examples and key points."
+        for topic, rewrite in rules.topic_rewrites.items():
+            if topic in lowered:
+                optimized_prompt = rewrite
+                break
+        else:
+            if rules.generic_rewrite is not None and len(optimized_prompt) > rules.generic_min_length:
+                # Generic fallback for overly verbose prompts
+                optimized_prompt = rules.generic_rewrite
 
     # 5. Clean up extra spaces and formatting
     optimized_prompt = " ".join(optimized_prompt.split())
 
     # 6. Ensure minimum viable optimization (at least 15% reduction)
-    if len(optimized_prompt) >= len(user_prompt) * 0.85:
+    if len(optimized_prompt) >= len(user_prompt) * rules.min_reduction_ratio:
         # Apply more aggressive optimization
         words = optimized_prompt.split()
         # Remove filler words
-        filler_words = {"really", "quite", "very", "extremely", "absolutely", "definitely", "certainly"}
-        filtered_words = [word for word in words if word.lower() not in filler_words]
+        filtered_words = [word for word in words if word.lower() not in rules.filler_words]
         optimized_prompt = " ".join(filtered_words)
 
     optimized_tokens = count_tokens(optimized_prompt)
@@ -185,3 +194,25 @@ def optimize_prompt_for_green(user_prompt: str) -> Dict[str, Any]:
         "carbon_savings_gco2": round(carbon_savings, 4),
         "cost_savings_usd": round(cost_savings, 6)
     }
+
+
+def optimize_prompts_for_green(prompts: List[str]) -> List[Dict[str, Any]]:
+    """optimize_prompt_for_green for several prompts in one call (one round trip to a worker process)"""
+    return [optimize_prompt_for_green(prompt) for prompt in prompts]
+
+
+def summarize_green_savings(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate token, energy, carbon and cost savings over optimize_prompt_for_green results"""
+    original_tokens = sum(result["original_tokens"] for result in results)
+    optimized_tokens = sum(result["optimized_tokens"] for result in results)
+    token_reduction = original_tokens - optimized_tokens
+    return {
+        "prompts": len(results),
+        "original_tokens": original_tokens,
+        "optimized_tokens": optimized_tokens,
+        "token_reduction": token_reduction,
+        "token_reduction_percent": round(token_reduction / original_tokens * 100, 2) if original_tokens > 0 else 0,
+        "energy_savings_kwh": round(sum(result["energy_savings_kwh"] for result in results), 8),
+        "carbon_savings_gco2": round(sum(result["carbon_savings_gco2"] for result in results), 4),
+        "cost_savings_usd": round(sum(result["cost_savings_usd"] for result in results), 6)
+    }
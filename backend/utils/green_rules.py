@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+# Rule file used by optimize_prompt_for_green (override through environment variables)
+GREEN_RULES_PATH = os.getenv(
+    "GREEN_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "green_rules.json"),
+)
+
+
+class RewriteRules:
+    """
+    Ordered literal rewrite rules, applied with the same semantics as one str.replace per rule
+    in order (a later rule also sees what earlier rules produced).
+
+    Each rule is a C-level substring search over the text. A combined regex or an Aho-Corasick
+    automaton finds all matches in one scan but, in CPython, is slower than these passes for a
+    few dozen literals, and a single pass would not see matches formed by earlier rewrites
+    (see benchmark_green_rules.py).
+    """
+
+    def __init__(self, rules: List[Tuple[str, str]]):
+        if any(not pattern for pattern, _ in rules):
+            raise ValueError("Rewrite rule patterns must not be empty")
+        self.rules = list(rules)
+
+    def apply(self, text: str) -> str:
+        """Apply every rule in order to text"""
+        for pattern, replacement in self.rules:
+            # str.replace returns the text itself (no copy) when the pattern does not occur
+            text = text.replace(pattern, replacement)
+        return text
+
+
+class GreenRules:
+    """Rule set of optimize_prompt_for_green, loaded from a JSON rule file"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.rewrite = RewriteRules([
+            (pattern, replacement)
+            for group in data.get("replacements", [])
+            for pattern, replacement in group["rules"].items()
+        ])
+        restructure = data.get("restructure", {})
+        self.restructure_trigger: str = restructure.get("trigger", "")
+        self.restructure_min_length: int = restructure.get("min_length", 0)
+        self.topic_rewrites: Dict[str, str] = restructure.get("topics", {})
+        self.generic_min_length: int = restructure.get("generic_min_length", 0)
+        self.generic_rewrite: Optional[str] = restructure.get("generic")
+        self.min_reduction_ratio: float = data.get("min_reduction_ratio", 1.0)
+        self.filler_words: FrozenSet[str] = frozenset(data.get("filler_words", []))
+
+    @classmethod
+    def from_file(cls, path: str) -> "GreenRules":
+        with open(path, encoding="utf-8") as rule_file:
+            return cls(json.load(rule_file))
+
+
+_rules: Optional[GreenRules] = None
+_rules_lock = threading.Lock()
+
+
+def get_green_rules() -> GreenRules:
+    """Return the process-wide rule set, loaded on first use"""
+    global _rules
+    if _rules is None:
+        with _rules_lock:
+            if _rules is None:
+                _rules = GreenRules.from_file(GREEN_RULES_PATH)
+    return _rules
@@ -0,0 +1,112 @@
+import os
+from typing import Any, Dict, Optional
+
+import httpx
+
+# Pool settings (override through environment variables)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "10"))
+HTTP_POOL_TIMEOUT_SECONDS = float(os.getenv("HTTP_POOL_TIMEOUT_SECONDS", "10"))
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+PERPLEXITY_API_URL = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai")
+PERPLEXITY_TIMEOUT_SECONDS = float(os.getenv("PERPLEXITY_TIMEOUT_SECONDS", "60"))
+ANALYTICS_API_URL = os.getenv("ANALYTICS_API_URL", "http://localhost:8001")
+ANALYTICS_TIMEOUT_SECONDS = float(os.getenv("ANALYTICS_TIMEOUT_SECONDS", "30"))
+USAGE_TRUSTED_TOKEN = os.getenv("USAGE_TRUSTED_TOKEN", "")  # Lets the Analytics API accept reported token counts
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (pip install httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PooledClient:
+    """A long-lived httpx.AsyncClient plus request counters for pool sizing"""
+
+    def __init__(self, name: str, base_url: str, timeout: float, http2: bool = False,
+                 headers: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.http2 = http2 and http2_available()
+        self.limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        )
+        self.requests = 0
+        self.errors = 0
+        self.client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            http2=self.http2,
+            limits=self.limits,
+            timeout=httpx.Timeout(timeout, connect=HTTP_CONNECT_TIMEOUT_SECONDS, pool=HTTP_POOL_TIMEOUT_SECONDS),
+            event_hooks={"request": [self._on_request], "response": [self._on_response]},
+        )
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self.requests += 1
+
+    async def _on_response(self, response: httpx.Response) -> None:
+        if response.status_code >= 500:
+            self.errors += 1
+
+    def _connections(self):
+        # httpx keeps its connection pool on the transport; read it for diagnostics only
+        pool = getattr(self.client._transport, "_pool", None)
+        return list(getattr(pool, "connections", []))
+
+    def stats(self) -> Dict[str, Any]:
+        connections = self._connections()
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "base_url": str(self.client.base_url),
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "connections": len(connections),
+            "active_connections": len(connections) - idle,
+            "idle_connections": idle,
+            "requests": self.requests,
+            "server_errors": self.errors,
+        }
+
+
+class HTTPClients:
+    """Named shared clients for an app; created on first use and closed on shutdown"""
+
+    def __init__(self):
+        self._clients: Dict[str, PooledClient] = {}
+
+    def _get(self, name: str, base_url: str, timeout: float, http2: bool,
+             headers: Optional[Dict[str, str]] = None) -> httpx.AsyncClient:
+        pooled = self._clients.get(name)
+        if pooled is None or pooled.client.is_closed:
+            pooled = PooledClient(name, base_url, timeout, http2, headers)
+            self._clients[name] = pooled
+        return pooled.client
+
+    @property
+    def perplexity(self) -> httpx.AsyncClient:
+        """Client for the Perplexity API (HTTP/2 when enabled)"""
+        return self._get("perplexity", PERPLEXITY_API_URL, PERPLEXITY_TIMEOUT_SECONDS, HTTP2_ENABLED)
+
+    @property
+    def analytics(self) -> httpx.AsyncClient:
+        """Client for the Analytics API (plain HTTP/1.1 keep-alive on localhost)"""
+        headers = {"X-Usage-Token": USAGE_TRUSTED_TOKEN} if USAGE_TRUSTED_TOKEN else None
+        return self._get("analytics", ANALYTICS_API_URL, ANALYTICS_TIMEOUT_SECONDS, False, headers)
+
+    async def aclose(self) -> None:
+        for pooled in self._clients.values():
+            await pooled.client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pooled.stats() for name, pooled in self._clients.items()}
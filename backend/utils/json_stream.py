@@ -0,0 +1,102 @@
+import codecs
+import json
+from typing import Any, AsyncIterator, Optional, Tuple
+
+ParsedItem = Tuple[Any, Optional[str]]  # (value, error message)
+
+
+def _parse_line(line: bytes) -> ParsedItem:
+    try:
+        return json.loads(line), None
+    except ValueError as e:
+        return None, f"Invalid JSON: {e}"
+
+
+def _ends_element(char: str) -> bool:
+    """Whether char may follow a complete array element"""
+    return char.isspace() or char in ",]"
+
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedItem]:
+    """Yield one (value, error) pair per non-empty line; a bad line doesn't stop the stream"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        if b"\n" not in chunk:
+            continue
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(line)
+    if buffer.strip():
+        yield _parse_line(buffer)
+
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[ParsedItem]:
+    """
+    Yield the elements of a top-level JSON array as the body arrives.
+    Raises ValueError if the body is not a well-formed array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    state = "start"  # start -> first -> value/separator ... -> done
+
+    iterator = chunks.__aiter__()
+
+    async def more() -> Optional[str]:
+        try:
+            return text_decoder.decode(await iterator.__anext__())
+        except StopAsyncIteration:
+            return None
+
+    final = False
+    while state != "done":
+        position = 0
+        length = len(buffer)
+        while position < length and state != "done":
+            char = buffer[position]
+            if char.isspace():
+                position += 1
+            elif state == "start":
+                if char != "[":
+                    raise ValueError("Request body must be a JSON array or NDJSON")
+                state = "first"
+                position += 1
+            elif state == "separator":
+                if char == ",":
+                    state = "value"
+                elif char == "]":
+                    state = "done"
+                else:
+                    raise ValueError(f"Expected ',' or ']' in JSON array, found {char!r}")
+                position += 1
+            elif state == "first" and char == "]":
+                state = "done"
+                position += 1
+            else:
+                try:
+                    value, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if final:
+                        raise ValueError("Malformed JSON array element")
+                    break  # element is incomplete; read more
+                if not final and (end == length or not _ends_element(buffer[end])):
+                    # A literal may be cut at the chunk boundary: "12" of "123", or "1" of "1.5"
+                    # (raw_decode stops before a "." or "e" that has no digits after it yet)
+                    break
+                yield value, None
+                state = "separator"
+                position = end
+
+        buffer = buffer[position:]
+        if state == "done":
+            break
+        if final:
+            raise ValueError("Unexpected end of JSON array")
+        chunk = await more()
+        if chunk is None:
+            buffer += text_decoder.decode(b"", final=True)
+            final = True
+        else:
+            buffer += chunk
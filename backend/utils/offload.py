@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+# Offload settings (override through environment variables)
+OFFLOAD_INLINE_MAX_CHARS = int(os.getenv("OFFLOAD_INLINE_MAX_CHARS", "4096"))
+OFFLOAD_PROCESS_MIN_CHARS = int(os.getenv("OFFLOAD_PROCESS_MIN_CHARS", "0"))  # 0 disables the process pool
+OFFLOAD_THREADS = int(os.getenv("OFFLOAD_THREADS", "4"))
+OFFLOAD_PROCESSES = int(os.getenv("OFFLOAD_PROCESSES", "2"))
+
+
+class CPUOffloader:
+    """
+    Runs CPU-bound helpers (tokenization, prompt optimization) away from the event loop.
+    Small payloads run inline, larger ones on a thread pool (tiktoken releases the GIL) and,
+    when enabled, very large ones on a process pool.
+    """
+
+    def __init__(self, inline_max_chars: int = OFFLOAD_INLINE_MAX_CHARS,
+                 process_min_chars: int = OFFLOAD_PROCESS_MIN_CHARS,
+                 threads: int = OFFLOAD_THREADS,
+                 processes: int = OFFLOAD_PROCESSES):
+        self.inline_max_chars = inline_max_chars
+        self.process_min_chars = process_min_chars
+        self.threads = max(1, threads)
+        self.processes = max(1, processes)
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.calls = {"inline": 0, "thread": 0, "process": 0}
+
+    def choose(self, size: int) -> str:
+        """Pick where a call on a payload of `size` characters runs"""
+        if size <= self.inline_max_chars:
+            return "inline"
+        if self.process_min_chars > 0 and size >= self.process_min_chars:
+            return "process"
+        return "thread"
+
+    def _executor(self, kind: str) -> Executor:
+        with self._lock:
+            if kind == "process":
+                if self._process_pool is None:
+                    self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+                return self._process_pool
+            if self._thread_pool is None:
+                self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="offload")
+            return self._thread_pool
+
+    async def run(self, func: Callable[..., Any], *args: Any, size: int = 0, **kwargs: Any) -> Any:
+        """Call func(*args, **kwargs) inline or on a pool depending on the payload size"""
+        return await self.run_in(self.choose(size), func, *args, **kwargs)
+
+    async def run_in(self, kind: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Call func(*args, **kwargs) "inline", on the "thread" pool or on the "process" pool"""
+        self.calls[kind] += 1
+        if kind == "inline":
+            return func(*args, **kwargs)
+        # Functions sent to the process pool must be importable module-level callables
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor(kind), functools.partial(func, *args, **kwargs)
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for pool in (self._thread_pool, self._process_pool):
+                if pool is not None:
+                    pool.shutdown(wait=True, cancel_futures=True)
+            self._thread_pool = None
+            self._process_pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "inline_max_chars": self.inline_max_chars,
+            "process_min_chars": self.process_min_chars,
+            "calls": dict(self.calls),
+        }
+
+
+_offloader: Optional[CPUOffloader] = None
+_offloader_lock = threading.Lock()
+_offloader_users = 0
+
+
+def get_offloader() -> CPUOffloader:
+    """Return the process-wide offloader"""
+    global _offloader
+    if _offloader is None:
+        with _offloader_lock:
+            if _offloader is None:
+                _offloader = CPUOffloader()
+    return _offloader
+
+
+async def offload(func: Callable[..., Any], *args: Any, size: int = 0, **kwargs: Any) -> Any:
+    """Run a CPU-bound call through the shared offloader"""
+    return await get_offloader().run(func, *args, size=size, **kwargs)
+
+
+def acquire_offloader() -> CPUOffloader:
+    """Register an app using the shared offloader (call from the app's startup hook)"""
+    global _offloader_users
+    with _offloader_lock:
+        _offloader_users += 1
+    return get_offloader()
+
+
+def release_offloader() -> None:
+    """
+    Unregister an app (call from its shutdown hook); the pools stop once no app is left,
+    so in the combined process the first app to stop doesn't take them from the others
+    """
+    global _offloader_users
+    with _offloader_lock:
+        _offloader_users = max(_offloader_users - 1, 0)
+        if _offloader_users:
+            return
+    shutdown_offloader()
+
+
+def shutdown_offloader() -> None:
+    """Stop the shared pools now, whichever apps still use them"""
+    global _offloader
+    with _offloader_lock:
+        if _offloader is not None:
+            _offloader.shutdown()
+            _offloader = None
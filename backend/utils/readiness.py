@@ -0,0 +1,83 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, Optional, Set
+
+
+class Readiness:
+    """
+    Startup steps of an app and how long they took, reported by its /ready endpoint.
+
+    run() executes a step inline in the startup hook; start() runs one on a worker thread so the
+    server already answers /health while /ready still reports 503 (e.g. tokenizer warmup).
+    """
+
+    def __init__(self):
+        self.created = time.monotonic()
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.ready_after: Optional[float] = None  # Seconds from creation until every step had finished
+
+    def run(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a startup step now; a failing step is recorded and re-raised"""
+        step = self.steps[name] = {"status": "running"}
+        self.ready_after = None
+        started = time.perf_counter()
+        try:
+            result = func(*args)
+        except Exception as exc:
+            step.update(status="failed", error=str(exc), seconds=round(time.perf_counter() - started, 4))
+            raise
+        step.update(status="done", seconds=round(time.perf_counter() - started, 4))
+        self._check_ready()
+        return result
+
+    def start(self, name: str, func: Callable[..., Any], *args: Any, retry_seconds: float = 0) -> None:
+        """
+        Run a startup step in the background; failures are reported by stats(), not raised.
+        With retry_seconds > 0 a failed step is run again after that long until it succeeds,
+        so a transient failure doesn't keep /ready at 503 for the life of the process.
+        """
+        self.steps[name] = {"status": "pending"}
+        self.ready_after = None
+        task = asyncio.create_task(self._run_in_thread(name, retry_seconds, func, *args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_in_thread(self, name: str, retry_seconds: float, func: Callable[..., Any], *args: Any) -> None:
+        step = self.steps[name]
+        step["status"] = "running"
+        started = time.perf_counter()
+        attempts = 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    result = await asyncio.to_thread(func, *args)
+                except Exception as exc:
+                    step.update(status="failed", error=str(exc), attempts=attempts)
+                    if retry_seconds <= 0:
+                        return
+                    await asyncio.sleep(retry_seconds)
+                else:
+                    step.pop("error", None)
+                    step.update(status="done", result=result, attempts=attempts)
+                    self._check_ready()
+                    return
+        finally:
+            step["seconds"] = round(time.perf_counter() - started, 4)
+
+    def _check_ready(self) -> None:
+        if self.ready and self.ready_after is None:
+            self.ready_after = round(time.monotonic() - self.created, 4)
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.steps) and all(step["status"] == "done" for step in self.steps.values())
+
+    def stop(self) -> None:
+        """Stop waiting for background steps (a step already on its thread still runs to the end)"""
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"ready": self.ready, "ready_after_seconds": self.ready_after, "steps": self.steps}
@@ -0,0 +1,62 @@
+import re
+from typing import Pattern
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+_THINK_OPEN_TAG = re.compile(re.escape(THINK_OPEN), re.IGNORECASE)
+_THINK_CLOSE_TAG = re.compile(re.escape(THINK_CLOSE), re.IGNORECASE)
+
+
+def _partial_tag_length(text: str, tag: str) -> int:
+    """Length of the longest suffix of text that is a proper prefix of tag (case-insensitive)"""
+    for length in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text[-length:].lower() == tag[:length]:
+            return length
+    return 0
+
+
+class ThinkBlockFilter:
+    """
+    Drops <think>...</think> reasoning from text that arrives in chunks (e.g. a streamed
+    reasoning-model completion), keeping only the answer. Tags are matched case-insensitively and
+    may be split across chunks; like a non-greedy <think>.*?</think> regex, each block ends at the
+    first closing tag after it opens.
+    """
+
+    def __init__(self):
+        self.inside = False      # Currently in a reasoning block
+        self.reasoning_chars = 0  # Reasoning text discarded so far
+        self._pending = ""       # Chunk tail that may be the start of a tag
+
+    def feed(self, text: str) -> str:
+        """Add a chunk; returns the answer text it completes"""
+        buffer = self._pending + text
+        answer = []
+        while True:
+            tag: Pattern = _THINK_CLOSE_TAG if self.inside else _THINK_OPEN_TAG
+            match = tag.search(buffer)
+            if match is None:
+                break
+            if self.inside:
+                self.reasoning_chars += match.start()
+            else:
+                answer.append(buffer[:match.start()])
+            buffer = buffer[match.end():]
+            self.inside = not self.inside
+
+        keep = _partial_tag_length(buffer, THINK_CLOSE if self.inside else THINK_OPEN)
+        complete, self._pending = buffer[:len(buffer) - keep], buffer[len(buffer) - keep:]
+        if self.inside:
+            self.reasoning_chars += len(complete)
+        else:
+            answer.append(complete)
+        return "".join(answer)
+
+    def finish(self) -> str:
+        """End of text: returns any held-back answer text (nothing if a reasoning block never closed)"""
+        pending, self._pending = self._pending, ""
+        if self.inside:
+            self.reasoning_chars += len(pending)
+            return ""
+        return pending
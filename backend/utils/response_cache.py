@@ -0,0 +1,70 @@
+import asyncio
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class VersionedResponseCache:
+    """
+    Caches one serialized response body until writers bump the version or the TTL expires.
+    Concurrent misses share a single recompute.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self._entry: Optional[Tuple[int, float, bytes, str]] = None  # (version, created, body, etag)
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.recomputes = 0
+
+    def bump(self) -> None:
+        """Invalidate the cached response (call after every committed write)"""
+        self.version += 1
+
+    def _fresh(self) -> Optional[Tuple[bytes, str]]:
+        entry = self._entry
+        if entry is None:
+            return None
+        version, created, body, etag = entry
+        if version != self.version or time.monotonic() - created > self.ttl_seconds:
+            return None
+        return body, etag
+
+    async def get_or_compute(self, compute: Callable[[], Awaitable[Any]]) -> Tuple[bytes, str]:
+        """Return (json body, etag), recomputing the payload only when it is stale"""
+        cached = self._fresh()
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        async with self._lock:
+            cached = self._fresh()
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            version = self.version
+            payload = await compute()
+            body = json.dumps(payload, default=str, separators=(",", ":")).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            self._entry = (version, time.monotonic(), body, etag)
+            self.recomputes += 1
+            return body, etag
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "recomputes": self.recomputes,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header value matches the given (strong) ETag"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
@@ -0,0 +1,268 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+
+# Tunables (override through environment variables)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+TOKENIZER_THREADS = int(os.getenv("TOKENIZER_THREADS", "8"))
+# After an encoding fails to load, counts use approximate_tokens() until the load is retried
+TOKENIZER_RETRY_SECONDS = float(os.getenv("TOKENIZER_RETRY_SECONDS", "60"))
+# Encodings loaded by prewarm() at app startup (comma-separated encoding or model names)
+TOKENIZER_PREWARM = [name.strip() for name in os.getenv("TOKENIZER_PREWARM", DEFAULT_ENCODING).split(",") if name.strip()]
+
+# Everything up to the last whitespace that follows a letter or digit: the pre-tokenizer always
+# splits there, whatever comes next. After punctuation it does not (cl100k's " ?[^\s\p{L}\p{N}]+[\r\n]*"
+# keeps ".\n\n" in one piece), so punctuation is held back with the whitespace after it.
+_COMMITTABLE_PREFIX = re.compile(r".*[^\W_](?=\s)", re.DOTALL)
+
+
+def approximate_tokens(text: str) -> int:
+    """Fallback token estimate used when no encoding is available (1 token ≈ 4 characters)"""
+    return len(text) // 4
+
+
+class TokenizerEngine:
+    """Process-wide tokenizer: one encoding per model plus an LRU cache of token counts"""
+
+    def __init__(self, cache_size: int = TOKEN_CACHE_SIZE, num_threads: int = TOKENIZER_THREADS,
+                 retry_seconds: float = TOKENIZER_RETRY_SECONDS):
+        self.cache_size = cache_size
+        self.num_threads = max(1, num_threads)
+        self.retry_seconds = retry_seconds
+        self._encodings: Dict[str, "tiktoken.Encoding"] = {}
+        # Failed loads: name -> (monotonic time of the next attempt, error)
+        self._failures: Dict[str, Tuple[float, str]] = {}
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._encoding_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.approximated = 0  # Texts counted with approximate_tokens()
+
+    def get_encoding(self, model: str = DEFAULT_ENCODING) -> Optional["tiktoken.Encoding"]:
+        """
+        Return the encoding for an encoding or model name, or None while it can't be loaded.
+        A loaded encoding is kept for good; a failed load is retried after retry_seconds.
+        """
+        encoding = self._encodings.get(model)
+        if encoding is not None:
+            return encoding
+        if self._failed_recently(model):
+            return None
+
+        with self._encoding_lock:
+            if model in self._encodings:
+                return self._encodings[model]
+            if self._failed_recently(model):
+                return None
+            # Imported on first use, so importing the apps doesn't pay for tiktoken
+            import tiktoken
+
+            try:
+                # Only model names go through encoding_for_model, so a failed download of a known
+                # encoding is reported as itself rather than as an unknown model
+                if model in tiktoken.list_encoding_names():
+                    encoding = tiktoken.get_encoding(model)
+                else:
+                    encoding = tiktoken.encoding_for_model(model)
+            except Exception as exc:
+                # Don't retry the (possibly remote) load on every call, but do retry it
+                self._failures[model] = (time.monotonic() + self.retry_seconds, str(exc))
+                return None
+            self._failures.pop(model, None)
+            self._encodings[model] = encoding
+            return encoding
+
+    def _failed_recently(self, model: str) -> bool:
+        failure = self._failures.get(model)
+        return failure is not None and time.monotonic() < failure[0]
+
+    @staticmethod
+    def _cache_key(text: str, model: str) -> bytes:
+        digest = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16)
+        digest.update(model.encode("utf-8"))
+        return digest.digest()
+
+    def _cache_get(self, key: bytes) -> Optional[int]:
+        with self._cache_lock:
+            count = self._cache.get(key)
+            if count is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return count
+
+    def _cache_put(self, key: bytes, count: int) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = count
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count_tokens(self, text: str, model: str = DEFAULT_ENCODING) -> int:
+        """Count tokens in a single text"""
+        return self.count_tokens_many([text], model)[0]
+
+    def count_tokens_many(self, texts: List[str], model: str = DEFAULT_ENCODING) -> List[int]:
+        """Count tokens for many texts, encoding cache misses in one multi-threaded batch"""
+        counts: List[Optional[int]] = [None] * len(texts)
+        pending: Dict[bytes, List[int]] = {}
+        pending_texts: List[str] = []
+
+        for index, text in enumerate(texts):
+            if not text:
+                counts[index] = 0
+                continue
+            key = self._cache_key(text, model)
+            cached = self._cache_get(key)
+            if cached is not None:
+                counts[index] = cached
+                continue
+            if key not in pending:
+                pending[key] = []
+                pending_texts.append(text)
+            pending[key].append(index)
+
+        if pending_texts:
+            encoding = self.get_encoding(model)
+            lengths = None
+            if encoding is not None:
+                try:
+                    if len(pending_texts) == 1:
+                        lengths = [len(encoding.encode(pending_texts[0], disallowed_special=()))]
+                    else:
+                        encoded = encoding.encode_batch(
+                            pending_texts,
+                            num_threads=self.num_threads,
+                            disallowed_special=(),
+                        )
+                        lengths = [len(tokens) for tokens in encoded]
+                except Exception:
+                    lengths = None
+            exact = lengths is not None
+            if not exact:
+                lengths = [approximate_tokens(text) for text in pending_texts]
+                with self._cache_lock:
+                    self.approximated += len(pending_texts)
+
+            for (key, indexes), length in zip(pending.items(), lengths):
+                # Estimates aren't cached, so exact counts come back once the encoding loads
+                if exact:
+                    self._cache_put(key, length)
+                for index in indexes:
+                    counts[index] = length
+
+        return counts  # type: ignore[return-value]
+
+    def prewarm(self, models: Iterable[str] = TOKENIZER_PREWARM) -> Dict[str, bool]:
+        """
+        Load encodings ahead of the first request (the BPE ranks may have to be read or downloaded)
+        and run one encode on each; raises RuntimeError naming the encodings that failed to load,
+        so a readiness step running it fails instead of passing with approximate counts
+        """
+        loaded = {}
+        for model in models:
+            encoding = self.get_encoding(model)
+            if encoding is not None:
+                encoding.encode("warm up", disallowed_special=())
+            loaded[model] = encoding is not None
+
+        failed = [model for model, ok in loaded.items() if not ok]
+        if failed:
+            errors = "; ".join(f"{model}: {self._failures[model][1]}" for model in failed if model in self._failures)
+            raise RuntimeError(f"Tokenizer encodings failed to load ({errors or ', '.join(failed)})")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache statistics and fallback state for diagnostics"""
+        now = time.monotonic()
+        with self._cache_lock:
+            return {
+                "cache_entries": len(self._cache),
+                "cache_size": self.cache_size,
+                "cache_hits": self.hits,
+                "cache_misses": self.misses,
+                "encodings_loaded": len(self._encodings),
+                # Encodings that failed to load: counts for them are approximate until a retry succeeds
+                "fallback_encodings": {
+                    model: {"error": error, "retry_in_seconds": round(max(0.0, retry_at - now), 1)}
+                    for model, (retry_at, error) in self._failures.items()
+                },
+                "approximated_counts": self.approximated,
+            }
+
+
+_engine: Optional[TokenizerEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_tokenizer() -> TokenizerEngine:
+    """Return the process-wide tokenizer engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TokenizerEngine()
+    return _engine
+
+
+def prewarm_tokenizer(models: Iterable[str] = TOKENIZER_PREWARM) -> Dict[str, bool]:
+    """Load the shared engine's encodings now instead of inside the first request"""
+    return get_tokenizer().prewarm(models)
+
+
+def count_tokens(text: str, model: str = DEFAULT_ENCODING) -> int:
+    """Count tokens in text using the shared tokenizer engine"""
+    return get_tokenizer().count_tokens(text, model)
+
+
+def count_tokens_many(texts: List[str], model: str = DEFAULT_ENCODING) -> List[int]:
+    """Count tokens for a batch of texts using the shared tokenizer engine"""
+    return get_tokenizer().count_tokens_many(texts, model)
+
+
+class StreamingTokenCounter:
+    """
+    Counts the tokens of a text that arrives in chunks (e.g. a streamed completion) without
+    re-encoding the whole text on every chunk. Text is encoded up to the last whitespace that
+    follows a letter or digit, a point the pre-tokenizer splits at whatever text comes next.
+    """
+
+    def __init__(self, model: str = DEFAULT_ENCODING, engine: Optional[TokenizerEngine] = None):
+        self.encoding = (engine or get_tokenizer()).get_encoding(model)
+        self.tokens = 0
+        self.characters = 0
+        self._pending = ""
+
+    def feed(self, text: str) -> int:
+        """Add a chunk; returns the token count of the text committed so far"""
+        self.characters += len(text)
+        if self.encoding is None:
+            return self.characters // 4  # approximate_tokens() of the text so far
+        self._pending += text
+        match = _COMMITTABLE_PREFIX.match(self._pending)
+        if match is not None:
+            self.tokens += len(self.encoding.encode(self._pending[:match.end()], disallowed_special=()))
+            self._pending = self._pending[match.end():]
+        return self.tokens
+
+    def finish(self) -> int:
+        """Encode whatever is still pending and return the total token count"""
+        if self.encoding is None:
+            return self.characters // 4  # approximate_tokens() of the full text
+        if self._pending:
+            self.tokens += len(self.encoding.encode(self._pending, disallowed_special=()))
+            self._pending = ""
+        return self.tokens
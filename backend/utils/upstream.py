@@ -0,0 +1,288 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+import httpx
+
+from utils.http_clients import PERPLEXITY_TIMEOUT_SECONDS
+
+# Responses worth retrying; they also count as failures for the circuit breaker
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Connection failures happen before the request reaches the provider, so retrying can't duplicate work
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
+# Default policy (override through environment variables, globally or per endpoint)
+# Counts are ints, everything else is a float; environment values are converted to the default's type
+UPSTREAM_DEFAULTS: Dict[str, float] = {
+    "TIMEOUT_SECONDS": PERPLEXITY_TIMEOUT_SECONDS,  # Per attempt
+    "DEADLINE_SECONDS": 90.0,          # No retry is started that would end after this
+    "RETRIES": 2,
+    "BACKOFF_BASE_MS": 200.0,          # Full jitter: sleep uniform(0, base * 2^attempt)
+    "BACKOFF_MAX_MS": 5000.0,
+    "BREAKER_FAILURE_RATE": 0.5,       # Open when this share of recent attempts failed
+    "BREAKER_WINDOW": 20,              # Recent attempts considered
+    "BREAKER_MIN_CALLS": 10,           # Attempts needed before the breaker can open
+    "BREAKER_COOLDOWN_SECONDS": 30.0,  # Open time before a single probe is let through
+    "HEDGE_PERCENTILE": 0.0,           # Latency percentile that triggers a hedge (0 disables hedging)
+    "HEDGE_MIN_DELAY_MS": 500.0,
+    "HEDGE_MIN_SAMPLES": 20,
+    "HEDGE_MAX_RATIO": 0.1,            # Hedges allowed per request
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} upstream is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class UpstreamPolicy:
+    """
+    Timeouts, retries, circuit breaker and hedging settings for one endpoint. Each setting is read
+    from UPSTREAM_<NAME>_<SETTING>, then UPSTREAM_<SETTING>, then the given or built-in default.
+    """
+
+    def __init__(self, name: str, **defaults: float):
+        self.name = name
+        settings = {**UPSTREAM_DEFAULTS, **{key.upper(): value for key, value in defaults.items()}}
+        prefix = name.upper().replace("-", "_")
+        for key, default in settings.items():
+            value = os.getenv(f"UPSTREAM_{prefix}_{key}", os.getenv(f"UPSTREAM_{key}"))
+            setattr(self, key.lower(), type(default)(float(value)) if value is not None else default)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {key.lower(): getattr(self, key.lower()) for key in UPSTREAM_DEFAULTS}
+
+
+class CircuitBreaker:
+    """
+    Error-rate circuit breaker. Closed: calls pass and outcomes are tracked over a sliding window.
+    Open: calls fail fast until the cooldown ends. Half-open: one probe decides between the two.
+    """
+
+    def __init__(self, failure_rate: float, window: int, min_calls: int, cooldown_seconds: float):
+        self.failure_rate = failure_rate
+        self.min_calls = max(1, min_calls)
+        self.cooldown = cooldown_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=max(1, window))
+        self.state = "closed"
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def record(self, success: bool) -> None:
+        if self.state == "half_open":
+            self._probing = False
+            if success:
+                self.state = "closed"
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._open()
+
+    def release(self) -> None:
+        """Forget an allowed call that was abandoned (e.g. cancelled) before it had an outcome"""
+        self._probing = False
+
+    def _open(self) -> None:
+        self.state = "open"
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._outcomes.clear()
+
+    def retry_after(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "times_opened": self.times_opened,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._outcomes.count(False),
+        }
+
+
+class ResilientUpstream:
+    """
+    Sends requests for one endpoint through a shared client with bounded retries (exponential
+    backoff with full jitter on 429/5xx and connection errors), a circuit breaker, and optional
+    hedging: a second attempt once the first is slower than the configured latency percentile.
+    """
+
+    def __init__(self, name: str, client_factory: Callable[[], httpx.AsyncClient],
+                 policy: Optional[UpstreamPolicy] = None):
+        self.name = name
+        self.client_factory = client_factory
+        self.policy = policy or UpstreamPolicy(name)
+        self.breaker = CircuitBreaker(
+            failure_rate=self.policy.breaker_failure_rate,
+            window=self.policy.breaker_window,
+            min_calls=self.policy.breaker_min_calls,
+            cooldown_seconds=self.policy.breaker_cooldown_seconds,
+        )
+        self._latencies: Deque[float] = deque(maxlen=200)
+        self.requests = 0
+        self.attempts = 0
+        self.retries = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.send("POST", path, **kwargs)
+
+    async def send(self, method: str, path: str, stream: bool = False, **kwargs: Any) -> httpx.Response:
+        """
+        Send a request and return the final response, which may still be an error status once
+        retries are exhausted. Streamed responses are returned unread and are never hedged.
+        Raises CircuitOpenError when the breaker is open, or the last connection error.
+        """
+        self.requests += 1
+        deadline = time.monotonic() + self.policy.deadline_seconds
+        response: Optional[httpx.Response] = None
+        error: Optional[Exception] = None
+
+        for attempt in range(self.policy.retries + 1):
+            if not self.breaker.allow():
+                if response is not None:
+                    break
+                self.short_circuited += 1
+                raise CircuitOpenError(self.name, self.breaker.retry_after())
+            if response is not None:
+                await response.aclose()
+            try:
+                response, error = await self._hedged_attempt(method, path, stream, kwargs), None
+            except RETRYABLE_ERRORS as exc:
+                response, error = None, exc
+            except httpx.RequestError:
+                self.failures += 1
+                raise
+            if response is not None and response.status_code not in RETRYABLE_STATUSES:
+                return response
+
+            delay = self._backoff(attempt, response)
+            if attempt == self.policy.retries or time.monotonic() + delay > deadline:
+                break
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+        self.failures += 1
+        if response is None:
+            raise error  # type: ignore[misc]
+        return response
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        cap = self.policy.backoff_max_ms / 1000
+        delay = random.uniform(0, min(cap, self.policy.backoff_base_ms / 1000 * 2 ** attempt))
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, min(cap, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-date form; the jittered backoff is used instead
+        return delay
+
+    async def _attempt(self, method: str, path: str, stream: bool, kwargs: Dict[str, Any]) -> httpx.Response:
+        self.attempts += 1
+        started = time.monotonic()
+        # The breaker allowed this attempt: every way out must record an outcome or release it,
+        # or a half-open breaker would wait forever for its probe
+        try:
+            client = self.client_factory()
+            request = client.build_request(method, path, timeout=self.policy.timeout_seconds, **kwargs)
+            response = await client.send(request, stream=stream)
+        except Exception:
+            self.breaker.record(False)
+            raise
+        except BaseException:  # Cancelled (e.g. the losing hedge) or interrupted: no outcome
+            self.breaker.release()
+            raise
+        success = response.status_code not in RETRYABLE_STATUSES
+        self.breaker.record(success)
+        if success:
+            self._latencies.append(time.monotonic() - started)
+        return response
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or not yet calibrated"""
+        policy = self.policy
+        if policy.hedge_percentile <= 0 or len(self._latencies) < policy.hedge_min_samples:
+            return None
+        if self.hedges >= policy.hedge_max_ratio * self.requests:
+            return None
+        return max(policy.hedge_min_delay_ms / 1000, self.latency_percentile(policy.hedge_percentile))
+
+    def latency_percentile(self, percentile: float) -> float:
+        if not self._latencies:
+            return 0.0
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    async def _hedged_attempt(self, method: str, path: str, stream: bool, kwargs: Dict[str, Any]) -> httpx.Response:
+        delay = None if stream else self.hedge_delay()
+        if delay is None:
+            return await self._attempt(method, path, stream, kwargs)
+
+        primary = asyncio.ensure_future(self._attempt(method, path, stream, kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done or self.breaker.state != "closed":
+                return await primary
+            self.hedges += 1
+            hedge = asyncio.ensure_future(self._attempt(method, path, stream, kwargs))
+            pending = {primary, hedge}
+
+            # First usable response wins; otherwise fall back to whichever attempt finished last
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUSES:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                if not pending:
+                    return await done.pop()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "failures": self.failures,
+            "short_circuited": self.short_circuited,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "latency_p50_ms": round(self.latency_percentile(50) * 1000, 1),
+            "latency_p95_ms": round(self.latency_percentile(95) * 1000, 1),
+            "breaker": self.breaker.stats(),
+            "policy": self.policy.as_dict(),
+        }
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+# Reporter settings (override through environment variables)
+USAGE_REPORT_QUEUE_SIZE = int(os.getenv("USAGE_REPORT_QUEUE_SIZE", "10000"))
+USAGE_REPORT_BATCH_SIZE = int(os.getenv("USAGE_REPORT_BATCH_SIZE", "200"))
+USAGE_REPORT_FLUSH_MS = float(os.getenv("USAGE_REPORT_FLUSH_MS", "100"))
+USAGE_REPORT_RETRIES = int(os.getenv("USAGE_REPORT_RETRIES", "3"))
+USAGE_REPORT_DRAIN_SECONDS = float(os.getenv("USAGE_REPORT_DRAIN_SECONDS", "10"))
+
+
+class UsageReporter:
+    """
+    Reports usage events to the Analytics API off the request path: report() only enqueues,
+    and a background task posts batches as NDJSON to /store-usage/batch.
+
+    The queue is bounded; when it is full new events are dropped and counted, so a slow or
+    unavailable Analytics API never adds latency to /call-llm.
+
+    With a sink (the combined single-process app), batches are handed to it directly instead of
+    being serialized and posted over HTTP.
+    """
+
+    def __init__(self, client_factory: Callable[[], httpx.AsyncClient],
+                 batch_size: int = USAGE_REPORT_BATCH_SIZE,
+                 flush_interval_ms: float = USAGE_REPORT_FLUSH_MS,
+                 max_queue: int = USAGE_REPORT_QUEUE_SIZE,
+                 retries: int = USAGE_REPORT_RETRIES,
+                 sink: Optional[Callable[[List[Dict[str, Any]]], Awaitable[Any]]] = None):
+        self.client_factory = client_factory
+        self.sink = sink
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.retries = max(0, retries)
+        self._queue: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+        self.enqueued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.failed = 0
+        self.batches_sent = 0
+        self.max_depth = 0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = USAGE_REPORT_DRAIN_SECONDS) -> None:
+        """Send everything still queued (up to timeout seconds), then stop the sender"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Warning: Dropping {self._queue.qsize()} unsent usage events on shutdown")
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def report(self, event: Dict[str, Any]) -> bool:
+        """Queue one usage event without waiting; returns False if it was dropped"""
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        return True
+
+    async def _next_batch(self) -> List[Dict[str, Any]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _rejections(body: Any) -> List[str]:
+        """Per-record errors from a /store-usage/batch response (or the sink's equivalent result)"""
+        results = body.get("results") if isinstance(body, dict) else None
+        if not isinstance(results, list):
+            return []
+        return [str(result["error"]) for result in results if isinstance(result, dict) and "error" in result]
+
+    async def _send(self, batch: List[Dict[str, Any]]) -> List[str]:
+        """Send one batch; returns the errors of the records the Analytics API rejected"""
+        if self.sink is not None:
+            return self._rejections(await self.sink(batch))
+        body = "\n".join(json.dumps(event) for event in batch).encode("utf-8")
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self.client_factory().post(
+                    "/store-usage/batch",
+                    content=body,
+                    headers={"content-type": "application/x-ndjson"},
+                )
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    try:
+                        return self._rejections(response.json())
+                    except ValueError:
+                        return []
+                error: Exception = httpx.HTTPStatusError(
+                    f"Analytics API returned {response.status_code}", request=response.request, response=response
+                )
+            except httpx.RequestError as exc:
+                error = exc
+            if attempt < self.retries:
+                await asyncio.sleep(0.1 * 2 ** attempt)
+        raise error
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._next_batch()
+            try:
+                rejections = await self._send(batch)
+            except Exception as exc:
+                self.failed += len(batch)
+                print(f"Warning: Failed to report {len(batch)} usage events to Analytics API: {exc}")
+            else:
+                # A stored batch can still have rejected records; they count as failed
+                self.failed += len(rejections)
+                self.sent += len(batch) - len(rejections)
+                self.batches_sent += 1
+                if rejections:
+                    print(f"Warning: Analytics API rejected {len(rejections)} of {len(batch)} usage events: {rejections[0]}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "sent": self.sent,
+            "failed": self.failed,
+            "batches_sent": self.batches_sent,
+        }
@@ -156,6 +156,45 @@ function Dashboard() {
         </Grid>
       </Grid>
 
+      <Grid container spacing={2} mt={2} alignItems="stretch">
+        <Grid size={4}>
+          <Paper elevation={3} sx={{ height: '100%' }}>
+            <Box p={2}>
+              <Typography variant="h6">Cached Responses</Typography>
+              <Typography variant="h4">
+                {dashboardData?.overview?.TOTAL_CACHE_HITS}
+              </Typography>
+            </Box>
+          </Paper>
+        </Grid>
+        <Grid size={4}>
+          <Paper elevation={3} sx={{ height: '100%' }}>
+            <Box p={2}>
+              <Typography variant="h6">Carbon Emission Avoided</Typography>
+              <Typography variant="h4">
+                {dashboardData?.overview?.TOTAL_CARBON_AVOIDED}
+                <Typography component="span" className="unit">
+                  CO2e
+                </Typography>
+              </Typography>
+            </Box>
+          </Paper>
+        </Grid>
+        <Grid size={4}>
+          <Paper elevation={3} sx={{ height: '100%' }}>
+            <Box p={2}>
+              <Typography variant="h6">Energy Avoided</Typography>
+              <Typography variant="h4">
+                {dashboardData?.overview?.TOTAL_ENERGY_AVOIDED}
+                <Typography component="span" className="unit">
+                  Watt
+                </Typography>
+              </Typography>
+            </Box>
+          </Paper>
+        </Grid>
+      </Grid>
+
       <Grid container spacing={2} mt={2} alignItems="stretch">
         <Grid size={6}>
           <Paper elevation={3} sx={{ height: '100%' }}>
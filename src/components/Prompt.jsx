@@ -10,7 +10,6 @@ import {
   Grid,
 } from '@mui/material';
 import { styled } from '@mui/material/styles';
-import axiosInstance from '../util/axios';
 
 const Root = styled(Box)(({ theme }) => ({
   display: 'flex',
@@ -34,22 +33,63 @@ function Prompt() {
     });
   };
 
+  // Reads the Server-Sent Events of /call-llm/stream and appends each delta as it arrives
+  const streamCompletion = async (onEvent) => {
+    const response = await fetch('http://localhost:8002/call-llm/stream', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        INPUT_PROMPT: formData.INPUT_PROMPT,
+        MODEL: formData.MODEL,
+      }),
+    });
+    if (!response.ok) {
+      const body = await response.json().catch(() => ({}));
+      throw new Error(body.detail || `Request failed with status ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split('\n\n');
+      buffer = events.pop();
+      events.forEach((raw) => {
+        const event = raw.match(/^event: (.*)$/m)?.[1];
+        const data = raw.match(/^data: (.*)$/m)?.[1];
+        if (event && data) onEvent(event, JSON.parse(data));
+      });
+    }
+  };
+
   const handleSubmit = async (e) => {
     e.preventDefault();
     setLoading(true);
     setError(null);
+    setResponseData(null);
 
     try {
-      const response = await axiosInstance.post(
-        'http://localhost:8002/call-llm',
-        {
-          INPUT_PROMPT: formData.INPUT_PROMPT,
-          MODEL: formData.MODEL,
+      await streamCompletion((event, data) => {
+        if (event === 'delta') {
+          setLoading(false);
+          setResponseData((previous) => ({
+            ...previous,
+            OUTPUT_PROMPT: (previous?.OUTPUT_PROMPT || '') + data.content,
+          }));
+        } else if (event === 'usage') {
+          setResponseData((previous) => ({
+            ...previous,
+            TOTAL_TOKEN_COUNT: data.TOTAL_TOKEN_COUNT,
+          }));
+        } else if (event === 'error') {
+          setError(data.detail);
         }
-      );
-      setResponseData(response.data);
+      });
     } catch (err) {
-      setError(err.response?.data?.message || err.message);
+      setError(err.message);
     } finally {
       setLoading(false);
     }